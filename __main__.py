@@ -1,37 +1,67 @@
 import os
 import argparse
-from runtime import RunTime, Helicopter, reprString
+from lexer import LEXER_ENGINES, CHAR_ENGINE
+from minipyc import CACHE_DIRNAME, loadMST
+from optimizer import optimizeModule
+from bytecode import compileModule, disassemble
+from transpiler import transpileProgram
+from bundle import BUNDLE_EXTENSION, Bundle, BundleRunTime, writeBundle
+from runtime import (
+    RunTime, Helicopter, printStackTrace, ENGINES, TREE_ENGINE, 
+)
 
-def runScript(entry_filename):
+def runScript(
+    entry_filename, lexer_engine = CHAR_ENGINE, use_cache = True, 
+    prefetch = True, streaming = False, optimize = False, 
+    resolve = True, engine = TREE_ENGINE, 
+):
     dir_location, filename = os.path.split(entry_filename)
     name, _ = os.path.splitext(filename)
-    runTime = RunTime(dir_location)
+    runTime = RunTime(
+        dir_location, lexer_engine, use_cache, prefetch, streaming, 
+        optimize, resolve, engine, 
+    )
     try:
         runTime.imPort(name, '__main__')
     except Helicopter as h:
         printStackTrace(h)
+    finally:
+        runTime.shutdown()
 
-def printStackTrace(helicopter : Helicopter):
-    print('miniPy traceback (most recent call last):')
-    while True:
-        for filename, line_number, label in helicopter.stack:
-            acc = line_number - 1
-            with open(filename, 'r') as f:
-                for line in f:
-                    if acc == 0:
-                        break
-                    acc -= 1
-            print(
-                '  File "', filename, '", line ', line_number, 
-                ', in ', label, 
-                sep='', 
-            )
-            print(' ' * 4, line, sep='')
-        print(reprString(helicopter.content))
-        helicopter = helicopter.below
-        if helicopter is None:
-            break
-        print('\nDuring handling of the above exception, the below occured:\n')
+def runBundle(
+    bundle_filename, optimize = False, resolve = True, 
+    engine = TREE_ENGINE, 
+):
+    bundle = Bundle(bundle_filename)
+    runTime = BundleRunTime(bundle, optimize, resolve, engine)
+    try:
+        runTime.imPort(bundle.entry, '__main__')
+    except Helicopter as h:
+        printStackTrace(h)
+    finally:
+        runTime.shutdown()
+        bundle.close()
+
+def disassembleScript(
+    entry_filename, lexer_engine = CHAR_ENGINE, use_cache = True, 
+    optimize = False, 
+):
+    _, filename = os.path.split(entry_filename)
+    name, _ = os.path.splitext(filename)
+    root = loadMST(entry_filename, lexer_engine, use_cache)
+    if optimize:
+        optimizeModule(root)
+    disassemble(compileModule(root, f'<module {name}>'))
+
+def transpileScript(
+    entry_filename, out_filename, lexer_engine = CHAR_ENGINE, 
+    use_cache = True, optimize = False, 
+):
+    source = transpileProgram(
+        entry_filename, lexer_engine, use_cache, optimize, out_filename, 
+    )
+    with open(out_filename, 'w', encoding='utf-8') as f:
+        f.write(source)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -41,17 +71,84 @@ def main():
         'scriptname', type=str, nargs='?', default=None, 
         help='filename of the miniPy script to be executed', 
     )
-    scriptname = parser.parse_args().scriptname
-    scriptname = 'test.minipy'
+    parser.add_argument(
+        '--lexer', choices=LEXER_ENGINES, default=CHAR_ENGINE, 
+        help='tokenizer engine', 
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true', 
+        help=f'do not read or write parsed modules in {CACHE_DIRNAME}', 
+    )
+    parser.add_argument(
+        '--no-prefetch', action='store_true', 
+        help='do not parse imported modules ahead of time in other processes', 
+    )
+    parser.add_argument(
+        '--stream', action='store_true', 
+        help='execute each top-level statement as soon as it is parsed', 
+    )
+    parser.add_argument(
+        '-O', '--optimize', action='store_true', 
+        help='fold constants and prune dead code before running; assumes the program does not reassign methods of int, float, str or bool', 
+    )
+    parser.add_argument(
+        '--no-resolve', action='store_true', 
+        help='look up every name by walking the environment, instead of resolving scopes ahead', 
+    )
+    parser.add_argument(
+        '--engine', choices=ENGINES, default=TREE_ENGINE, 
+        help='execution engine: walk the MST, compile it to bytecode, or to closures', 
+    )
+    parser.add_argument(
+        '--dis', action='store_true', 
+        help='print the bytecode of the script instead of running it', 
+    )
+    parser.add_argument(
+        '--transpile', type=str, default=None, metavar='OUT', 
+        help='write the program, with what it imports, as Python to OUT instead of running it', 
+    )
+    parser.add_argument(
+        '--bundle', type=str, default=None, metavar='OUT', 
+        help=f'write the program, with what it imports, parsed into one *{BUNDLE_EXTENSION} file OUT instead of running it', 
+    )
+    args = parser.parse_args()
+    scriptname = args.scriptname
     if scriptname is None:
         repl()
     else:
         filename = os.path.abspath(scriptname)
         with open(filename, 'r') as _:
             pass    # just to check permission, isfile...
-        runScript(filename)
+        if filename.endswith(BUNDLE_EXTENSION):
+            runBundle(
+                filename, args.optimize, not args.no_resolve, args.engine, 
+            )
+            return
+        if args.dis:
+            disassembleScript(
+                filename, args.lexer, not args.no_cache, args.optimize, 
+            )
+            return
+        if args.transpile is not None:
+            transpileScript(
+                filename, args.transpile, args.lexer, 
+                not args.no_cache, args.optimize, 
+            )
+            return
+        if args.bundle is not None:
+            writeBundle(
+                args.bundle, filename, args.lexer, not args.no_cache, 
+            )
+            return
+        runScript(
+            filename, args.lexer, not args.no_cache, 
+            not args.no_prefetch, args.stream, args.optimize, 
+            not args.no_resolve, args.engine, 
+        )
 
 def repl():
     print('Under construction')
 
-main()
+if __name__ == '__main__':
+    # Guarded, since process pool workers may import this module.
+    main()
@@ -0,0 +1,295 @@
+'''
+Front-end benchmark: lexer, CmdsParser and Sequence.parse throughput,
+and peak memory, over generated corpora. Lexems are held in a 
+TokenStream between the lexer and the parser.
+`python benchmark.py` compares against the stored baselines and
+exits with 1 if anything regressed by more than `--threshold`.
+`python benchmark.py --save` stores the current numbers as baselines.
+Throughput depends on the machine, so baselines are not committed,
+and they only gate runs on the host that saved them. Elsewhere, save
+your own first.
+'''
+import sys
+import json
+import random
+import platform
+import argparse
+import tracemalloc
+from io import StringIO
+from time import perf_counter
+from lexer import Lexer, LEXER_ENGINES, REGEX_ENGINE
+from parSer import CmdsParser, Sequence
+from tokenstream import TokenStream
+
+BASELINE_FILENAME = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = .2
+
+# (metric, higher is better)
+METRICS = (
+    ('lexems/s'           , True ),
+    ('parsed lexems/s'    , True ),
+    ('cmdTrees/s'         , True ),
+    ('Sequence cmdTrees/s', True ),
+    ('peak KiB'           , False),
+)
+
+def nestedExpressions(rand : random.Random):
+    lines = []
+    for i in range(400):
+        expr = rand.choice('abcdef')
+        for _ in range(rand.randint(10, 40)):
+            operator = rand.choice(('+', '-', '*', '/', '==', 'and'))
+            operand = rand.choice(('x', 'y', '1', '2.5', 'f(z)', 'l[3]'))
+            if rand.random() < .5:
+                expr = '(' + expr + ' ' + operator + ' ' + operand + ')'
+            else:
+                expr = '(' + operand + ' ' + operator + ' ' + expr + ')'
+        lines.append(f'v{i} = {expr}\n')
+    return ''.join(lines)
+
+def operatorChains(rand : random.Random):
+    lines = []
+    for i in range(100):
+        terms = [rand.choice(('a', 'b', 'c', '1', '7', 'd.e'))]
+        for _ in range(200):
+            terms.append(rand.choice(('+', '-', '*', '%', '<', 'or')))
+            terms.append(rand.choice(('a', 'b', 'c', '1', '7', 'd.e')))
+        lines.append(f'v{i} = ' + ' '.join(terms) + '\n')
+    return ''.join(lines)
+
+def hugeDisplays(rand : random.Random):
+    lines = ['d = {\n']
+    for i in range(1000):
+        lines.append(f"    'key{i}': {rand.randint(0, 9999)}, \n")
+    lines.append('}\n')
+    lines.append('l = [\n')
+    for i in range(1000):
+        lines.append(f'    [{i}, {i + 1}, "s{i}"], \n')
+    lines.append(']\n')
+    return ''.join(lines)
+
+def longModule(rand : random.Random):
+    lines = []
+    while len(lines) < 10000:
+        kind = rand.randrange(5)
+        if kind == 0:
+            lines.append('x = x + 1\n')
+        elif kind == 1:
+            lines.append('print(x, y[0], z.w)\n')
+        elif kind == 2:
+            lines += [
+                'if x < 10:\n',
+                '    y = [x, x * 2]\n',
+                'elif x == 3:\n',
+                '    pass\n',
+                'else:\n',
+                '    y = {1: x}\n',
+            ]
+        elif kind == 3:
+            lines += [
+                'while x > 0:\n',
+                '    x = x - 1\n',
+                '    if x == 5:\n',
+                '        break\n',
+            ]
+        else:
+            lines += [
+                'for i of range(3):\n',
+                '    # a comment\n',
+                '    z = i ** 2\n',
+                '\n',
+            ]
+    return ''.join(lines)
+
+def manyFunctions(rand : random.Random):
+    lines = []
+    for i in range(2000):
+        lines += [
+            f'def f{i}(a, b, c = {rand.randint(0, 9)}):\n',
+            f'    d = a * b + c\n',
+            f'    return g{i}(d, a)\n',
+            '\n',
+        ]
+    return ''.join(lines)
+
+CORPORA = {
+    'nested expressions': nestedExpressions,
+    'operator chains'   : operatorChains,
+    'huge displays'     : hugeDisplays,
+    '10k-line module'   : longModule,
+    'many functions'    : manyFunctions,
+}
+
+MIN_SAMPLE_SECONDS = .05
+
+def bestOf(repeat, f):
+    '''
+    Seconds per call, best of `repeat` samples. A sample calls `f` 
+    as many times as it takes to last MIN_SAMPLE_SECONDS, so tiny 
+    workloads are not lost in timer noise.  
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        n_calls = 0
+        start = perf_counter()
+        while True:
+            result = f()
+            n_calls += 1
+            elapsed = perf_counter() - start
+            if elapsed >= MIN_SAMPLE_SECONDS:
+                break
+        best = min(best, elapsed / n_calls)
+    return best, result
+
+def benchmark(source, lexer_engine = REGEX_ENGINE, repeat = 3):
+    seconds, stream = bestOf(repeat, lambda : TokenStream(
+        Lexer(StringIO(source), lexer_engine), 
+    ))
+    lex_rate = len(stream) / seconds
+
+    seconds, cmdTrees = bestOf(repeat, lambda : [
+        *CmdsParser(stream.lexems(), '<benchmark>')
+    ])
+    parse_rate = len(stream) / seconds
+    cmd_rate = len(cmdTrees) / seconds
+
+    def structure():
+        root = Sequence()
+        root.parse(iter(cmdTrees))
+        return root
+    seconds, _ = bestOf(repeat, structure)
+    sequence_rate = len(cmdTrees) / seconds
+
+    tracemalloc.start()
+    try:
+        root = Sequence()
+        root.parse(CmdsParser(
+            Lexer(StringIO(source), lexer_engine), '<benchmark>',
+        ))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'lexems/s'           : lex_rate,
+        'parsed lexems/s'    : parse_rate,
+        'cmdTrees/s'         : cmd_rate,
+        'Sequence cmdTrees/s': sequence_rate,
+        'peak KiB'           : peak / 1024,
+    }
+
+def regressions(results, baselines, threshold = DEFAULT_THRESHOLD):
+    # yields (corpus, metric, baseline, now)
+    for corpus, result in results.items():
+        try:
+            baseline = baselines[corpus]
+        except KeyError:
+            continue
+        for metric, higher_is_better in METRICS:
+            if metric not in baseline:
+                continue
+            old = baseline[metric]
+            new = result[metric]
+            if higher_is_better:
+                regressed = new < old * (1 - threshold)
+            else:
+                regressed = new > old * (1 + threshold)
+            if regressed:
+                yield corpus, metric, old, new
+
+def hostDescription():
+    return [
+        platform.node(), platform.machine(), 
+        platform.python_implementation(), platform.python_version(), 
+    ]
+
+def formatNumber(x):
+    if x >= 100:
+        return f'{x:,.0f}'
+    return f'{x:.3g}'
+
+def printTable(results, baselines):
+    print(f'{"corpus":<20}', *[
+        f'{metric:>22}' for metric, _ in METRICS
+    ], sep='')
+    for corpus, result in results.items():
+        print(f'{corpus:<20}', end='')
+        for metric, _ in METRICS:
+            cell = formatNumber(result[metric])
+            try:
+                old = baselines[corpus][metric]
+            except KeyError:
+                pass
+            else:
+                cell += f' ({result[metric] / old - 1:+.0%})'
+            print(f'{cell:>22}', end='')
+        print()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='miniPy front-end benchmark',
+    )
+    parser.add_argument(
+        '--lexer', choices=LEXER_ENGINES, default=REGEX_ENGINE,
+        help='tokenizer engine',
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='timings are the best of this many runs',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='relative slowdown that counts as a regression',
+    )
+    parser.add_argument(
+        '--baseline', type=str, default=BASELINE_FILENAME,
+        help='where baselines are stored',
+    )
+    parser.add_argument(
+        '--save', action='store_true',
+        help='store the results as the new baselines',
+    )
+    parser.add_argument(
+        '--only', type=str, nargs='*', choices=CORPORA, default=None,
+        help='corpora to run',
+    )
+    args = parser.parse_args()
+    host = hostDescription()
+    try:
+        with open(args.baseline, 'r') as f:
+            all_baselines = json.load(f)
+    except FileNotFoundError:
+        all_baselines = {}
+    if all_baselines.get('host') != host:
+        if all_baselines:
+            print(
+                'Ignoring', args.baseline, 
+                'as it was saved on another host:', all_baselines.get('host'), 
+            )
+        all_baselines = {'host': host}
+    baselines = all_baselines.get(args.lexer, {})
+
+    results = {}
+    for corpus in args.only or CORPORA:
+        source = CORPORA[corpus](random.Random(corpus))
+        results[corpus] = benchmark(source, args.lexer, args.repeat)
+    printTable(results, baselines)
+
+    if args.save:
+        baselines.update(results)
+        all_baselines[args.lexer] = baselines
+        with open(args.baseline, 'w') as f:
+            json.dump(all_baselines, f, indent=2, sort_keys=True)
+        print('Baselines saved to', args.baseline)
+        return
+    regressed = [*regressions(results, baselines, args.threshold)]
+    for corpus, metric, old, new in regressed:
+        print(
+            f'REGRESSION: {corpus}, {metric}: '
+            + formatNumber(old) + ' -> ' + formatNumber(new),
+        )
+    if regressed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+'''
+Single-file program bundles. `writeBundle` parses the entry module and
+every module it imports into one file:
+
+    MAGIC, offset of the index, pickled MST of each module, index
+
+The index maps module names to filenames, relative to the entry's
+directory, and filenames to where their MST is. `BundleRunTime`
+imports from a bundle through one mmap: a module is unpickled when it
+is first imported, and never looked for on disk.
+'''
+import os
+import mmap
+import pickle
+import struct
+from lexer import CHAR_ENGINE
+from minipyc import interpreterVersion
+from prefetch import importedNames
+from runtime import RunTime, TREE_ENGINE
+
+BUNDLE_EXTENSION = '.minipyb'
+MAGIC = b'miniPy bundle\n'
+OFFSET = struct.Struct('<Q')
+
+def collectProgram(entry_filename, lexer_engine, use_cache):
+    '''
+    Finds the modules of the program as `RunTime.imPort` would.
+    Returns the entry's name, {name: filename} and {filename: MST}.
+    '''
+    dir_location, filename = os.path.split(entry_filename)
+    entry, _ = os.path.splitext(filename)
+    runTime = RunTime(dir_location, lexer_engine, use_cache, prefetch = False)
+    names = {}
+    roots = {}
+    todo = [(entry, os.path.normpath(entry_filename))]
+    while todo:
+        name, filename = todo.pop()
+        names[name] = filename
+        if filename in roots:
+            continue
+        root = runTime.loadMST(filename)
+        roots[filename] = root
+        for imported in importedNames(root):
+            if imported not in names:
+                found = runTime.findFile(imported)
+                if found is not None:
+                    # Not found is an ImportError, once it runs.
+                    todo.append((imported, found))
+    return entry, names, roots
+
+def writeBundle(
+    out_filename, entry_filename, lexer_engine = CHAR_ENGINE,
+    use_cache = True,
+):
+    entry, names, roots = collectProgram(
+        entry_filename, lexer_engine, use_cache,
+    )
+    dir_location = os.path.dirname(os.path.abspath(entry_filename))
+    def relative(filename):
+        return os.path.relpath(os.path.abspath(filename), dir_location)
+    where = {}
+    with open(out_filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(OFFSET.pack(0))
+        for filename, root in roots.items():
+            start = f.tell()
+            pickle.dump(root, f, pickle.HIGHEST_PROTOCOL)
+            where[relative(filename)] = (start, f.tell() - start)
+        index_offset = f.tell()
+        pickle.dump((
+            interpreterVersion(), entry,
+            {name: relative(filename) for name, filename in names.items()},
+            where,
+        ), f, pickle.HIGHEST_PROTOCOL)
+        f.seek(len(MAGIC))
+        f.write(OFFSET.pack(index_offset))
+
+class Bundle:
+    '''
+    An open bundle. Its filenames, which key the imported modules, are
+    taken to be next to it. Tracebacks still name the sources parsed.
+    '''
+    def __init__(self, filename):
+        self.dir_location = os.path.dirname(os.path.abspath(filename))
+        with open(filename, 'rb') as f:
+            try:
+                self.buffer = mmap.mmap(
+                    f.fileno(), 0, access = mmap.ACCESS_READ,
+                )
+            except ValueError:
+                # empty
+                raise ValueError(f'"{filename}" is not a miniPy bundle.')
+        try:
+            if self.buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError(f'"{filename}" is not a miniPy bundle.')
+            index_offset, = OFFSET.unpack_from(self.buffer, len(MAGIC))
+            version, self.entry, names, where = pickle.loads(
+                self.buffer[index_offset:],
+            )
+            if version != interpreterVersion():
+                raise ValueError(
+                    f'"{filename}" was bundled by another version of '
+                    + 'miniPy. Bundle it again.'
+                )
+        except Exception:
+            self.buffer.close()
+            raise
+        self.filenames = {
+            name: self.absolute(relative)
+            for name, relative in names.items()
+        }
+        self.where = {
+            self.absolute(relative): span
+            for relative, span in where.items()
+        }
+
+    def absolute(self, relative):
+        return os.path.normpath(os.path.join(self.dir_location, relative))
+
+    def loadMST(self, filename):
+        start, length = self.where[filename]
+        with memoryview(self.buffer) as view:
+            return pickle.loads(view[start : start + length])
+
+    def close(self):
+        self.buffer.close()
+
+class BundleRunTime(RunTime):
+    '''
+    Imports the modules of a bundle from it. Modules that were not
+    bundled are looked for as usual.
+    '''
+    def __init__(
+        self, bundle : Bundle, optimize = False, resolve = True,
+        engine = TREE_ENGINE,
+    ):
+        super().__init__(
+            bundle.dir_location, prefetch = False, optimize = optimize,
+            resolve = resolve, engine = engine,
+        )
+        self.bundle = bundle
+
+    def findFile(self, name):
+        try:
+            return self.bundle.filenames[name]
+        except KeyError:
+            return super().findFile(name)
+
+    def loadMST(self, filename):
+        try:
+            return self.bundle.loadMST(filename)
+        except KeyError:
+            return super().loadMST(filename)
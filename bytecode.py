@@ -0,0 +1,736 @@
+'''
+Compiles an MST into `Code`: a flat array of instructions, each an
+opcode and one argument, with the constants and names they refer to,
+a line table and an exception table. vm.py runs it.
+Function bodies are compiled on their first call, and class bodies
+when they run, so a module only pays for what it uses.
+Usage: python bytecode.py script.minipy
+'''
+from array import array
+from lexems import *
+from parSer import (
+    CmdTree, Sequence, FunctionArg, Name, Const, Empty, Parened,
+    TupleDisplay, ListDisplay, SetDisplay, DictDisplay, Call,
+    Attribute, Subscript, Slice, BinOp, UnaryOp, ListComp,
+    AssignCmd, ExpressionCmd, IsNot, NotIn, UnaryNegate,
+    Inlined, Conditional, WhileLoop, ForLoop, TryExcept,
+    FunctionDefinition, ClassDefinition,
+)
+from runtime import isRangeCall
+
+OPNAMES = (
+    'POP_TOP', 'COPY',
+    'LOAD_CONST', 'LOAD_NONE', 'LOAD_NAME', 'STORE_NAME',
+    'STORE_IDENTIFIER', 'STORE_TARGET', 'DELETE',
+    'LOAD_ATTR', 'STORE_ATTR', 'LOAD_SUBSCR', 'STORE_SUBSCR',
+    'BUILD_SLICE', 'BINARY', 'UNARY_NEGATE', 'UNARY_NOT',
+    'CALL', 'CALL_KW', 'CALL_INLINED',
+    'BUILD_TUPLE', 'BUILD_LIST', 'BUILD_SET', 'BUILD_DICT', 'UNPACK',
+    'JUMP', 'POP_JUMP_IF_FALSE',
+    'JUMP_IF_TRUE_OR_POP', 'JUMP_IF_FALSE_OR_POP',
+    'GET_ITER', 'GET_RANGE_ITER', 'FOR_ITER',
+    'NEW_BUFFER', 'APPEND_BUFFER', 'FINISH_LIST',
+    'PUSH_SCOPE', 'POP_SCOPE',
+    'MAKE_FUNCTION', 'MAKE_CLASS', 'EXEC_CMD',
+    'RAISE', 'RERAISE', 'CHECK_CATCHABLE', 'EXC_MATCH', 'CHAIN_BELOW',
+    'FAIL', 'SIGNAL', 'RETURN_VALUE', 'END',
+)
+(
+    POP_TOP, COPY,
+    LOAD_CONST, LOAD_NONE, LOAD_NAME, STORE_NAME,
+    STORE_IDENTIFIER, STORE_TARGET, DELETE,
+    LOAD_ATTR, STORE_ATTR, LOAD_SUBSCR, STORE_SUBSCR,
+    BUILD_SLICE, BINARY, UNARY_NEGATE, UNARY_NOT,
+    CALL, CALL_KW, CALL_INLINED,
+    BUILD_TUPLE, BUILD_LIST, BUILD_SET, BUILD_DICT, UNPACK,
+    JUMP, POP_JUMP_IF_FALSE,
+    JUMP_IF_TRUE_OR_POP, JUMP_IF_FALSE_OR_POP,
+    GET_ITER, GET_RANGE_ITER, FOR_ITER,
+    NEW_BUFFER, APPEND_BUFFER, FINISH_LIST,
+    PUSH_SCOPE, POP_SCOPE,
+    MAKE_FUNCTION, MAKE_CLASS, EXEC_CMD,
+    RAISE, RERAISE, CHECK_CATCHABLE, EXC_MATCH, CHAIN_BELOW,
+    FAIL, SIGNAL, RETURN_VALUE, END,
+) = range(len(OPNAMES))
+
+JUMPS = (
+    JUMP, POP_JUMP_IF_FALSE, JUMP_IF_TRUE_OR_POP, JUMP_IF_FALSE_OR_POP,
+    FOR_ITER,
+)
+
+# The argument of BINARY is an index into this.
+BINARY_OPERATIONS = (
+    ToPowerOf, Times, Divide, ModDiv, Plus, Minus,
+    Is, IsNot, In, NotIn,
+    Equal, NotEqual, LessThan, GreaterThan,
+    LessThanOrEqual, GreaterThanOrEqual,
+)
+BINARY_INDEX = {op: i for i, op in enumerate(BINARY_OPERATIONS)}
+
+# The argument of SIGNAL
+SIGNAL_BREAK = 0
+SIGNAL_CONTINUE = 1
+
+# Instructions on line 0 do not add to the miniPy traceback, just as
+# their counterparts in the tree walker are outside any cmdTree.
+NO_LINE = 0
+
+class Code:
+    '''
+    `instructions` holds (opcode, argument) pairs, so a pc is always
+    even. `lines[pc // 2]` is the line of the instruction at pc.
+    `handlers` holds (start, end, target, depth): a Helicopter raised
+    by an instruction in [start, end) trims the stack to `depth`,
+    pushes itself and continues at `target`.
+    '''
+    __slots__ = (
+        'instructions', 'constants', 'names', 'lines', 'handlers',
+        'filename', 'label',
+    )
+
+    def __init__(
+        self, instructions, constants, names, lines, handlers,
+        filename, label,
+    ):
+        self.instructions : array = instructions
+        self.constants : tuple = constants
+        self.names : tuple = names
+        self.lines : array = lines
+        self.handlers : tuple = handlers
+        self.filename : str = filename
+        self.label : str = label
+
+    def handlerAt(self, pc):
+        for start, end, target, depth in self.handlers:
+            if start <= pc < end:
+                return target, depth
+        return None
+
+    def __repr__(self):
+        return f'<Code {self.label}, {len(self.instructions) // 2} instructions>'
+
+class Label:
+    __slots__ = ('pc', )
+
+    def __init__(self):
+        self.pc = None
+
+class Handler:
+    __slots__ = ('label', 'depth')
+
+    def __init__(self, depth):
+        self.label = Label()
+        self.depth = depth
+
+class Loop:
+    __slots__ = ('top', 'end', 'depth', 'iterates')
+
+    def __init__(self, top, end, depth, iterates):
+        self.top = top
+        self.end = end
+        self.depth = depth
+        self.iterates = iterates    # a `for`, with its iterator on the stack
+
+class Finally:
+    # A `finally` that `break`, `continue` and `return` must run on
+    # their way out. Its body runs with the blocks and handlers that
+    # were in effect outside the `try`.
+    __slots__ = ('body', 'blocks', 'handlers')
+
+    def __init__(self, body, blocks, handlers):
+        self.body = body
+        self.blocks = blocks
+        self.handlers = handlers
+
+class Compiler:
+    '''
+    Compiles one body. `depth` is how many values the enclosing
+    statements keep on the stack: iterators, the classes an `except`
+    catches, the Helicopter being handled.
+    '''
+    def __init__(self, label, filename = None):
+        self.label = label
+        self.filename = filename
+        self.instructions = array('l')
+        self.lines = array('l')
+        self.handlerOf = []
+        self.constants = []
+        self.constantIndex = {}
+        self.names = []
+        self.nameIndex = {}
+        self.patches = []
+        self.line = NO_LINE
+        self.depth = 0
+        self.blocks = ()
+        self.handlers = ()
+
+    def emit(self, opcode, arg = 0):
+        if type(arg) is Label:
+            self.patches.append((len(self.instructions) + 1, arg))
+            arg = 0
+        self.instructions.append(opcode)
+        self.instructions.append(arg)
+        self.lines.append(self.line)
+        self.handlerOf.append(self.handlers[-1] if self.handlers else None)
+
+    def place(self, label : Label):
+        label.pc = len(self.instructions)
+
+    def constant(self, value):
+        if type(value) is float:
+            key = (float, repr(value))    # keeps -0.0 apart from 0.0
+        elif type(value) in (int, str, bool, type(None)):
+            key = (type(value), value)
+        else:
+            key = id(value)
+        try:
+            return self.constantIndex[key]
+        except KeyError:
+            self.constants.append(value)
+            self.constantIndex[key] = len(self.constants) - 1
+            return len(self.constants) - 1
+
+    def name(self, name):
+        # A Name node is kept as it is, for its resolved scope.
+        if type(name) is Name:
+            self.names.append(name)
+            return len(self.names) - 1
+        try:
+            return self.nameIndex[name]
+        except KeyError:
+            self.names.append(name)
+            self.nameIndex[name] = len(self.names) - 1
+            return len(self.names) - 1
+
+    def fail(self, exception_name, message):
+        self.emit(FAIL, self.constant((exception_name, message)))
+
+    def finish(self) -> Code:
+        self.emit(END)
+        for position, label in self.patches:
+            self.instructions[position] = label.pc
+        handlers = []
+        start = 0
+        for i in range(1, len(self.handlerOf) + 1):
+            if (
+                i == len(self.handlerOf)
+                or self.handlerOf[i] is not self.handlerOf[start]
+            ):
+                handler = self.handlerOf[start]
+                if handler is not None:
+                    handlers.append((
+                        start * 2, i * 2, handler.label.pc, handler.depth,
+                    ))
+                start = i
+        return Code(
+            self.instructions, tuple(self.constants), tuple(self.names),
+            self.lines, tuple(handlers), self.filename, self.label,
+        )
+
+    def compileSequence(self, sequence):
+        for element in sequence:
+            _type = type(element)
+            if _type is CmdTree:
+                self.compileCmdTree(element)
+            elif _type is Conditional:
+                self.compileConditional(element)
+            elif _type is WhileLoop:
+                self.compileWhileLoop(element)
+            elif _type is ForLoop:
+                self.compileForLoop(element)
+            elif _type is TryExcept:
+                self.compileTryExcept(element)
+            elif _type is FunctionDefinition:
+                self.compileFunctionDefinition(element)
+            elif _type is ClassDefinition:
+                self.compileClassDefinition(element)
+
+    def compileCmdTree(self, cmdTree : CmdTree):
+        if self.filename is None:
+            self.filename = cmdTree.filename
+        self.line = cmdTree.line_number
+        cmdType = cmdTree.type
+        if cmdType is ExpressionCmd:
+            self.compileExpression(cmdTree[0])
+            self.emit(POP_TOP, 1)
+        elif cmdType is AssignCmd:
+            self.compileExpression(cmdTree[1])
+            self.compileStore(cmdTree[0])
+        elif cmdType is Return:
+            if cmdTree:
+                self.compileExpression(cmdTree[0])
+            else:
+                self.emit(LOAD_NONE)
+            self.depth += 1
+            self.unwind(None)
+            self.depth -= 1
+            self.line = cmdTree.line_number
+            self.emit(RETURN_VALUE)
+        elif cmdType is Raise:
+            self.compileExpression(cmdTree[0])
+            self.emit(RAISE)
+        elif cmdType in (Break, Continue):
+            self.compileJumpOut(cmdType)
+        elif cmdType is Del:
+            self.emit(DELETE, self.constant(cmdTree[0]))
+        elif cmdType in (Import, From):
+            # Rare, and entangled with circular imports: left to the
+            # tree walker.
+            self.emit(EXEC_CMD, self.constant(cmdTree))
+
+    def unwind(self, loop):
+        # Runs the `finally`s between here and `loop`, innermost first.
+        blocks, handlers = self.blocks, self.handlers
+        for block in reversed(blocks):
+            if block is loop:
+                break
+            if type(block) is Finally:
+                self.blocks, self.handlers = block.blocks, block.handlers
+                self.compileSequence(block.body)
+        self.blocks, self.handlers = blocks, handlers
+
+    def compileJumpOut(self, cmdType):
+        line = self.line
+        for block in reversed(self.blocks):
+            if type(block) is Loop:
+                loop = block
+                break
+        else:
+            loop = None
+        self.unwind(loop)
+        self.line = line
+        if loop is None:
+            # As the tree walker does, it escapes the function.
+            if cmdType is Break:
+                self.emit(SIGNAL, SIGNAL_BREAK)
+            else:
+                self.emit(SIGNAL, SIGNAL_CONTINUE)
+            return
+        n_pops = self.depth - loop.depth
+        if cmdType is Break and loop.iterates:
+            n_pops += 1
+        if n_pops:
+            self.emit(POP_TOP, n_pops)
+        if cmdType is Break:
+            self.emit(JUMP, loop.end)
+        else:
+            self.emit(JUMP, loop.top)
+
+    def compileConditional(self, conditional : Conditional):
+        end = Label()
+        branches = [(conditional.condition, conditional.then)]
+        for elIf in conditional.elIfs:
+            branches.append((elIf.condition, elIf.then))
+        for condition, then in branches:
+            skip = Label()
+            self.line = condition.line_number
+            self.compileExpression(condition[0])
+            self.emit(POP_JUMP_IF_FALSE, skip)
+            self.compileSequence(then)
+            self.emit(JUMP, end)
+            self.place(skip)
+        if conditional._else is not None:
+            self.compileSequence(conditional._else)
+        self.place(end)
+
+    def compileLoopBody(self, loop, body):
+        blocks = self.blocks
+        self.blocks = (*blocks, loop)
+        self.compileSequence(body)
+        self.blocks = blocks
+        self.emit(JUMP, loop.top)
+
+    def compileWhileLoop(self, whileLoop : WhileLoop):
+        top = Label()
+        orElse = Label()
+        end = Label()
+        self.place(top)
+        self.line = whileLoop.condition.line_number
+        self.compileExpression(whileLoop.condition[0])
+        self.emit(POP_JUMP_IF_FALSE, orElse)
+        self.compileLoopBody(
+            Loop(top, end, self.depth, False), whileLoop.body,
+        )
+        self.place(orElse)
+        if whileLoop._else is not None:
+            self.compileSequence(whileLoop._else)
+        self.place(end)
+
+    def compileForLoop(self, forLoop : ForLoop):
+        top = Label()
+        orElse = Label()
+        end = Label()
+        self.line = forLoop.condition.line_number
+        iterable = forLoop.condition[1]
+        if isRangeCall(iterable):
+            # arguments, then the callee, as compileCall does
+            for funcArg in iterable.args:
+                self.compileExpression(funcArg.value)
+            self.compileExpression(iterable.func)
+            self.emit(GET_RANGE_ITER, len(iterable.args))
+        else:
+            self.compileExpression(iterable)
+            self.emit(GET_ITER)
+        self.depth += 1
+        self.place(top)
+        self.line = forLoop.condition.line_number
+        self.emit(FOR_ITER, orElse)
+        self.line = NO_LINE
+        self.compileStore(forLoop.condition[0])
+        self.compileLoopBody(
+            Loop(top, end, self.depth, True), forLoop.body,
+        )
+        self.depth -= 1
+        self.place(orElse)
+        if forLoop._else is not None:
+            self.compileSequence(forLoop._else)
+        self.place(end)
+
+    def compileTryExcept(self, tryExcept : TryExcept):
+        '''
+        Like the tree walker, evaluates what every `except` catches
+        first, and chains a Helicopter raised in a handler below the
+        one it was handling.
+        '''
+        depth = self.depth
+        n_catches = len(tryExcept.oneCatches)
+        for oneCatch in tryExcept.oneCatches:
+            self.line = oneCatch.catching.line_number
+            self.compileExpression(oneCatch.catching[0])
+            self.line = NO_LINE
+            self.emit(CHECK_CATCHABLE)
+            self.depth += 1
+        blocks, handlers = self.blocks, self.handlers
+        normal = Label()
+        _finally = None
+        if tryExcept._finally is not None:
+            _finally = Handler(self.depth)
+            self.handlers = (*self.handlers, _finally)
+            self.blocks = (*self.blocks, Finally(
+                tryExcept._finally, blocks, handlers,
+            ))
+        if n_catches:
+            catch = Handler(self.depth)
+            self.handlers = (*self.handlers, catch)
+        self.compileSequence(tryExcept._try)
+        if n_catches:
+            self.handlers = self.handlers[:-1]
+        if tryExcept._else is not None:
+            self.compileSequence(tryExcept._else)
+        self.line = NO_LINE
+        self.emit(JUMP, normal)
+        if n_catches:
+            self.place(catch.label)
+            self.depth += 1
+            for i, oneCatch in enumerate(tryExcept.oneCatches):
+                skip = Label()
+                self.line = NO_LINE
+                self.emit(COPY, n_catches - i + 1)
+                self.emit(EXC_MATCH)
+                self.emit(POP_JUMP_IF_FALSE, skip)
+                chain = Handler(self.depth)
+                self.handlers = (*self.handlers, chain)
+                self.compileSequence(oneCatch.handler)
+                self.handlers = self.handlers[:-1]
+                self.line = NO_LINE
+                self.emit(POP_TOP, 1)
+                self.emit(JUMP, normal)
+                self.place(chain.label)
+                self.emit(CHAIN_BELOW)
+                self.emit(RERAISE)
+                self.place(skip)
+            self.emit(RERAISE)
+            self.depth -= 1
+        self.blocks, self.handlers = blocks, handlers
+        self.place(normal)
+        if _finally is not None:
+            self.compileSequence(tryExcept._finally)
+        self.line = NO_LINE
+        if n_catches:
+            self.emit(POP_TOP, n_catches)
+        if _finally is not None:
+            end = Label()
+            self.emit(JUMP, end)
+            self.place(_finally.label)
+            self.depth += 1
+            self.compileSequence(tryExcept._finally)
+            self.line = NO_LINE
+            self.emit(RERAISE)
+            self.place(end)
+        self.depth = depth
+
+    def compileFunctionDefinition(self, function : FunctionDefinition):
+        self.line = function._def.line_number
+        identifier, *args = function._def
+        arg_names = set()
+        default_names = []
+        mandatory_args_finished = False
+        for arg in args:
+            arg : FunctionArg
+            name = arg.name
+            if name in arg_names:
+                self.fail('TypeError', 'Duplicate argument name ' + name)
+                return
+            arg_names.add(name)
+            if arg.value is None:
+                if mandatory_args_finished:
+                    self.fail('TypeError', f'''Mandatory argument {
+                        name
+                    } after optional argument.''')
+                    return
+            else:
+                mandatory_args_finished = True
+                self.compileExpression(arg.value)
+                default_names.append(name)
+        self.emit(MAKE_FUNCTION, self.constant(
+            (function, tuple(default_names)),
+        ))
+        self.line = NO_LINE
+        self.emit(STORE_IDENTIFIER, self.name(identifier.value))
+
+    def compileClassDefinition(self, classDefinition : ClassDefinition):
+        self.line = classDefinition._class.line_number
+        # MAKE_CLASS pops the base only if there is one.
+        identifier, *expressionTrees = classDefinition._class
+        for expressionTree in expressionTrees:
+            self.compileExpression(expressionTree)
+        self.line = NO_LINE
+        self.emit(MAKE_CLASS, self.constant(classDefinition))
+        self.emit(STORE_IDENTIFIER, self.name(identifier.value))
+
+    def compileExpression(self, eTree):
+        eType = type(eTree)
+        if eType is Name:
+            self.emit(LOAD_NAME, self.name(eTree))
+        elif eType is Const:
+            self.emit(LOAD_CONST, self.constant(eTree.value))
+        elif eType is BinOp:
+            operation = eTree.op
+            self.compileExpression(eTree.left)
+            if operation in (Or, And):
+                end = Label()
+                if operation is Or:
+                    self.emit(JUMP_IF_TRUE_OR_POP, end)
+                else:
+                    self.emit(JUMP_IF_FALSE_OR_POP, end)
+                self.compileExpression(eTree.right)
+                self.place(end)
+            else:
+                self.compileExpression(eTree.right)
+                self.emit(BINARY, BINARY_INDEX[operation])
+        elif eType is Call:
+            self.compileCall(eTree)
+        elif eType is Attribute:
+            self.compileExpression(eTree.value)
+            self.emit(LOAD_ATTR, self.name(eTree.attr))
+        elif eType is Subscript:
+            self.compileExpression(eTree.value)
+            self.compileExpression(eTree.index)
+            self.emit(LOAD_SUBSCR)
+        elif eType is Slice:
+            self.compileSlice(eTree)
+            self.emit(LOAD_SUBSCR)
+        elif eType is UnaryOp:
+            self.compileExpression(eTree.operand)
+            if eTree.op is UnaryNegate:
+                self.emit(UNARY_NEGATE)
+            elif eTree.op is Not:
+                self.emit(UNARY_NOT)
+        elif eType is Parened:
+            self.compileExpression(eTree.value)
+        elif eType in (TupleDisplay, ListDisplay, SetDisplay):
+            for x in eTree.elements:
+                self.compileExpression(x)
+            self.emit({
+                TupleDisplay: BUILD_TUPLE,
+                ListDisplay : BUILD_LIST,
+                SetDisplay  : BUILD_SET,
+            }[eType], len(eTree.elements))
+        elif eType is DictDisplay:
+            for keyTree, valueTree in zip(eTree.keys, eTree.values):
+                self.compileExpression(keyTree)
+                self.compileExpression(valueTree)
+            self.emit(BUILD_DICT, len(eTree.keys))
+        elif eType is Empty:
+            self.emit(LOAD_NONE)
+        elif eType is ListComp:
+            self.compileListComp(eTree)
+        elif eType is Inlined:
+            # The arguments and the callee, as for the call. What the
+            # function returns is walked by `runtime.callInlined`.
+            for funcArg in eTree.call.args:
+                self.compileExpression(funcArg.value)
+            self.compileExpression(eTree.call.func)
+            self.emit(CALL_INLINED, self.constant(eTree))
+
+    def compileCall(self, call : Call):
+        # Arguments first, then the function, as the tree walker does.
+        keyword_names = []
+        positional_finished = False
+        for funcArg in call.args:
+            funcArg : FunctionArg
+            if funcArg.name is None:
+                if positional_finished:
+                    self.fail(
+                        'TypeError',
+                        'Positional argument after named arguments.',
+                    )
+                    return
+            else:
+                positional_finished = True
+                if funcArg.name in keyword_names:
+                    self.fail(
+                        'TypeError',
+                        'Duplicate argument `' + funcArg.name + '`. ',
+                    )
+                    return
+                keyword_names.append(funcArg.name)
+            self.compileExpression(funcArg.value)
+        self.compileExpression(call.func)
+        n_positional = len(call.args) - len(keyword_names)
+        if keyword_names:
+            self.emit(CALL_KW, self.constant(
+                (n_positional, tuple(keyword_names)),
+            ))
+        else:
+            self.emit(CALL, n_positional)
+
+    def compileSlice(self, eTree : Slice):
+        self.compileExpression(eTree.value)
+        self.compileExpression(eTree.start)
+        self.compileExpression(eTree.stop)
+        self.compileExpression(eTree.step)
+        self.emit(BUILD_SLICE)
+
+    def compileListComp(self, listComp : ListComp):
+        top = Label()
+        done = Label()
+        self.emit(NEW_BUFFER)
+        self.compileExpression(listComp.iterable)
+        self.emit(GET_ITER)
+        self.emit(PUSH_SCOPE)
+        self.place(top)
+        self.emit(FOR_ITER, done)
+        self.compileStore(listComp.target)
+        if listComp.condition is not None:
+            self.compileExpression(listComp.condition)
+            self.emit(POP_JUMP_IF_FALSE, top)
+        self.compileExpression(listComp.element)
+        self.emit(APPEND_BUFFER)
+        self.emit(JUMP, top)
+        self.place(done)
+        self.emit(POP_SCOPE)
+        self.emit(FINISH_LIST)
+
+    def compileStore(self, slot):
+        _type = type(slot)
+        if _type is Name:
+            self.emit(STORE_NAME, self.name(slot))
+        elif _type is Parened:
+            self.compileStore(slot.value)
+        elif _type in (ListDisplay, TupleDisplay):
+            self.emit(UNPACK, len(slot.elements))
+            for subSlot in slot.elements:
+                self.compileStore(subSlot)
+        elif _type is Attribute:
+            self.compileExpression(slot.value)
+            self.emit(STORE_ATTR, self.name(slot.attr))
+        elif _type is Subscript:
+            self.compileExpression(slot.value)
+            self.compileExpression(slot.index)
+            self.emit(STORE_SUBSCR)
+        elif _type is Slice:
+            self.compileSlice(slot)
+            self.emit(STORE_SUBSCR)
+        else:
+            # Fails at run time, as in the tree walker.
+            self.emit(STORE_TARGET, self.constant(slot))
+
+def compileModule(sequence, label) -> Code:
+    compiler = Compiler(label)
+    compiler.compileSequence(sequence)
+    return compiler.finish()
+
+def compileFunction(function : FunctionDefinition) -> Code:
+    compiler = Compiler(function._def[0].value, function._def.filename)
+    compiler.compileSequence(function.body)
+    return compiler.finish()
+
+def compileClass(classDefinition : ClassDefinition) -> Code:
+    compiler = Compiler(
+        classDefinition._class[0].value, classDefinition._class.filename,
+    )
+    compiler.compileSequence(classDefinition.body)
+    return compiler.finish()
+
+def describe(code : Code, opcode, arg):
+    if opcode in JUMPS:
+        return f'to {arg}'
+    if opcode in (LOAD_NAME, STORE_NAME):
+        return code.names[arg].name
+    if opcode in (STORE_IDENTIFIER, LOAD_ATTR, STORE_ATTR):
+        return code.names[arg]
+    if opcode == BINARY:
+        return BINARY_OPERATIONS[arg].__name__
+    if opcode in (LOAD_CONST, CALL_KW, FAIL):
+        return repr(code.constants[arg])
+    if opcode == MAKE_FUNCTION:
+        function, default_names = code.constants[arg]
+        return f'{function._def[0].value}, defaults {default_names}'
+    if opcode == CALL_INLINED:
+        return code.constants[arg].function._def[0].value
+    if opcode == MAKE_CLASS:
+        return code.constants[arg]._class[0].value
+    if opcode in (DELETE, STORE_TARGET, EXEC_CMD):
+        return repr(code.constants[arg])
+    return ''
+
+def disassemble(code : Code, file = None, recursive = True):
+    '''
+    Prints `code` one instruction per line, like Python's `dis`:
+    line number, pc, opcode name, argument and what it refers to.
+    With `recursive`, also the functions and classes it defines.
+    '''
+    print(f'Disassembly of {code!r} ({code.filename}):', file = file)
+    last_line = None
+    instructions = code.instructions
+    nested = []
+    for pc in range(0, len(instructions), 2):
+        opcode = instructions[pc]
+        arg = instructions[pc + 1]
+        line = code.lines[pc // 2]
+        if line != last_line:
+            column = str(line) if line != NO_LINE else '-'
+            last_line = line
+        else:
+            column = ''
+        description = describe(code, opcode, arg)
+        if description:
+            description = f'({description})'
+        print(
+            f'{column:>5} {pc:>6} {OPNAMES[opcode]:<20} {arg:>4} {description}',
+            file = file,
+        )
+        if opcode == MAKE_FUNCTION:
+            nested.append(compileFunction(code.constants[arg][0]))
+        elif opcode == MAKE_CLASS:
+            nested.append(compileClass(code.constants[arg]))
+    for start, end, target, depth in code.handlers:
+        print(
+            f'  handler: {start} to {end} -> {target} [depth {depth}]',
+            file = file,
+        )
+    if recursive:
+        for nestedCode in nested:
+            print(file = file)
+            disassemble(nestedCode, file, recursive)
+
+if __name__ == '__main__':
+    import sys
+    from lexer import Lexer
+    from parSer import CmdsParser
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'test.minipy'
+    with open(filename, 'r', encoding='utf-8') as f:
+        root = Sequence()
+        root.parse(CmdsParser(Lexer(f), filename))
+    disassemble(compileModule(root, '<module>'))
@@ -0,0 +1,672 @@
+'''
+Compiles each MST node, once, into a Python closure that does only
+that node's work, e.g. `a + b` becomes a closure calling the closures
+of `a` and `b` and then `__add__`. The type dispatch of the tree
+walker happens at compile time instead of on every evaluation.
+Selected with `RunTime(engine = CLOSURE_ENGINE)` or `--engine closure`.
+Expression closures take the environment. Statement closures take
+(runTime, environment, label), and signal `return`, `break` and
+`continue` with the tree walker's exceptions, so the two behave alike.
+'''
+from lexems import *
+from parSer import (
+    CmdTree, Sequence, FunctionArg, Name, Const, Empty, Parened,
+    TupleDisplay, ListDisplay, SetDisplay, DictDisplay, Call,
+    Attribute, Subscript, Slice, BinOp, UnaryOp, ListComp,
+    AssignCmd, ExpressionCmd, IsNot, NotIn, UnaryNegate,
+    Inlined, Conditional, WhileLoop, ForLoop, TryExcept,
+    FunctionDefinition, ClassDefinition,
+)
+from runtime import (
+    NULL, builtin, Helicopter, ReturnAsException,
+    BreakAsException, ContinueAsException,
+    Environment, Namespace, Undefined,
+    instantiate, unprimitize, isTrue, isSame, isSubclassOf,
+    ThingIter, assignTo, executeCmdTree, recordStackTrace, reprString,
+    isRangeCall, countingLoop, callInlined,
+    quickBinary, quickSubscript, quickAttribute, callMethod,
+)
+
+METHODS = {
+    ToPowerOf         : '__pow__',
+    Times             : '__mul__',
+    Divide            : '__truediv__',
+    ModDiv            : '__mod__',
+    Plus              : '__add__',
+    Equal             : '__eq__',
+    LessThan          : '__lt__',
+    GreaterThan       : '__gt__',
+    LessThanOrEqual   : '__le__',
+    GreaterThanOrEqual: '__ge__',
+}
+
+def truth(x):
+    if x:
+        return builtin.__true__
+    return builtin.__false__
+
+def compileName(node : Name):
+    name = node.name
+    scope = node.scope
+    if scope is None:
+        def load(environment):
+            return environment.read(name)
+        return load
+    _, hops, slot = scope
+    index = -1 - hops
+    if slot is None:
+        def load(environment):
+            namespace = environment[index]
+            if name in namespace:
+                return namespace[name]
+            return environment.read(name)
+    else:
+        def load(environment):
+            thing = environment[index].values[slot]
+            if thing is NULL:
+                return environment.read(name)
+            return thing
+    return load
+
+def compileBinOp(eTree : BinOp):
+    operation = eTree.op
+    left = compileExpression(eTree.left)
+    right = compileExpression(eTree.right)
+    if operation in METHODS:
+        method = METHODS[operation]
+        def binary(environment):
+            thing = left(environment)
+            other = right(environment)
+            result = quickBinary(eTree, thing, other)
+            if result is not NULL:
+                return result
+            return callMethod(thing, method, other)
+    elif operation is Or:
+        def binary(environment):
+            thing = left(environment)
+            if isTrue(thing):
+                return thing
+            return right(environment)
+    elif operation is And:
+        def binary(environment):
+            thing = left(environment)
+            if isTrue(thing):
+                return right(environment)
+            return thing
+    elif operation is Minus:
+        def binary(environment):
+            thing = left(environment)
+            other = right(environment)
+            result = quickBinary(eTree, thing, other)
+            if result is not NULL:
+                return result
+            return callMethod(
+                thing, '__add__', callMethod(other, '__neg__'),
+            )
+    elif operation is Is:
+        def binary(environment):
+            return truth(isSame(left(environment), right(environment)))
+    elif operation is IsNot:
+        def binary(environment):
+            return truth(not isSame(left(environment), right(environment)))
+    elif operation is In:
+        def binary(environment):
+            thing = left(environment)
+            return callMethod(right(environment), '__contains__', thing)
+    elif operation is NotIn:
+        def binary(environment):
+            thing = left(environment)
+            return truth(not isTrue(
+                callMethod(right(environment), '__contains__', thing)
+            ))
+    elif operation is NotEqual:
+        def binary(environment):
+            thing = left(environment)
+            other = right(environment)
+            result = quickBinary(eTree, thing, other)
+            if result is not NULL:
+                return result
+            return truth(not isTrue(callMethod(thing, '__eq__', other)))
+    return binary
+
+def failing(evaluations, message):
+    # Evaluates what comes before a malformed argument, then raises,
+    # just like the tree walker.
+    def fail(environment):
+        for evaluate in evaluations:
+            evaluate(environment)
+        raise Helicopter(builtin.TypeError, message)
+    return fail
+
+def compileCall(eTree : Call):
+    evaluations = []
+    keyword_names = []
+    positional_finished = False
+    for funcArg in eTree.args:
+        funcArg : FunctionArg
+        if funcArg.name is None:
+            if positional_finished:
+                return failing(
+                    evaluations,
+                    'Positional argument after named arguments.',
+                )
+        else:
+            positional_finished = True
+            if funcArg.name in keyword_names:
+                return failing(
+                    evaluations,
+                    'Duplicate argument `' + funcArg.name + '`. ',
+                )
+            keyword_names.append(funcArg.name)
+        evaluations.append(compileExpression(funcArg.value))
+    func = compileExpression(eTree.func)
+    if keyword_names:
+        n_positional = len(evaluations) - len(keyword_names)
+        positionals = evaluations[:n_positional]
+        keywords = tuple(zip(keyword_names, evaluations[n_positional:]))
+        def call(environment):
+            args = [evaluate(environment) for evaluate in positionals]
+            keyword_args = {
+                name: evaluate(environment) for name, evaluate in keywords
+            }
+            return func(environment).call(*args, **keyword_args)
+    elif len(evaluations) == 1:
+        (arg, ) = evaluations
+        def call(environment):
+            thing = arg(environment)
+            return func(environment).call(thing)
+    else:
+        def call(environment):
+            args = [evaluate(environment) for evaluate in evaluations]
+            return func(environment).call(*args)
+    return call
+
+def compileSlice(eTree : Slice):
+    start = compileExpression(eTree.start)
+    stop = compileExpression(eTree.stop)
+    step = compileExpression(eTree.step)
+    def makeSlice(environment):
+        return instantiate(builtin.slice, (
+            start(environment), stop(environment), step(environment),
+        ))
+    return makeSlice
+
+def asKey(thing):
+    if thing.primitive_value is None:
+        return thing
+    return thing.primitive_value
+
+def compileListComp(eTree : ListComp):
+    iterable = compileExpression(eTree.iterable)
+    store = compileStore(eTree.target)
+    element = compileExpression(eTree.element)
+    if eTree.condition is None:
+        condition = None
+    else:
+        condition = compileExpression(eTree.condition)
+    def listComp(environment):
+        iterThing = ThingIter(iterable(environment))
+        buffer = []
+        tempEnv = Environment(environment + [Namespace()])
+        for nextThing in iterThing:
+            store(nextThing, tempEnv)
+            if condition is None or isTrue(condition(tempEnv)):
+                buffer.append(element(tempEnv))
+        return unprimitize(buffer)
+    return listComp
+
+def compileExpression(eTree):
+    eType = type(eTree)
+    if eType is Name:
+        return compileName(eTree)
+    elif eType is Const:
+        value = eTree.value
+        # A new Thing every time: Things are mutable.
+        return lambda environment : unprimitize(value)
+    elif eType is BinOp:
+        return compileBinOp(eTree)
+    elif eType is Call:
+        return compileCall(eTree)
+    elif eType is Attribute:
+        value = compileExpression(eTree.value)
+        attr = eTree.attr
+        def attribute(environment):
+            thing = value(environment)
+            result = quickAttribute(eTree, thing)
+            if result is not NULL:
+                return result
+            return thing.namespace[attr]
+        return attribute
+    elif eType is Subscript:
+        value = compileExpression(eTree.value)
+        index = compileExpression(eTree.index)
+        def subscript(environment):
+            indexee = value(environment)
+            thing = index(environment)
+            result = quickSubscript(eTree, indexee, thing)
+            if result is not NULL:
+                return result
+            return callMethod(indexee, '__getitem__', thing)
+        return subscript
+    elif eType is Slice:
+        value = compileExpression(eTree.value)
+        makeSlice = compileSlice(eTree)
+        def _slice(environment):
+            slicee = value(environment)
+            return callMethod(
+                slicee, '__getitem__', makeSlice(environment),
+            )
+        return _slice
+    elif eType is UnaryOp:
+        operand = compileExpression(eTree.operand)
+        if eTree.op is UnaryNegate:
+            return lambda environment : callMethod(
+                operand(environment), '__neg__',
+            )
+        if eTree.op is Not:
+            return lambda environment : truth(not isTrue(operand(environment)))
+    elif eType is Parened:
+        return compileExpression(eTree.value)
+    elif eType is TupleDisplay:
+        elements = [compileExpression(x) for x in eTree.elements]
+        return lambda environment : unprimitize(tuple(
+            evaluate(environment) for evaluate in elements
+        ))
+    elif eType is ListDisplay:
+        elements = [compileExpression(x) for x in eTree.elements]
+        return lambda environment : unprimitize([
+            evaluate(environment) for evaluate in elements
+        ])
+    elif eType is SetDisplay:
+        elements = [compileExpression(x) for x in eTree.elements]
+        def setDisplay(environment):
+            s = set()
+            for evaluate in elements:
+                s.add(asKey(evaluate(environment)))
+            return unprimitize(s)
+        return setDisplay
+    elif eType is DictDisplay:
+        pairs = [
+            (compileExpression(k), compileExpression(v))
+            for k, v in zip(eTree.keys, eTree.values)
+        ]
+        def dictDisplay(environment):
+            d = {}
+            for key, value in pairs:
+                keyThing = key(environment)
+                d[asKey(keyThing)] = value(environment)
+            return instantiate(builtin.dict, (d, ))
+        return dictDisplay
+    elif eType is Empty:
+        return lambda environment : builtin.__none__
+    elif eType is ListComp:
+        return compileListComp(eTree)
+    elif eType is Inlined:
+        # What the function returns is walked by `callInlined`.
+        args = [compileExpression(funcArg.value) for funcArg in eTree.call.args]
+        func = compileExpression(eTree.call.func)
+        def inlined(environment):
+            argThings = [evaluate(environment) for evaluate in args]
+            return callInlined(eTree, argThings, func(environment), environment)
+        return inlined
+
+def compileStore(slot):
+    '''
+    Returns store(thing, environment), doing what `assignTo` does.
+    '''
+    _type = type(slot)
+    if _type is Name:
+        name = slot.name
+        scope = slot.scope
+        if scope is not None and scope[2] is not None and scope[1] == 0:
+            index = scope[2]
+            def store(thing, environment):
+                environment[-1].values[index] = thing
+        else:
+            def store(thing, environment):
+                environment[-1][name] = thing
+        return store
+    elif _type is Parened:
+        return compileStore(slot.value)
+    elif _type is Attribute:
+        value = compileExpression(slot.value)
+        attr = slot.attr
+        def store(thing, environment):
+            value(environment).namespace[attr] = thing
+        return store
+    elif _type is Subscript:
+        value = compileExpression(slot.value)
+        index = compileExpression(slot.index)
+        def store(thing, environment):
+            indexee = value(environment)
+            callMethod(indexee, '__setitem__', index(environment), thing)
+        return store
+    elif _type is Slice:
+        value = compileExpression(slot.value)
+        makeSlice = compileSlice(slot)
+        def store(thing, environment):
+            indexee = value(environment)
+            callMethod(
+                indexee, '__setitem__', makeSlice(environment), thing,
+            )
+        return store
+    else:
+        # unpacking, and whatever fails at run time
+        return lambda thing, environment : assignTo(thing, slot, environment)
+
+def compileCmdTree(cmdTree : CmdTree):
+    cmdType = cmdTree.type
+    if cmdType is ExpressionCmd:
+        evaluate = compileExpression(cmdTree[0])
+        def statement(runTime, environment):
+            evaluate(environment)
+    elif cmdType is AssignCmd:
+        evaluate = compileExpression(cmdTree[1])
+        store = compileStore(cmdTree[0])
+        def statement(runTime, environment):
+            store(evaluate(environment), environment)
+    elif cmdType is Return:
+        if cmdTree:
+            evaluate = compileExpression(cmdTree[0])
+            def statement(runTime, environment):
+                raise ReturnAsException(evaluate(environment))
+        else:
+            def statement(runTime, environment):
+                raise ReturnAsException(builtin.__none__)
+    elif cmdType is Raise:
+        evaluate = compileExpression(cmdTree[0])
+        def statement(runTime, environment):
+            raise Helicopter(evaluate(environment))
+    elif cmdType is Break:
+        def statement(runTime, environment):
+            raise BreakAsException
+    elif cmdType is Continue:
+        def statement(runTime, environment):
+            raise ContinueAsException
+    elif cmdType is Pass:
+        return None
+    elif cmdType is Del:
+        target = cmdTree[0]
+        def statement(runTime, environment):
+            assignTo(Undefined(), target, environment)
+    else:
+        # Import, From
+        def statement(runTime, environment):
+            executeCmdTree(runTime, cmdTree, environment)
+    def run(runTime, environment, label):
+        try:
+            statement(runTime, environment)
+        except Helicopter as h:
+            recordStackTrace(h, label, cmdTree)
+        except KeyboardInterrupt:
+            raise Helicopter(
+                builtin.KeyboardInterrupt
+            )
+    return run
+
+def compileCondition(cmdTree : CmdTree):
+    # The condition of an if, while or for, or what an except catches
+    evaluate = compileExpression(cmdTree[0])
+    def condition(environment, label):
+        try:
+            return evaluate(environment)
+        except Helicopter as h:
+            recordStackTrace(h, label, cmdTree)
+    return condition
+
+def compileConditional(conditional : Conditional):
+    branches = [(
+        compileCondition(conditional.condition),
+        compileSequence(conditional.then),
+    )]
+    for elIf in conditional.elIfs:
+        branches.append((
+            compileCondition(elIf.condition), compileSequence(elIf.then),
+        ))
+    if conditional._else is None:
+        _else = None
+    else:
+        _else = compileSequence(conditional._else)
+    def run(runTime, environment, label):
+        for condition, then in branches:
+            if isTrue(condition(environment, label)):
+                then(runTime, environment, label)
+                return
+        if _else is not None:
+            _else(runTime, environment, label)
+    return run
+
+def compileWhileLoop(whileLoop : WhileLoop):
+    condition = compileCondition(whileLoop.condition)
+    body = compileSequence(whileLoop.body)
+    if whileLoop._else is None:
+        _else = None
+    else:
+        _else = compileSequence(whileLoop._else)
+    def run(runTime, environment, label):
+        try:
+            while isTrue(condition(environment, label)):
+                try:
+                    body(runTime, environment, label)
+                except ContinueAsException:
+                    pass
+        except BreakAsException:
+            return
+        if _else is not None:
+            _else(runTime, environment, label)
+    return run
+
+def compileLoopIterator(eTree):
+    # as `runtime.loopIterator`
+    if isRangeCall(eTree):
+        args = [compileExpression(funcArg.value) for funcArg in eTree.args]
+        func = compileExpression(eTree.func)
+        def loopIterator(environment):
+            argThings = [evaluate(environment) for evaluate in args]
+            funcThing = func(environment)
+            iterThing = countingLoop(funcThing, argThings)
+            if iterThing is not None:
+                return iterThing
+            return ThingIter(funcThing.call(*argThings))
+        return loopIterator
+    iterable = compileExpression(eTree)
+    return lambda environment : ThingIter(iterable(environment))
+
+def compileForLoop(forLoop : ForLoop):
+    cmdTree = forLoop.condition
+    loopIterator = compileLoopIterator(cmdTree[1])
+    store = compileStore(cmdTree[0])
+    body = compileSequence(forLoop.body)
+    if forLoop._else is None:
+        _else = None
+    else:
+        _else = compileSequence(forLoop._else)
+    def run(runTime, environment, label):
+        try:
+            iterThing = loopIterator(environment)
+        except Helicopter as h:
+            recordStackTrace(h, label, cmdTree)
+        try:
+            while True:
+                try:
+                    nextThing = next(iterThing)
+                except StopIteration:
+                    break
+                except Helicopter as h:
+                    recordStackTrace(h, label, cmdTree)
+                store(nextThing, environment)
+                try:
+                    body(runTime, environment, label)
+                except ContinueAsException:
+                    pass
+        except BreakAsException:
+            return
+        if _else is not None:
+            _else(runTime, environment, label)
+    return run
+
+def compileTryExcept(tryExcept : TryExcept):
+    catches = [
+        (compileCondition(oneCatch.catching), compileSequence(oneCatch.handler))
+        for oneCatch in tryExcept.oneCatches
+    ]
+    _try = compileSequence(tryExcept._try)
+    if tryExcept._else is None:
+        _else = None
+    else:
+        _else = compileSequence(tryExcept._else)
+    if tryExcept._finally is None:
+        _finally = None
+    else:
+        _finally = compileSequence(tryExcept._finally)
+    def run(runTime, environment, label):
+        handlers = []
+        for catching, handler in catches:
+            catchingThing = catching(environment, label)
+            if catchingThing._class is not builtin.Class:
+                raise Helicopter(
+                    builtin.TypeError,
+                    f'{reprString(catchingThing)} is a non-class, so miniPy cannot catch this.'
+                )
+            handlers.append((catchingThing, handler))
+        try:
+            _try(runTime, environment, label)
+        except Helicopter as h:
+            raised = h.content
+            if raised._class is builtin.Class:
+                raisedClass = raised
+            else:
+                raisedClass = raised._class
+            for catchingThing, handler in handlers:
+                if isSubclassOf(raisedClass, catchingThing):
+                    try:
+                        handler(runTime, environment, label)
+                    except Helicopter as innerH:
+                        h.below = innerH
+                        raise h
+                    break
+            else:
+                raise h
+        else:
+            if _else is not None:
+                _else(runTime, environment, label)
+        finally:
+            if _finally is not None:
+                _finally(runTime, environment, label)
+    return run
+
+def compileFunctionDefinition(function : FunctionDefinition):
+    identifier, *args = function._def
+    name = identifier.value
+    defaults = [
+        (arg, None if arg.value is None else compileExpression(arg.value))
+        for arg in args
+    ]
+    def run(runTime, environment, label):
+        func = instantiate(builtin.Function)
+        func.namespace['__name__'] = unprimitize(name)
+        func.environment = environment
+        func.mst = function
+        func.runTime = runTime
+        func.default_args = {}
+        arg_names = set()
+        mandatory_args_finished = False
+        try:
+            for arg, default in defaults:
+                if arg.name in arg_names:
+                    raise Helicopter(
+                        builtin.TypeError,
+                        'Duplicate argument name ' + arg.name,
+                    )
+                arg_names.add(arg.name)
+                if default is None:
+                    if mandatory_args_finished:
+                        raise Helicopter(
+                            builtin.TypeError,
+                            f'''Mandatory argument {
+                                arg.name
+                            } after optional argument.''',
+                        )
+                else:
+                    mandatory_args_finished = True
+                    func.default_args[arg.name] = default(environment)
+        except Helicopter as h:
+            recordStackTrace(h, label, function._def)
+        environment.assign(name, func)
+    return run
+
+def compileClassDefinition(classDefinition : ClassDefinition):
+    identifier, *expressionTrees = classDefinition._class
+    name = identifier.value
+    bases = [compileExpression(x) for x in expressionTrees]
+    body = compileSequence(classDefinition.body)
+    def run(runTime, environment, label):
+        # Without a base, like a builtin class, it has no `__base__`.
+        baseThing = None
+        for base in bases:
+            try:
+                baseThing = base(environment)
+            except Helicopter as h:
+                recordStackTrace(h, label, classDefinition._class)
+            if baseThing._class is not builtin.Class:
+                raise Helicopter(
+                    builtin.TypeError,
+                    reprString(baseThing) + ' is a non-class. '
+                    + 'New class cannot inherit from a non-class.',
+                )
+        thisClass = instantiate(builtin.Class)
+        if baseThing is not None:
+            thisClass.namespace['__base__'] = baseThing
+        thisClass.namespace['__name__'] = unprimitize(name)
+        body(runTime, [*environment, thisClass.namespace], name)
+        environment.assign(name, thisClass)
+    return run
+
+def compileElement(element):
+    _type = type(element)
+    if _type is CmdTree:
+        return compileCmdTree(element)
+    return {
+        Conditional       : compileConditional,
+        WhileLoop         : compileWhileLoop,
+        ForLoop           : compileForLoop,
+        TryExcept         : compileTryExcept,
+        FunctionDefinition: compileFunctionDefinition,
+        ClassDefinition   : compileClassDefinition,
+    }[_type](element)
+
+def compileSequence(sequence):
+    '''
+    Returns run(runTime, environment, label), which executes the
+    sequence as `executeSequence` does.
+    '''
+    statements = tuple(filter(None, map(compileElement, sequence)))
+    if len(statements) == 1:
+        return statements[0]
+    def run(runTime, environment, label):
+        for statement in statements:
+            statement(runTime, environment, label)
+    return run
+
+class ClosureEngine:
+    '''
+    The closure engine. Same interface as `runtime.TreeWalker`.
+    A function's body is compiled once, and kept on its MST.
+    '''
+    def runModule(self, runTime, root, environment, label):
+        if type(root) is Sequence:
+            compileSequence(root)(runTime, environment, label)
+        else:
+            # streamed: compile each element as it arrives
+            for element in root:
+                compileSequence((element, ))(runTime, environment, label)
+
+    def runFunction(self, func, environment):
+        function = func.mst
+        body = function.closure
+        if body is None:
+            body = function.closure = compileSequence(function.body)
+        body(
+            func.runTime, environment,
+            func.namespace['__name__'].primitive_value,
+        )
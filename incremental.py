@@ -0,0 +1,300 @@
+from io import StringIO
+from bisect import bisect_left, bisect_right
+from lexems import *
+from lexer import Lexer, REGEX_ENGINE, MixedTabsAndSpacesError
+from parSer import CmdTree, Sequence, CmdsParser
+
+CONTINUATIONS = (Elif, Else, Except, Finally)
+
+class ParsedCmd:
+    '''
+    A cmdTree and the physical lines [first, last] its lexems came
+    from. Blank lines before a cmd belong to it. Both are kept
+    relative to the cmdTree's `line_number`, which is the only
+    absolute line in the cmd, so moving it is one addition.
+    '''
+    __slots__ = ('lead', 'span', 'cmdTree', 'indent_chars')
+
+    def __init__(self, first, last, cmdTree, indent_chars):
+        self.lead = cmdTree.line_number - first
+        self.span = last - cmdTree.line_number
+        self.cmdTree : CmdTree = cmdTree
+        self.indent_chars : frozenset = indent_chars
+
+    @property
+    def first(self):
+        return self.cmdTree.line_number - self.lead
+
+    @property
+    def last(self):
+        return self.cmdTree.line_number + self.span
+
+class Recorder:
+    '''
+    Passes lexems on from a lexer, moving them `offset` lines down,
+    and keeps them so cmds can be told apart afterwards.
+    '''
+    def __init__(self, lexer, offset):
+        self.lexer = lexer
+        self.offset = offset
+        self.lexems = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        lexem = next(self.lexer)
+        lexem.line_number += self.offset
+        self.lexems.append(lexem)
+        return lexem
+
+class Region:
+    '''
+    Iterates the cmdTrees of lines [start, end], lazily, like
+    `CmdsParser`. Each one is also recorded in `parsed`. Once
+    exhausted, `rest` holds the lexems after the last cmd.
+    '''
+    def __init__(self, lines, start, end, filename, lexer_engine):
+        self.lines = lines
+        self.start = start
+        self.end = end
+        self.filename = filename
+        self.lexer_engine = lexer_engine
+        self.parsed = []
+        self.rest = None
+
+    def __iter__(self):
+        lines = self.lines
+        text = ''.join(lines[self.start - 1 : self.end])
+        recorder = Recorder(
+            Lexer(StringIO(text), self.lexer_engine), self.start - 1,
+        )
+        lexems = recorder.lexems
+        chunk_start = 0
+        for cmdTree in CmdsParser(recorder, self.filename):
+            chunk = lexems[chunk_start :]
+            self.parsed.append(ParsedCmd(
+                chunk[0].line_number, chunk[-1].line_number,
+                cmdTree, indentChars(chunk, lines),
+            ))
+            chunk_start = len(lexems)
+            yield cmdTree
+        self.rest = lexems[chunk_start :]
+
+class IncrementalParser:
+    '''
+    Keeps the parse of one source between edits.
+    `update(source)` only re-lexes and re-parses the cmds that
+    overlap the changed lines. Cmds after the edit are reused, with
+    their line numbers shifted, and so are top-level substructures
+    made only of reused cmds.
+    The resulting MST, or error, is the same as parsing `source`
+    from scratch.
+    '''
+    def __init__(self, filename, lexer_engine = REGEX_ENGINE):
+        self.filename = filename
+        self.lexer_engine = lexer_engine
+        self.forget()
+
+    def forget(self):
+        self.lines = []
+        self.cmds = []
+        self.trailing_indent_chars = frozenset()
+        self.blocks = {}    # (*cmdTree ids, is_last) -> substructures
+        self.root = Sequence()
+
+    def update(self, source) -> Sequence:
+        lines = source.splitlines(keepends=True)
+        if lines == self.lines:
+            return self.root
+        try:
+            cmds, trailing_indent_chars = self.reparse(lines)
+            checkIndentChars(cmds, trailing_indent_chars)
+            root, blocks = self.buildRoot(cmds)
+        except Exception:
+            self.forget()
+            return self.parseFromScratch(lines)
+        self.lines = lines
+        self.cmds = cmds
+        self.trailing_indent_chars = trailing_indent_chars
+        self.root = root
+        self.blocks = blocks
+        return root
+
+    def parseFromScratch(self, lines):
+        '''
+        Parses like the interpreter does, cmd by cmd, so it raises
+        the same error. If the root stops early at a dedent, the
+        rest of the source is never parsed, and nothing is kept.
+        '''
+        region = Region(
+            lines, 1, len(lines), self.filename, self.lexer_engine,
+        )
+        root = Sequence()
+        cmd = root.parse(iter(region))
+        if cmd.indent_level != -1:
+            return root
+        cmds = region.parsed
+        blocks = {}
+        grouped = groupBlocks(cmds)
+        for i, (block, element) in enumerate(zip(grouped, root)):
+            blocks[blockKey(block, i == len(grouped) - 1)] = [element]
+        self.lines = lines
+        self.cmds = cmds
+        self.trailing_indent_chars = indentChars(region.rest, lines)
+        self.root = root
+        self.blocks = blocks
+        return root
+
+    def reparse(self, lines):
+        old = self.lines
+        n_prefix = 0
+        limit = min(len(lines), len(old))
+        while n_prefix < limit and lines[n_prefix] == old[n_prefix]:
+            n_prefix += 1
+        n_suffix = 0
+        limit -= n_prefix
+        while n_suffix < limit and lines[-1 - n_suffix] == old[-1 - n_suffix]:
+            n_suffix += 1
+        delta = len(lines) - len(old)
+        damage_first = n_prefix + 1
+        damage_last = max(len(old) - n_suffix, damage_first)
+
+        cmds = self.cmds
+        i_first = bisect_left([x.last for x in cmds], damage_first)
+        if i_first < len(cmds):
+            start = cmds[i_first].first
+        elif cmds:
+            start = cmds[-1].last + 1
+        else:
+            start = 1
+        i_end = bisect_right([x.first for x in cmds], damage_last)
+        while True:
+            at_eof = i_end >= len(cmds)
+            if at_eof:
+                end = len(old)
+            else:
+                end = cmds[i_end - 1].last
+            region = Region(
+                lines, start, end + delta,
+                self.filename, self.lexer_engine,
+            )
+            try:
+                for _ in region:
+                    pass
+            except Exception:
+                if at_eof:
+                    raise
+            else:
+                rest = region.rest
+                if at_eof or (
+                    len(rest) == 1
+                    and rest[0].line_number == end + delta + 1
+                ):
+                    break
+            # The edit reaches into the next cmd.
+            i_end += 1
+        tail = cmds[i_end :]
+        if tail:
+            trailing_indent_chars = self.trailing_indent_chars
+            if delta:
+                for parsedCmd in tail:
+                    parsedCmd.cmdTree.line_number += delta
+        else:
+            trailing_indent_chars = indentChars(region.rest, lines)
+        return cmds[: i_first] + region.parsed + tail, trailing_indent_chars
+
+    def buildRoot(self, cmds):
+        grouped = groupBlocks(cmds)
+        root = Sequence()
+        if grouped is None:
+            # The root stops at a dedent; let it do so.
+            root.parse(iter([x.cmdTree for x in cmds]))
+            return root, {}
+        # A block only sees the indentation of whatever follows it,
+        # so a stand-in cmd is enough.
+        stopper = CmdTree()
+        stopper.type = Pass
+        stopper.indent_level = cmds[0].cmdTree.indent_level
+        blocks = {}
+        for i, block in enumerate(grouped):
+            is_last = i == len(grouped) - 1
+            key = blockKey(block, is_last)
+            try:
+                elements = self.blocks[key]
+            except KeyError:
+                sequence = Sequence()
+                if is_last:
+                    sequence.parse(iter(block))
+                    elements = [*sequence]
+                else:
+                    sequence.parse(iter([*block, stopper]))
+                    elements = sequence[:-1]
+            blocks[key] = elements
+            root.extend(elements)
+        return root, blocks
+
+def groupBlocks(cmds):
+    '''
+    Splits the cmdTrees into top-level blocks: a root-level cmd,
+    followed by its deeper cmds and its elif/else/except/finally.
+    `None` if some cmd is shallower than the root.
+    '''
+    grouped = []
+    if not cmds:
+        return grouped
+    root_indent = cmds[0].cmdTree.indent_level
+    for parsedCmd in cmds:
+        cmdTree = parsedCmd.cmdTree
+        if cmdTree.indent_level < root_indent:
+            return None
+        if grouped and (
+            cmdTree.indent_level > root_indent
+            or cmdTree.type in CONTINUATIONS
+        ):
+            grouped[-1].append(cmdTree)
+        else:
+            grouped.append([cmdTree])
+    return grouped
+
+def blockKey(block, is_last):
+    return (*(id(x) for x in block), is_last)
+
+def indentChars(lexems, lines):
+    chars = set()
+    for lexem in lexems:
+        if type(lexem) is Indentation and lexem.value:
+            chars.update(lines[lexem.line_number - 1][: lexem.value])
+    return frozenset(chars)
+
+def checkIndentChars(cmds, trailing_indent_chars):
+    # Same rule as the lexer: one indentation char per file.
+    chars = set(trailing_indent_chars)
+    for parsedCmd in cmds:
+        chars.update(parsedCmd.indent_chars)
+    if len(chars) > 1:
+        raise MixedTabsAndSpacesError
+
+if __name__ == '__main__':
+    # Differential test: edit test.minipy line by line
+    from contextlib import redirect_stdout
+    def dump(root):
+        f = StringIO()
+        with redirect_stdout(f):
+            root.pprint()
+        return f.getvalue()
+    with open('test.minipy', 'r') as f:
+        source = f.read()
+    incrementalParser = IncrementalParser('test.minipy')
+    incrementalParser.update(source)
+    lines = source.splitlines(keepends=True)
+    for i in range(len(lines)):
+        edited = lines[:i] + ['\n', lines[i]] + lines[i + 1 :]
+        for new_source in (''.join(edited), source):
+            expected = Sequence()
+            expected.parse(CmdsParser(
+                Lexer(StringIO(new_source)), 'test.minipy', 
+            ))
+            root = incrementalParser.update(new_source)
+            assert dump(root) == dump(expected), i
+    print('Differential test passed on', len(lines), 'edits.')
@@ -1,4 +1,9 @@
-from io import TextIOWrapper
+import os
+import re
+import mmap
+from sys import intern
+from functools import partial
+from io import TextIOWrapper, StringIO, UnsupportedOperation
 from string import ascii_letters, digits
 from lexems import *
 
@@ -59,6 +64,25 @@ KEYWORDS = {
     'while'   : While   , 
 }
 
+# Every reserved word -> its lexem class, built once. Anything else 
+# is an identifier, so one `get` tells them apart. 
+WORDS = {
+    **KEYWORDS, 
+    'True' : partial(Boolean, True ), 
+    'False': partial(Boolean, False), 
+}
+
+def symbolTrie(symbols_priority):
+    '''
+    first char -> ((rest of symbol, Lexem), ...), longest first.  
+    '''
+    trie = {}
+    for symbol, Lexem in symbols_priority:
+        trie.setdefault(symbol[0], []).append((symbol[1:], Lexem))
+    return {char : tuple(x) for char, x in trie.items()}
+
+SYMBOL_TRIE = symbolTrie(SYMBOLS_PRIORITY)
+
 class CarriageReturnDetected(Exception): 
     '''
     This language does not allow the exiestence of  
@@ -69,36 +93,74 @@ class MixedTabsAndSpacesError(Exception): pass
 class ParseStringFailed(Exception): pass
 
 class LookAheadIO:
-    def __init__(self, file):
+    '''
+    Reads `file` in chunks of `chunk_size` chars.  
+    `buffer[cursor:]` is the uncommitted look-ahead. Peeking slices 
+    the buffer by index, and committing just advances `cursor`, so 
+    each char is copied O(1) times no matter how far we look ahead.  
+    '''
+    def __init__(self, file, chunk_size = 1 << 16):
         self.file : TextIOWrapper = file
-        self.buffer = []
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.cursor = 0
+        self.eof = False
         self.line_no = 1
     
+    def fill(self, n_char):
+        # Makes sure `n_char` chars are buffered, unless EOF. 
+        while not self.eof and len(self.buffer) - self.cursor < n_char:
+            chunk = self.file.read(self.chunk_size)
+            if chunk:
+                self.buffer = self.buffer[self.cursor:] + chunk
+                self.cursor = 0
+            else:
+                self.eof = True
+    
     def read(self, n_char, commit = True):
-        buffer_requested = min(len(self.buffer), n_char)
-        result = ''.join(self.buffer[:buffer_requested])
-        self.buffer = self.buffer[buffer_requested:]
-        need_more = n_char - buffer_requested
-        if need_more:
-            result += self.file.read(need_more)
+        if len(self.buffer) - self.cursor < n_char:
+            self.fill(n_char)
+        start = self.cursor
+        end = start + n_char
+        result = self.buffer[start : end]
         if commit:
-            self.line_no += result.count('\n')
+            self.commit(start + len(result))
         return result
     
+    def commit(self, end):
+        self.line_no += self.buffer.count('\n', self.cursor, end)
+        self.cursor = end
+    
     def lookAhead(self, n_char):
-        result = self.read(n_char, commit = False)
-        self.buffer = [*result] + self.buffer
-        return result
+        return self.read(n_char, commit = False)
     
     def readline(self):
         while True:
-            char = self.read(1)
-            if char == '':
-                raise EOFError
-            elif char == '\n':
+            end = self.buffer.find('\n', self.cursor)
+            if end != -1:
+                self.commit(end + 1)
                 return
+            self.commit(len(self.buffer))
+            self.fill(1)
+            if len(self.buffer) == self.cursor:
+                raise EOFError
+
+CHAR_ENGINE = 'char'
+REGEX_ENGINE = 'regex'
+MMAP_ENGINE = 'mmap'
+LEXER_ENGINES = (CHAR_ENGINE, REGEX_ENGINE, MMAP_ENGINE)
 
-def Lexer(f):
+def Lexer(f, engine = CHAR_ENGINE):
+    if engine == CHAR_ENGINE:
+        return CharLexer(f)
+    elif engine == REGEX_ENGINE:
+        return RegexLexer(f)
+    elif engine == MMAP_ENGINE:
+        return MappedLexer(f)
+    else:
+        raise ValueError(f'Unknown lexer engine "{engine}"')
+
+def CharLexer(f):
     lAIO = LookAheadIO(f)
     indent_using = []
     indentation = expectIndentation(lAIO, indent_using)
@@ -127,15 +189,11 @@ def Lexer(f):
             yield String(s).lineNumber(lAIO.line_no)
         elif char in IDENTIFIER_START:
             word = expectWord(lAIO, char)
-            if word == 'True':
-                yield Boolean(True).lineNumber(lAIO.line_no)
-            elif word == 'False':
-                yield Boolean(False).lineNumber(lAIO.line_no)
+            Keyword = WORDS.get(word)
+            if Keyword is None:
+                yield Identifier(intern(word)).lineNumber(lAIO.line_no)
             else:
-                try:
-                    yield KEYWORDS[word]().lineNumber(lAIO.line_no)
-                except KeyError:
-                    yield Identifier(word).lineNumber(lAIO.line_no)
+                yield Keyword().lineNumber(lAIO.line_no)
         elif char in NUM_BODY:
             n = expectNum(lAIO, char)
             if n == '.':
@@ -143,18 +201,201 @@ def Lexer(f):
             else:
                 yield Num(n).lineNumber(lAIO.line_no)
         else:
-            for symbol, Lexem in SYMBOLS_PRIORITY:
-                need_more = len(symbol) - 1
-                read = char + lAIO.lookAhead(need_more)
-                if read == symbol:
-                    lAIO.read(need_more)
+            for rest, Lexem in SYMBOL_TRIE.get(char, ()):
+                if not rest or lAIO.lookAhead(len(rest)) == rest:
+                    lAIO.read(len(rest))
                     yield Lexem().lineNumber(lAIO.line_no)
                     break
             else:
                 raise LexingNoMatch(repr(
-                    char + ''.join(lAIO.buffer)
+                    char + lAIO.lookAhead(1)
                 ))
 
+TOKEN_REGEX = '''
+    (?P<space>   [ \\t]+                   )
+  | (?P<word>    [A-Za-z_][A-Za-z0-9_]*    )
+  | (?P<symbol>  ==|!=|<=|>=|\\*\\*|[-+*/%<>=(){}\\[\\]:,] )
+  | (?P<newline> \\n                       )
+  | (?P<num>     [0-9.]+                   )
+  | (?P<quote>   [\\\'"]                   )
+  | (?P<comment> \\#[^\\n]*\\n?            )
+'''
+INDENTATION_REGEX = '[ \\t]*'
+QUOTES = ("\'", '"')
+def stringRegexes(quote):
+    # (single-line, triple-quoted)
+    return (
+        quote + '(?:[^\\\\\\n' + quote + ']|\\\\[\\s\\S])*' + quote, 
+        quote * 3 + '(?:[^\\\\' + quote + ']|\\\\[\\s\\S]|' 
+        + quote + '(?!' + quote * 2 + '))*' + quote * 3, 
+    )
+ESCAPE_PATTERN = re.compile('\\\\([\\s\\S])')
+ESCAPES = {
+    '\\': '\\', 'n': '\n', 't': '\t', 'r': '\r', 
+    '\'': '\'', '"': '"', 
+}
+
+class Grammar:
+    '''
+    The master regex and its helpers, compiled for either `str` 
+    sources or `bytes`-like ones (UTF-8, e.g. an mmap).  
+    '''
+    def __init__(self, binary):
+        self.binary = binary
+        encode = self.encode
+        self.token = re.compile(encode(TOKEN_REGEX), re.VERBOSE)
+        self.indentation = re.compile(encode(INDENTATION_REGEX))
+        self.strings = {
+            encode(quote) : tuple(
+                re.compile(encode(x)) for x in stringRegexes(quote)
+            ) for quote in QUOTES
+        }
+        self.symbols = {
+            encode(symbol) : Lexem for symbol, Lexem in SYMBOLS_PRIORITY
+        }
+        self.newline = encode('\n')
+        self.carriage_return = encode('\r')
+    
+    def encode(self, s : str):
+        if self.binary:
+            return s.encode('utf-8')
+        return s
+    
+    def decode(self, raw, errors = 'strict'):
+        if self.binary:
+            return raw.decode('utf-8', errors)
+        return raw
+    
+    def preview(self, text, pos):
+        # the offending char and the one after it
+        return self.decode(text[pos : pos + 8], 'replace')[:2]
+
+TEXT_GRAMMAR = Grammar(binary = False)
+BYTES_GRAMMAR = Grammar(binary = True)
+
+def RegexLexer(f):
+    '''
+    Same token stream as `CharLexer`, but the whole source is 
+    tokenized by one compiled alternation, one `match` per lexem.  
+    '''
+    return regexLex(f.read(), TEXT_GRAMMAR)
+
+def MappedLexer(f):
+    '''
+    `RegexLexer` over a read-only mmap of `f`, which is only used for 
+    its file descriptor. The source is never copied into Python; 
+    only the slices that become lexem values are decoded.  
+    '''
+    try:
+        fileno = f.fileno()
+    except (AttributeError, UnsupportedOperation):
+        # not backed by a file, e.g. StringIO
+        yield from RegexLexer(f)
+        return
+    if os.fstat(fileno).st_size == 0:
+        # an empty file cannot be mapped
+        yield from regexLex(b'', BYTES_GRAMMAR)
+        return
+    with mmap.mmap(fileno, 0, access = mmap.ACCESS_READ) as mapped:
+        if mapped.find(b'\r') == -1:
+            yield from regexLex(mapped, BYTES_GRAMMAR)
+            return
+    # Text mode translates "\r\n" for us. 
+    yield from RegexLexer(f)
+
+def regexLex(text, grammar : Grammar):
+    decode = grammar.decode
+    symbols = grammar.symbols
+    newline = grammar.newline
+    getWord = WORDS.get
+    indent_using = []
+    pos = matchIndentation(text, 0, indent_using, grammar)
+    yield Indentation(pos).lineNumber(1)
+    line_no = 1
+    match = grammar.token.match
+    while True:
+        m = match(text, pos)
+        if m is None:
+            if pos == len(text):
+                return
+            if text[pos : pos + 1] == grammar.carriage_return:
+                raise CarriageReturnDetected
+            raise LexingNoMatch(repr(grammar.preview(text, pos)))
+        kind = m.lastgroup
+        end = m.end()
+        if kind == 'space':
+            pass
+        elif kind == 'word':
+            word = decode(m.group())
+            Keyword = getWord(word)
+            if Keyword is None:
+                yield Identifier(intern(word)).lineNumber(line_no)
+            else:
+                yield Keyword().lineNumber(line_no)
+        elif kind == 'symbol':
+            yield symbols[m.group()]().lineNumber(line_no)
+        elif kind == 'newline':
+            yield EoL().lineNumber(line_no)
+            line_no += 1
+            indent_start = end
+            end = matchIndentation(text, end, indent_using, grammar)
+            yield Indentation(end - indent_start).lineNumber(line_no)
+        elif kind == 'num':
+            n = parseNum(decode(m.group()))
+            if n == '.':
+                yield Dot().lineNumber(line_no)
+            else:
+                yield Num(n).lineNumber(line_no)
+        elif kind == 'quote':
+            s, end, n_lines = matchString(text, pos, grammar)
+            line_no += n_lines
+            yield String(s).lineNumber(line_no)
+        elif kind == 'comment':
+            if m.group().endswith(newline):
+                line_no += 1
+        pos = end
+
+def matchIndentation(text, pos, indent_using : list, grammar : Grammar):
+    end = grammar.indentation.match(text, pos).end()
+    if end != pos:
+        indentation = grammar.decode(text[pos : end])
+        if not indent_using:
+            indent_using.append(indentation[0])
+        if indentation.strip(indent_using[0]):
+            raise MixedTabsAndSpacesError
+    return end
+
+def matchString(text, pos, grammar : Grammar):
+    quote = text[pos : pos + 1]
+    single, triple = grammar.strings[quote]
+    if text[pos : pos + 3] == quote * 3:
+        m = triple.match(text, pos)
+        n_quotes = 3
+    else:
+        m = single.match(text, pos)
+        n_quotes = 1
+    if m is None:
+        # Let the char engine find out what exactly went wrong. 
+        rest = grammar.decode(text[pos + 1 :], 'replace')
+        expectString(
+            LookAheadIO(StringIO(rest)), grammar.decode(quote), 
+        )
+        assert False    # `expectString` must have raised
+    raw = m.group()
+    body = grammar.decode(raw[n_quotes : -n_quotes])
+    if '\\' in body:
+        body = ESCAPE_PATTERN.sub(unescape, body)
+    return body, m.end(), raw.count(grammar.newline)
+
+def unescape(m):
+    char = m.group(1)
+    try:
+        return ESCAPES[char]
+    except KeyError:
+        raise ParseStringFailed(
+            f'Backslash followed by "{char}"'
+        )
+
 def expectIndentation(lAIO : LookAheadIO, indent_using : list):
     acc = 0
     while lAIO.lookAhead(1) in (' ', '\t'):
@@ -172,10 +413,7 @@ def expectChar(lAIO : LookAheadIO):
     if char == '\\':
         char_1 = lAIO.read(1)
         try:
-            return {
-                '\\': '\\', 'n': '\n', 't': '\t', 'r': '\r', 
-                '\'': '\'', '"': '"', 
-            }[char_1], True
+            return ESCAPES[char_1], True
         except KeyError:
             if char_1 == '':
                 raise EOFError(
@@ -243,7 +481,9 @@ def expectNum(lAIO : LookAheadIO, first_char):
             buffer.append(char)
         else:
             break
-    str_num = ''.join(buffer)
+    return parseNum(''.join(buffer))
+
+def parseNum(str_num):
     n_dots = str_num.count('.')
     if n_dots == 0:
         return int(str_num)
@@ -255,9 +495,35 @@ def expectNum(lAIO : LookAheadIO, first_char):
     else:
         raise SyntaxError('More than one "." in a number')
 
+def lexDump(filename, engine):
+    result = []
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            for lexem in Lexer(f, engine):
+                result.append(repr(lexem))
+    except Exception as e:
+        result.append(repr(e))
+    return result
+
 if __name__ == '__main__':
     # Self-lexing test
     with open(__file__, 'r') as f:
         lexer = Lexer(f)
         for lexem in lexer:
             print(lexem)
+
+    # Differential test: all engines must yield the same stream
+    from os import listdir, path
+    here = path.dirname(path.abspath(__file__))
+    experiments = path.join(here, 'experiments')
+    filenames = [
+        __file__, path.join(here, 'test.minipy'), 
+        *[path.join(experiments, x) for x in listdir(experiments)], 
+    ]
+    for filename in filenames:
+        expected = lexDump(filename, CHAR_ENGINE)
+        for engine in LEXER_ENGINES:
+            assert lexDump(filename, engine) == expected, (
+                f'{engine} engine disagrees on {filename}'
+            )
+    print('Differential test passed on', len(filenames), 'files.')
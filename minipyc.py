@@ -0,0 +1,95 @@
+'''
+On-disk cache of parsed modules.
+`foo.minipy` is cached as `__minipycache__/foo.minipyc`, which holds
+a key and the pickled, zlib-compressed MST. The cache is only used
+while the key still matches: same source path, mtime, size, content
+hash and interpreter version.
+'''
+import os
+import sys
+import zlib
+import pickle
+import hashlib
+from functools import lru_cache
+from lexer import Lexer, CHAR_ENGINE
+from parSer import Sequence, CmdsParser
+
+CACHE_DIRNAME = '__minipycache__'
+CACHE_EXTENSION = '.minipyc'
+CACHE_FORMAT = 1
+# The MST is whatever these make of the source.
+FRONT_END_MODULES = ('lexems.py', 'lexer.py', 'parser.py')
+
+@lru_cache(maxsize = 1)
+def interpreterVersion():
+    '''
+    Changes whenever the front end or the host Python does, so a
+    cache never outlives the code that wrote it.
+    '''
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in FRONT_END_MODULES:
+        with open(os.path.join(here, module), 'rb') as f:
+            digest.update(f.read())
+    return (CACHE_FORMAT, sys.implementation.cache_tag, digest.hexdigest())
+
+def cachePath(filename):
+    dir_location, base = os.path.split(filename)
+    name, _ = os.path.splitext(base)
+    return os.path.join(dir_location, CACHE_DIRNAME, name + CACHE_EXTENSION)
+
+def sourceKey(filename, source : bytes):
+    stat = os.stat(filename)
+    return (
+        interpreterVersion(), os.path.abspath(filename),
+        stat.st_mtime_ns, stat.st_size,
+        hashlib.sha256(source).hexdigest(),
+    )
+
+def parseFile(filename, lexer_engine = CHAR_ENGINE) -> Sequence:
+    with open(filename, 'r', encoding='utf-8') as f:
+        root = Sequence()
+        root.parse(CmdsParser(Lexer(f, lexer_engine), filename))
+    return root
+
+def readCache(path, key):
+    try:
+        with open(path, 'rb') as f:
+            if pickle.load(f) != key:
+                return None
+            return pickle.loads(zlib.decompress(f.read()))
+    except Exception:
+        # Missing, or corrupt. It will be (over)written.
+        return None
+
+def writeCache(path, key, root : Sequence):
+    temp = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        with open(temp, 'wb') as f:
+            pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+            f.write(zlib.compress(
+                pickle.dumps(root, pickle.HIGHEST_PROTOCOL), 
+            ))
+        os.replace(temp, path)
+    except (OSError, RecursionError, pickle.PicklingError):
+        # e.g. a read-only directory. Caching is best-effort.
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+
+def loadMST(
+    filename, lexer_engine = CHAR_ENGINE, use_cache = True,
+) -> Sequence:
+    if not use_cache:
+        return parseFile(filename, lexer_engine)
+    with open(filename, 'rb') as f:
+        source = f.read()
+    key = sourceKey(filename, source)
+    path = cachePath(filename)
+    root = readCache(path, key)
+    if root is None:
+        root = parseFile(filename, lexer_engine)
+        writeCache(path, key, root)
+    return root
@@ -0,0 +1,415 @@
+'''
+Optional pass over a parsed module, before it runs.
+- Folds `Binary`/`Unary` operations on int, float and str literals,
+  e.g. `2 ** 10 * 3` -> 3072, and drops redundant parentheses.
+- Prunes branches of `if`/`elif`/`while` whose condition is a literal,
+  and statements after `return`, `raise`, `break` or `continue`.
+- Inlines calls to small top-level functions that only `return` an
+  expression, see `inlineCall`.
+Anything that would raise at run time is left alone, so it still does.
+The surviving cmdTrees keep their line numbers.
+Folding and pruning apply Python's operators and truth to literals,
+so they assume the program never reassigns methods of int, float,
+str or bool, e.g. `int.__add__ = f`. Such a patch is not detected,
+as it may come from another module or through an alias, and -O then
+changes what the program does.
+'''
+import copy
+import operator
+from lexems import *
+from parSer import (
+    CmdTree, Sequence, FunctionArg, Node, Name, Const, Empty,
+    Parened, BinOp, UnaryOp, UnaryNegate,
+    Attribute, Subscript, Slice, TupleDisplay, ListDisplay, ListComp,
+    Call, Inlined, Parameter,
+    Conditional, WhileLoop, ForLoop, TryExcept,
+    FunctionDefinition, ClassDefinition,
+)
+from resolver import boundNames, targetNames, subSequences
+
+# Literal types that miniPy gives the same operations as Python.
+# bool is not one: miniPy's bool has no arithmetic, and None no truth.
+FOLDABLE_TYPES = (int, float, str)
+TRUTH_TYPES = (int, float, str, bool)
+
+# What miniPy's builtins do, unless a program patches them.
+FOLDS = {
+    ToPowerOf         : operator.pow,
+    Times             : operator.mul,
+    Divide            : operator.truediv,
+    ModDiv            : operator.mod,
+    Plus              : operator.add,
+    Minus             : lambda a, b : a + -b,   # as the runtime does
+    Equal             : operator.eq,
+    NotEqual          : operator.ne,
+    LessThan          : operator.lt,
+    GreaterThan       : operator.gt,
+    LessThanOrEqual   : operator.le,
+    GreaterThanOrEqual: operator.ge,
+}
+
+# Beyond these, a folded literal costs more than it saves.
+MAX_FOLDED_LENGTH = 4096
+MAX_FOLDED_BITS = 4096
+
+# What an inlined function may return: nothing that calls, so no
+# recursion, and nothing with a namespace of its own.
+INLINABLE_TYPES = (
+    Name, Const, Empty, Parened, BinOp, UnaryOp,
+    Attribute, Subscript, Slice, TupleDisplay, ListDisplay,
+)
+MAX_INLINED_NODES = 16
+
+TERMINATORS = (Return, Raise, Break, Continue)
+
+def isLiteral(node, types = FOLDABLE_TYPES):
+    return type(node) is Const and type(node.value) in types
+
+def isSmall(operation, a, b):
+    if operation is Times:
+        if type(a) is str and type(b) is int:
+            return len(a) * b <= MAX_FOLDED_LENGTH
+        if type(a) is int and type(b) is str:
+            return a * len(b) <= MAX_FOLDED_LENGTH
+    if operation is ToPowerOf and type(a) is int and type(b) is int:
+        return b * a.bit_length() <= MAX_FOLDED_BITS
+    return True
+
+def foldBinary(node : BinOp):
+    left, right = node.left, node.right
+    if node.op in (And, Or):
+        if not isLiteral(left, TRUTH_TYPES):
+            return node
+        if bool(left.value) == (node.op is And):
+            return right
+        return left
+    if not (isLiteral(left) and isLiteral(right)):
+        return node
+    fold = FOLDS.get(node.op)
+    if fold is None or not isSmall(node.op, left.value, right.value):
+        return node
+    try:
+        value = fold(left.value, right.value)
+    except Exception:
+        return node
+    if type(value) is str and len(value) > MAX_FOLDED_LENGTH:
+        return node
+    return Const(value, node.line_number)
+
+def foldUnary(node : UnaryOp):
+    operand = node.operand
+    if node.op is Not and isLiteral(operand, TRUTH_TYPES):
+        return Const(not operand.value, node.line_number)
+    if node.op is UnaryNegate and isLiteral(operand, (int, float)):
+        return Const(- operand.value, node.line_number)
+    return node
+
+def foldChild(x):
+    if isinstance(x, Node):
+        return foldExpression(x)
+    if type(x) is FunctionArg and x.value is not None:
+        x.value = foldExpression(x.value)
+    return x
+
+def foldExpression(node : Node) -> Node:
+    '''
+    Returns the folded node. Subtrees are folded in place.
+    '''
+    _type = type(node)
+    if _type in (Name, Const, Empty):
+        return node
+    for field in node._fields:
+        x = getattr(node, field)
+        if type(x) is tuple:
+            setattr(node, field, tuple(foldChild(c) for c in x))
+        elif x is not None:
+            setattr(node, field, foldChild(x))
+    if _type is BinOp:
+        return foldBinary(node)
+    if _type is UnaryOp:
+        return foldUnary(node)
+    if _type is Parened:
+        return node.value
+    return node
+
+def foldCmdTree(cmdTree : CmdTree):
+    for i, x in enumerate(cmdTree):
+        cmdTree[i] = foldChild(x)
+
+def truth(cmdTree : CmdTree):
+    # of a condition: True, False, or None if only known at run time
+    condition = cmdTree[0]
+    if isLiteral(condition, TRUTH_TYPES):
+        return bool(condition.value)
+    return None
+
+def optimizeSequence(sequence : Sequence):
+    '''
+    Optimizes `sequence` in place.
+    '''
+    optimized = []
+    for element in sequence:
+        elements = optimizeElement(element)
+        optimized.extend(elements)
+        if elements and type(elements[-1]) is CmdTree and (
+            elements[-1].type in TERMINATORS
+        ):
+            break   # the rest is unreachable
+    sequence[:] = optimized
+
+def optimizeElement(element):
+    '''
+    Returns what replaces `element`: itself, the body of a branch
+    that is always taken, or nothing.
+    '''
+    _type = type(element)
+    if _type is CmdTree:
+        foldCmdTree(element)
+        return [element]
+    if _type is Conditional:
+        return optimizeConditional(element)
+    if _type is WhileLoop:
+        foldCmdTree(element.condition)
+        if truth(element.condition) is False:
+            if element._else is None:
+                return []
+            optimizeSequence(element._else)
+            return element._else
+        optimizeSequence(element.body)
+        if element._else is not None:
+            optimizeSequence(element._else)
+    elif _type is ForLoop:
+        foldCmdTree(element.condition)
+        optimizeSequence(element.body)
+        if element._else is not None:
+            optimizeSequence(element._else)
+    elif _type is TryExcept:
+        optimizeSequence(element._try)
+        for oneCatch in element.oneCatches:
+            foldCmdTree(oneCatch.catching)
+            optimizeSequence(oneCatch.handler)
+        for sequence in (element._else, element._finally):
+            if sequence is not None:
+                optimizeSequence(sequence)
+    elif _type is FunctionDefinition:
+        foldCmdTree(element._def)
+        optimizeSequence(element.body)
+    elif _type is ClassDefinition:
+        foldCmdTree(element._class)
+        optimizeSequence(element.body)
+    return [element]
+
+def optimizeConditional(conditional : Conditional):
+    branches = [(conditional.condition, conditional.then)] + [
+        (elIf.condition, elIf.then) for elIf in conditional.elIfs
+    ]
+    kept = []
+    _else = conditional._else
+    for condition, then in branches:
+        foldCmdTree(condition)
+        known = truth(condition)
+        if known is False:
+            continue
+        if known is True:
+            # Always taken. Later branches are dead.
+            _else = then
+            break
+        kept.append((condition, then))
+    if _else is not None:
+        optimizeSequence(_else)
+    if not kept:
+        return [] if _else is None else _else
+    for _, then in kept:
+        optimizeSequence(then)
+    (conditional.condition, conditional.then), *rest = kept
+    conditional.elIfs = []
+    for condition, then in rest:
+        elIf = Conditional._Elif()
+        elIf.condition = condition
+        elIf.then = then
+        conditional.elIfs.append(elIf)
+    conditional._else = _else
+    return [conditional]
+
+def optimizeModule(root : Sequence):
+    '''
+    Optimizes a module in place.
+    '''
+    optimizeSequence(root)
+    candidates = {}
+    defined = set()
+    for element in root:
+        if type(element) is FunctionDefinition:
+            name = element._def[0].value
+            if name in defined:
+                candidates.pop(name, None)  # which one is called?
+            elif inlinable(element):
+                candidates[name] = element
+            defined.add(name)
+    inlineSequence(root, candidates, frozenset())
+
+def optimizeStream(elements):
+    # For streamed modules: each top-level element on its own.
+    # Calls are inlined into the elements after the function.
+    candidates = {}
+    for element in elements:
+        for optimized in optimizeElement(element):
+            inlineElement(optimized, candidates, frozenset())
+            if type(optimized) is FunctionDefinition:
+                name = optimized._def[0].value
+                candidates.pop(name, None)
+                if inlinable(optimized):
+                    candidates[name] = optimized
+            yield optimized
+
+# Inlining
+
+def walk(node):
+    yield node
+    if type(node) is FunctionArg:
+        if node.value is not None:
+            yield from walk(node.value)
+        return
+    for child in node.children():
+        yield from walk(child)
+
+def inlinable(function : FunctionDefinition):
+    '''
+    Whether `function` is `def f(a, b): return <expression>`, with
+    no default values, and a small expression that calls nothing.
+    '''
+    arg_names = [arg.name for arg in function._def[1:]]
+    if len(set(arg_names)) != len(arg_names) or any(
+        arg.value is not None for arg in function._def[1:]
+    ):
+        return False
+    body = function.body
+    if len(body) != 1 or type(body[0]) is not CmdTree:
+        return False
+    if body[0].type is not Return or not body[0]:
+        return False
+    nodes = [*walk(body[0][0])]
+    return len(nodes) <= MAX_INLINED_NODES and all(
+        type(node) in INLINABLE_TYPES for node in nodes
+    )
+
+def freeNames(expression, arg_names):
+    return {
+        node.name for node in walk(expression) if type(node) is Name
+    }.difference(arg_names)
+
+def substitute(expression, arg_names, inlined : Inlined):
+    # A copy of `expression`, reading the arguments of `inlined`
+    if type(expression) is Name and expression.name in arg_names:
+        return Parameter(
+            inlined, arg_names.index(expression.name),
+            expression.line_number,
+        )
+    node = copy.copy(expression)
+    for field in node._fields:
+        x = getattr(node, field)
+        if type(x) is tuple:
+            setattr(node, field, tuple(
+                substitute(c, arg_names, inlined) for c in x
+            ))
+        elif x is not None:
+            setattr(node, field, substitute(x, arg_names, inlined))
+    return node
+
+def inlineCall(call : Call, candidates, shadowed):
+    '''
+    `f(x, y)` becomes an `Inlined`, if `f` is a candidate: a function
+    defined once, at the top level of the module. At run time, the
+    arguments and then `f` are evaluated as for the call. Only if `f`
+    is still that function is its expression evaluated in place of
+    the call, see `runtime.callInlined`. The expression runs in the
+    caller's environment, so no name it uses may be `shadowed` there.
+    '''
+    func = call.func
+    if type(func) is not Name or func.name in shadowed:
+        return call
+    function = candidates.get(func.name)
+    if function is None:
+        return call
+    arg_names = [arg.name for arg in function._def[1:]]
+    if len(call.args) != len(arg_names) or any(
+        funcArg.name is not None for funcArg in call.args
+    ):
+        return call
+    expression = function.body[0][0]
+    if not shadowed.isdisjoint(freeNames(expression, arg_names)):
+        return call
+    inlined = Inlined(call, function, line_number = call.line_number)
+    inlined.body = substitute(expression, arg_names, inlined)
+    return inlined
+
+def inlineChild(x, candidates, shadowed):
+    if isinstance(x, Node):
+        return inlineExpression(x, candidates, shadowed)
+    if type(x) is FunctionArg and x.value is not None:
+        x.value = inlineExpression(x.value, candidates, shadowed)
+    return x
+
+def inlineExpression(node : Node, candidates, shadowed) -> Node:
+    if type(node) is ListComp:
+        node.iterable = inlineExpression(node.iterable, candidates, shadowed)
+        inner = shadowed.union(targetNames(node.target))
+        node.element = inlineExpression(node.element, candidates, inner)
+        if node.condition is not None:
+            node.condition = inlineExpression(
+                node.condition, candidates, inner,
+            )
+        return node
+    for field in node._fields:
+        x = getattr(node, field)
+        if type(x) is tuple:
+            setattr(node, field, tuple(
+                inlineChild(c, candidates, shadowed) for c in x
+            ))
+        elif x is not None:
+            setattr(node, field, inlineChild(x, candidates, shadowed))
+    if type(node) is Call:
+        return inlineCall(node, candidates, shadowed)
+    return node
+
+def inlineCmdTree(cmdTree : CmdTree, candidates, shadowed):
+    for i, x in enumerate(cmdTree):
+        cmdTree[i] = inlineChild(x, candidates, shadowed)
+
+def inlineSequence(sequence : Sequence, candidates, shadowed):
+    if candidates:
+        for element in sequence:
+            inlineElement(element, candidates, shadowed)
+
+def inlineElement(element, candidates, shadowed):
+    '''
+    `shadowed` holds the names bound between `element` and the
+    module namespace.
+    '''
+    _type = type(element)
+    if _type is CmdTree:
+        inlineCmdTree(element, candidates, shadowed)
+    elif _type in (FunctionDefinition, ClassDefinition):
+        if _type is FunctionDefinition:
+            first_cmd = element._def
+            bound = dict.fromkeys(arg.name for arg in element._def[1:])
+        else:
+            first_cmd = element._class
+            bound = {}
+        inlineCmdTree(first_cmd, candidates, shadowed)
+        if boundNames(element.body, bound):
+            # else, what it binds is only known at run time
+            inlineSequence(
+                element.body, candidates, shadowed.union(bound),
+            )
+    else:
+        if _type in (Conditional, WhileLoop, ForLoop):
+            inlineCmdTree(element.condition, candidates, shadowed)
+        if _type is Conditional:
+            for elIf in element.elIfs:
+                inlineCmdTree(elIf.condition, candidates, shadowed)
+        if _type is TryExcept:
+            for oneCatch in element.oneCatches:
+                inlineCmdTree(oneCatch.catching, candidates, shadowed)
+        for subSequence in subSequences(element):
+            inlineSequence(subSequence, candidates, shadowed)
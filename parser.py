@@ -1,4 +1,5 @@
 from lexems import *
+from copy import copy
 from typing import List
 
 PREFIX_KEYWORDS = [
@@ -63,8 +64,13 @@ def expect(lexem, LexemTypes):
 
 class CmdTree(list):
     '''
-    A sequence of expressionTree | lexem. 
+    A sequence of node | lexem | functionArg.
+    `filename` is the one string object passed to `CmdsParser`.
+    Only `line_number` is absolute. Lines inside the cmd count from
+    it, so moving a cmd is one addition, see incremental.py.  
     '''
+    __slots__ = ('indent_level', 'type', 'line_number', 'filename')
+
     def __init__(self):
         super().__init__()
         self.indent_level = None
@@ -96,11 +102,8 @@ class CmdTree(list):
             lexem = next(lexer)
             expect(lexem, Indentation)
             self.indent_level = lexem.value
-            if self.line_number is None:
-                self.line_number = lexem.line_number
-                if self.line_number == 165:
-                    # For breakpoint
-                    _ = 0
+            # Blank lines before the cmd don't count.
+            self.line_number = lexem.line_number
             lexem = next(lexer)
             if type(lexem) in PREFIX_KEYWORDS:
                 self.type = type(lexem)
@@ -130,8 +133,7 @@ class CmdTree(list):
                         expect(lexem, (Identifier, RParen))
                         if type(lexem) is RParen:
                             break
-                        arg = FunctionArg()
-                        arg.name = lexem
+                        arg = FunctionArg(lexem.value)
                         self.append(arg)
                         lexem = next(lexer)
                         expect(lexem, (Comma, RParen, Assign))
@@ -203,6 +205,7 @@ class CmdTree(list):
                 else:
                     expect(last_lexem, (Assign, EoL))
             break
+        relativeLines(self)
 
 def CmdsParser(lexer, filename):
     while True:
@@ -214,29 +217,247 @@ def CmdsParser(lexer, filename):
             return
         yield cmdTree
 
-class ExpressionType: pass
-class Terminal     (ExpressionType): 
-    '''
-    Child is leaf lexem
-    '''
-class Parened      (ExpressionType): pass
-class TupleDisplay (ExpressionType): pass
-class FunctionCall (ExpressionType): pass
-class DictDisplay  (ExpressionType): pass
-class SetDisplay   (ExpressionType): pass
-class ListDisplay  (ExpressionType): pass
-class Indexing     (ExpressionType): pass
-class Slicing      (ExpressionType): pass
-class Binary       (ExpressionType): pass
-class Unary        (ExpressionType): pass
-class KeyValuePair (ExpressionType): pass
-class Attributing  (ExpressionType): pass
-class ListComp     (ExpressionType): pass
+class Node:
+    '''
+    An expression. Subclasses keep their children in slots, listed 
+    by `_fields`. `line_number` is the line of the first lexem, 
+    counted from the line of its cmd.  
+    '''
+    __slots__ = ('line_number', )
+    _fields = ()
+
+    def children(self):
+        for field in self._fields:
+            x = getattr(self, field)
+            if type(x) is tuple:
+                yield from x
+            elif x is not None:
+                yield x
+
+    def friendlyName(self):
+        return type(self).__name__
+
+    def __repr__(self):
+        return self.friendlyName() + repr([*self.children()])
+    
+    def pprint(self, depth = 0):
+        print(' ' * depth, self.friendlyName(), '(', sep='', end='')
+        children = [*self.children()]
+        if children:
+            print()
+        for x in children:
+            x.pprint(depth + 1)
+        print(' ' * depth, ')', sep='')
+
+class Name(Node):
+    '''
+    `scope` is filled in by the resolver, see resolver.py. 
+    None means the name is looked up by walking the environment. 
+    '''
+    __slots__ = ('name', 'scope')
+
+    def __init__(self, name, line_number = None):
+        self.name : str = name
+        self.line_number = line_number
+        self.scope = None
+    
+    def __repr__(self):
+        return f'<Name {self.name} @ line {self.line_number}>'
+
+    def pprint(self, depth = 0):
+        print(' ' * depth, self, sep='')
+
+class Const(Node):
+    '''
+    A literal. `value` is the int, float, str, bool or None.  
+    '''
+    __slots__ = ('value', )
+
+    def __init__(self, value, line_number = None):
+        self.value = value
+        self.line_number = line_number
+    
+    def __repr__(self):
+        return f'<Const {self.value!r} @ line {self.line_number}>'
+
+    def pprint(self, depth = 0):
+        print(' ' * depth, self, sep='')
+
+class Parened(Node):
+    __slots__ = ('value', )
+    _fields = __slots__
+
+    def __init__(self, value, line_number = None):
+        self.value : Node = value
+        self.line_number = line_number
+
+class Display(Node):
+    __slots__ = ('elements', )
+    _fields = __slots__
+
+    def __init__(self, elements, line_number = None):
+        self.elements : tuple = elements
+        self.line_number = line_number
+
+class TupleDisplay(Display): __slots__ = ()
+class ListDisplay (Display): __slots__ = ()
+class SetDisplay  (Display): __slots__ = ()
+
+class DictDisplay(Node):
+    __slots__ = ('keys', 'values')
+    _fields = __slots__
+
+    def __init__(self, keys, values, line_number = None):
+        self.keys : tuple = keys
+        self.values : tuple = values
+        self.line_number = line_number
+    
+    def children(self):
+        for key, value in zip(self.keys, self.values):
+            yield key
+            yield value
+
+class Call(Node):
+    __slots__ = ('func', 'args')
+    _fields = __slots__
+
+    def __init__(self, func, args, line_number = None):
+        self.func : Node = func
+        self.args : tuple = args    # of FunctionArg
+        self.line_number = line_number
+
+class Subscript(Node):
+    __slots__ = ('value', 'index', 'quick')
+    _fields = ('value', 'index')
+
+    def __init__(self, value, index, line_number = None):
+        self.value : Node = value
+        self.index : Node = index
+        self.line_number = line_number
+        self.quick = None   # type feedback, see runtime.py
+
+class Slice(Node):
+    '''
+    value[start : stop : step]. Omitted bounds are `Empty`.  
+    '''
+    __slots__ = ('value', 'start', 'stop', 'step')
+    _fields = __slots__
+
+    def __init__(self, value, start, stop, step, line_number = None):
+        self.value : Node = value
+        self.start : Node = start
+        self.stop : Node = stop
+        self.step : Node = step
+        self.line_number = line_number
+
+class Attribute(Node):
+    __slots__ = ('value', 'attr', 'quick')
+    _fields = ('value', )
+
+    def __init__(self, value, attr, line_number = None):
+        self.value : Node = value
+        self.attr : str = attr
+        self.line_number = line_number
+        self.quick = None   # type feedback, see runtime.py
+    
+    def friendlyName(self):
+        return 'Attribute .' + self.attr
+
+class BinOp(Node):
+    __slots__ = ('op', 'left', 'right', 'quick')
+    _fields = ('left', 'right')
+
+    def __init__(self, op, left, right, line_number = None):
+        self.op : type = op     # a Lexem class in OPERATION_PRECEDENCE
+        self.left : Node = left
+        self.right : Node = right
+        self.line_number = line_number
+        self.quick = None   # type feedback, see runtime.py
+    
+    def friendlyName(self):
+        return self.op.__name__
+
+class UnaryOp(Node):
+    __slots__ = ('op', 'operand')
+    _fields = ('operand', )
+
+    def __init__(self, op, operand, line_number = None):
+        self.op : type = op
+        self.operand : Node = operand
+        self.line_number = line_number
+    
+    def friendlyName(self):
+        return self.op.__name__
+
+class ListComp(Node):
+    '''
+    [element for target of iterable if condition]
+    '''
+    __slots__ = ('element', 'target', 'iterable', 'condition')
+    _fields = __slots__
+
+    def __init__(
+        self, element, target, iterable, condition = None, 
+        line_number = None, 
+    ):
+        self.element : Node = element
+        self.target : Node = target
+        self.iterable : Node = iterable
+        self.condition : Node = condition
+        self.line_number = line_number
+
+class Empty(Node):
+    '''
+    For example, x[5:] is x[5:Empty]
+    '''
+    __slots__ = ()
 
-class FunctionArg: 
     def __init__(self):
-        self.name : Identifier = None
-        self.value : ExpressionTree = None
+        self.line_number = None
+
+    def __repr__(self):
+        return '<Empty>'
+    def pprint(self, depth = 0):
+        print(' ' * depth, repr(self), sep='')
+
+class Inlined(Node):
+    '''
+    A call the optimizer inlined, see optimizer.py. `body` is what 
+    `function` returns, with its parameters as `Parameter`s. 
+    `frames` holds the arguments of the evaluations under way.  
+    '''
+    __slots__ = ('call', 'function', 'body', 'frames')
+    _fields = ('call', 'body')
+
+    def __init__(self, call, function, body = None, line_number = None):
+        self.call : Call = call
+        self.function : FunctionDefinition = function
+        self.body : Node = body
+        self.frames = []
+        self.line_number = line_number
+
+class Parameter(Node):
+    '''
+    Argument number `index` of the innermost evaluation of `inlined`.  
+    '''
+    __slots__ = ('inlined', 'index')
+
+    def __init__(self, inlined, index, line_number = None):
+        self.inlined : Inlined = inlined
+        self.index : int = index
+        self.line_number = line_number
+
+    def __repr__(self):
+        return f'<Parameter {self.index} @ line {self.line_number}>'
+    def pprint(self, depth = 0):
+        print(' ' * depth, repr(self), sep='')
+
+class FunctionArg: 
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name = None, value = None):
+        self.name : str = name
+        self.value : Node = value
     
     def __repr__(self):
         s = '='.join((repr(self.name), repr(self.value)))
@@ -254,112 +475,131 @@ class FunctionArg:
             print(' ' * depth, end='')
         print(')')
 
-class ExpressionTree(list):
-    def __init__(self, _type, x = []):
-        super().__init__(x)
-        self.type = _type
-        self.operationLexem = None  # if type is Binary or Unary
-    
-    def friendlyName(self):
-        if self.type in (Binary, Unary):
-            return self.operationLexem.__name__
-        else:
-            return self.type.__name__
-
-    def __repr__(self):
-        return self.friendlyName() + list.__repr__(self)
-    
-    def pprint(self, depth = 0):
-        print(' ' * depth, self.friendlyName(), '(', sep='', end='')
-        if self:
-            print()
-        for x in self:
-            x.pprint(depth + 1)
-        print(' ' * depth, ')', sep='')
-
-class Empty:
+def relativeLines(cmdTree : CmdTree):
     '''
-    For example, x[5:] is x[5:Empty]
+    Makes the lines inside `cmdTree` count from its `line_number`. 
+    Lexems are the lexer's, so they are replaced by copies. Nodes are 
+    walked without recursion, as a long operator chain is deep.  
     '''
-    def __repr__(self):
-        return '<Empty>'
-    def pprint(self, depth = 0):
-        print(' ' * depth, repr(self), sep='')
+    line_number = cmdTree.line_number
+    todo = []
+    for i, x in enumerate(cmdTree):
+        if isinstance(x, Lexem):
+            x = copy(x)
+            x.line_number -= line_number
+            cmdTree[i] = x
+        else:
+            todo.append(x)
+    while todo:
+        x = todo.pop()
+        if type(x) is FunctionArg:
+            if x.value is not None:
+                todo.append(x.value)
+            continue
+        if x.line_number is not None:
+            x.line_number -= line_number
+        todo.extend(x.children())
+
+def findType(content_types, _type, start, end):
+    # index of the first `_type` in [start, end), or -1
+    try:
+        return content_types.index(_type, start, end)
+    except ValueError:
+        return -1
 
 def parseDisplay(
-    content, content_types, is_dict = False, 
+    content, content_types, start, end, is_dict = False, 
     delimiter = Comma, allow_empty = False, 
     parsingCallArgs = False, 
 ):
-    tree = ExpressionTree(None, [])
-    def parseOneElement(sub_content, sub_content_types):
-        if not sub_content:
+    '''
+    Parses content[start : end], which is shared with the caller and 
+    never copied. Returns the list of elements, which are 
+    (key, value) pairs if `is_dict`.  
+    '''
+    elements = []
+    def parseOneElement(sub_start, sub_end):
+        if sub_start == sub_end:
             if allow_empty:
-                tree.append(Empty())
+                elements.append(Empty())
                 return
             else:
                 raise SyntaxError(
                     '`parseDisplay` encounters empty segment while `allow_empty` is False. '
                 )
         if is_dict:
-            try:
-                column_i = sub_content_types.index(Column)
-            except ValueError:
+            column_i = findType(content_types, Column, sub_start, sub_end)
+            if column_i == -1:
                 raise SyntaxError(
                     'Mixed set and dict: '
-                    + repr(sub_content)
+                    + repr(content[sub_start : sub_end])
                 )
-            element = ExpressionTree(KeyValuePair, [
-                reduce(
-                    sub_content      [:column_i],
-                    sub_content_types[:column_i],
-                ), 
-                reduce(
-                    sub_content      [column_i+1 :], 
-                    sub_content_types[column_i+1 :], 
-                ), 
-            ])
+            element = (
+                reduce(content, content_types, sub_start, column_i), 
+                reduce(content, content_types, column_i + 1, sub_end), 
+            )
         else:
             if parsingCallArgs:
                 element = FunctionArg()
-                if Assign in sub_content_types:
-                    expect(sub_content[1], Assign)
-                    try:
-                        if sub_content_types[0] is not ExpressionTree:
-                            raise IndexError
-                        expect(sub_content[0][0], Identifier)
-                    except IndexError:
+                if findType(content_types, Assign, sub_start, sub_end) != -1:
+                    if sub_start + 1 >= sub_end:
+                        raise IndexError('list index out of range')
+                    expect(content[sub_start + 1], Assign)
+                    if type(content[sub_start]) is not Name:
                         raise SyntaxError(
                             'Expecting Identifier, but encountered' 
-                            + repr(sub_content[0])
+                            + repr(content[sub_start])
                         )
-                    element.name = sub_content[0][0]
-                    sub_content       = sub_content      [2:]
-                    sub_content_types = sub_content_types[2:]
-                element.value = reduce(sub_content, sub_content_types)
+                    element.name = content[sub_start].name
+                    sub_start += 2
+                element.value = reduce(
+                    content, content_types, sub_start, sub_end, 
+                )
             else:
-                element = reduce(sub_content, sub_content_types)
-        tree.append(element)
+                element = reduce(content, content_types, sub_start, sub_end)
+        elements.append(element)
     while True:
-        try:
-            delimiter_i = content_types.index(delimiter)
-        except ValueError:
+        delimiter_i = findType(content_types, delimiter, start, end)
+        if delimiter_i == -1:
             break
-        parseOneElement(content[:delimiter_i], content_types[:delimiter_i])
-        content       = content      [delimiter_i+1 :]
-        content_types = content_types[delimiter_i+1 :]
+        parseOneElement(start, delimiter_i)
+        start = delimiter_i + 1
     trialing_delimiter = True
-    if content:
+    if start < end:
         trialing_delimiter = False
-        parseOneElement(content, content_types)
-    return tree, trialing_delimiter
+        parseOneElement(start, end)
+    return elements, trialing_delimiter
+
+TERMINAL_LEXEMS = frozenset((Num, String, Boolean, NONE, Identifier))
+OPENING_BRACKETS = frozenset((LParen, LSquareBracket, LBracket))
+CLOSING_BRACKETS = frozenset((RParen, RBracket, RSquareBracket))
+BUFFERED_LEXEMS = frozenset((
+    LParen, LSquareBracket, LBracket, Comma, 
+    Or, And, Not, LessThanOrEqual, LessThan, 
+    GreaterThanOrEqual, GreaterThan, NotEqual, 
+    Equal, In, Is, Plus, Minus, Times, Divide, 
+    ModDiv, ToPowerOf, Dot, 
+))
+# only allowed inside brackets
+BRACKETED_LEXEMS = frozenset((Column, Of, For, If, Assign))
 
 def parseExpression(lexer, first_lexem = None):
     buffer = []
+    buffer_types = []
+    # opening bracket type -> indices in `buffer`, innermost last
+    opened = {LParen: [], LSquareBracket: [], LBracket: []}
     unclosed = 0
+    def push(x):
+        buffer      .append(x)
+        buffer_types.append(type(x))
+    def pushNode(node):
+        buffer      .append(node)
+        buffer_types.append(Node)
+    def pop():
+        buffer_types.pop(-1)
+        return buffer.pop(-1)
     while True:
         interupted = False
-        buffer_types = [type(x) for x in buffer]
         if first_lexem is None:
             try:
                 lexem = next(lexer)
@@ -369,151 +609,168 @@ def parseExpression(lexer, first_lexem = None):
         else:
             lexem = first_lexem
             first_lexem = None
-        if type(lexem) in (Num, String, Boolean, NONE, Identifier):
-            buffer.append(ExpressionTree(Terminal, [lexem]))
-            if type(lexem) is Identifier:
-                buffer_types.append(type(buffer[-1]))
-                if len(buffer_types) >= 3 and buffer_types[-2] is Dot:
-                    expect(buffer[-3], ExpressionTree)
-                    buffer, left, right = buffer[:-3], buffer[-3], buffer[-1]
-                    buffer.append(ExpressionTree(
-                        Attributing, [left, right]
-                    ))
-        elif type(lexem) in (RParen, RBracket, RSquareBracket):
-            try:
-                content_len = buffer_types[::-1].index(
-                    lexem.MATCH
-                )
-            except ValueError:
+        if type(lexem) is Identifier:
+            if len(buffer_types) >= 2 and buffer_types[-1] is Dot:
+                if buffer_types[-2] is not Node:
+                    raise SyntaxError(
+                        'Expecting Node, but parser encountered ' 
+                        + repr(buffer[-2])
+                    )
+                pop()
+                left = pop()
+                pushNode(Attribute(left, lexem.value, left.line_number))
+            else:
+                pushNode(Name(lexem.value, lexem.line_number))
+        elif type(lexem) in TERMINAL_LEXEMS:
+            if type(lexem) is NONE:
+                pushNode(Const(None, lexem.line_number))
+            else:
+                pushNode(Const(lexem.value, lexem.line_number))
+        elif type(lexem) in CLOSING_BRACKETS:
+            stack = opened[lexem.MATCH]
+            if not stack:
                 interupted = True
             else:
                 unclosed -= 1
-                if content_len == 0:
-                    content = []
-                else:
-                    content = buffer[-content_len:]
-                buffer = buffer[:-content_len - 1]
-                content_types = [type(x) for x in content]
+                start = stack.pop(-1)
+                for other in opened.values():
+                    # brackets left open inside the content
+                    while other and other[-1] > start:
+                        other.pop(-1)
+                # The content is buffer[start + 1 : end]. It is parsed 
+                # in place, then cut off together with the opener. 
+                end = len(buffer)
+                has_subject = (
+                    start > 0 and buffer_types[start - 1] is Node
+                )
+                line_number = buffer[start].line_number
                 if type(lexem) is RParen:
-                    if buffer and type(buffer[-1]) is ExpressionTree:
-                        callee = buffer.pop(-1)
+                    if has_subject:
+                        callee = buffer[start - 1]
                         theArgs, _ = parseDisplay(
-                            content, content_types, 
+                            buffer, buffer_types, start + 1, end, 
                             parsingCallArgs = True, 
                         )
-                        buffer.append(ExpressionTree(
-                            FunctionCall, [callee, *theArgs], 
-                        ))
+                        tree = Call(
+                            callee, tuple(theArgs), callee.line_number, 
+                        )
                     else:
                         theTuple, trialing_comma = parseDisplay(
-                            content, content_types, 
+                            buffer, buffer_types, start + 1, end, 
                         )
                         if len(theTuple) == 1 and not trialing_comma:
-                            theTuple.type = Parened
-                            theParened = theTuple
-                            buffer.append(theParened)
+                            tree = Parened(theTuple[0], line_number)
                         else:
-                            theTuple.type = TupleDisplay
-                            buffer.append(theTuple)
+                            tree = TupleDisplay(tuple(theTuple), line_number)
                 elif type(lexem) is RBracket:
-                    if Column in content_types:
-                        theDict, _ = parseDisplay(
-                            content, content_types, is_dict=True, 
+                    has_subject = False
+                    if findType(buffer_types, Column, start + 1, end) != -1:
+                        pairs, _ = parseDisplay(
+                            buffer, buffer_types, start + 1, end, 
+                            is_dict=True, 
+                        )
+                        tree = DictDisplay(
+                            tuple(key for key, _ in pairs), 
+                            tuple(value for _, value in pairs), 
+                            line_number, 
                         )
-                        theDict.type = DictDisplay
-                        buffer.append(theDict)
                     else:
                         theSet, _ = parseDisplay(
-                            content, content_types, 
+                            buffer, buffer_types, start + 1, end, 
                         )
-                        theSet.type = SetDisplay
                         if len(theSet) == 0:
-                            theSet.type = DictDisplay
-                            theDict = theSet
-                        buffer.append(theDict)
+                            tree = DictDisplay((), (), line_number)
+                        else:
+                            tree = SetDisplay(tuple(theSet), line_number)
                 elif type(lexem) is RSquareBracket:
-                    if buffer and type(buffer[-1]) is ExpressionTree:
-                        indexable = buffer.pop(-1)
-                        if Column in content_types:
-                            tree = ExpressionTree(
-                                Slicing, [indexable]
-                            )
+                    if has_subject:
+                        indexable = buffer[start - 1]
+                        if findType(buffer_types, Column, start + 1, end) != -1:
                             theSlice, trialing_column = parseDisplay(
-                                content, content_types, 
+                                buffer, buffer_types, start + 1, end, 
                                 delimiter=Column, allow_empty=True, 
                             )
                             if trialing_column:
                                 theSlice.append(Empty())
                             if len(theSlice) == 2:
-                                theSlice.append(ExpressionTree(Terminal, 
-                                    [Num(1)]
-                                ))
-                            tree.extend(theSlice)
-                            buffer.append(tree)
+                                theSlice.append(Const(1))
+                            if len(theSlice) > 3:
+                                raise SyntaxError(
+                                    'Slice has more than 3 parts: '
+                                    + repr(theSlice)
+                                )
+                            tree = Slice(
+                                indexable, *theSlice, indexable.line_number, 
+                            )
                         else:
-                            buffer.append(ExpressionTree(Indexing, [
+                            tree = Subscript(
                                 indexable, 
-                                reduce(content, content_types), 
-                            ]))
+                                reduce(buffer, buffer_types, start + 1, end), 
+                                indexable.line_number, 
+                            )
                     else:
-                        if For in content_types or Of in content_types:
-                            if For not in content_types or Of not in content_types:
+                        for_i = findType(buffer_types, For, start + 1, end)
+                        of_i  = findType(buffer_types, Of , start + 1, end)
+                        if for_i != -1 or of_i != -1:
+                            if for_i == -1 or of_i == -1:
                                 raise SyntaxError(
                                     'List comp must have both "for" and "of", but you gave'
-                                    + repr(content)
+                                    + repr(buffer[start + 1 : end])
                                 )
-                            theListComp = ExpressionTree(
-                                ListComp, []
+                            element = reduce(
+                                buffer, buffer_types, start + 1, for_i, 
                             )
-                            sep = content_types.index(For)
-                            y, content_types = content_types[:sep], content_types[sep+1:]
-                            x, content       = content      [:sep], content      [sep+1:]
-                            theListComp.append(reduce(x, y))
-                            sep = content_types.index(Of)
-                            y, content_types = content_types[:sep], content_types[sep+1:]
-                            x, content       = content      [:sep], content      [sep+1:]
-                            theListComp.append(reduce(x, y))
-                            if If in content_types:
-                                sep = content_types.index(If)
-                                y, content_types = content_types[:sep], content_types[sep+1:]
-                                x, content       = content      [:sep], content      [sep+1:]
+                            of_i = buffer_types.index(Of, for_i + 1, end)
+                            target = reduce(
+                                buffer, buffer_types, for_i + 1, of_i, 
+                            )
+                            if_i = findType(buffer_types, If, of_i + 1, end)
+                            if if_i == -1:
+                                iterable = reduce(
+                                    buffer, buffer_types, of_i + 1, end, 
+                                )
+                                condition = None
                             else:
-                                x, y = content, content_types
-                            theListComp.append(reduce(x, y))
-                            if If in content_types:
-                                theListComp.append(reduce(content, content_types))
-                            buffer.append(theListComp)
+                                iterable = reduce(
+                                    buffer, buffer_types, of_i + 1, if_i, 
+                                )
+                                condition = reduce(
+                                    buffer, buffer_types, if_i + 1, end, 
+                                )
+                            tree = ListComp(
+                                element, target, iterable, condition, 
+                                line_number, 
+                            )
                         else:
                             theList, _ = parseDisplay(
-                                content, content_types, 
+                                buffer, buffer_types, start + 1, end, 
                             )
-                            theList.type = ListDisplay
-                            buffer.append(theList)
-        elif type(lexem) in (
-            LParen, LSquareBracket, LBracket, Comma, 
-            Or, And, Not, LessThanOrEqual, LessThan, 
-            GreaterThanOrEqual, GreaterThan, NotEqual, 
-            Equal, In, Is, Plus, Minus, Times, Divide, 
-            ModDiv, ToPowerOf, Dot, 
-        ):
-            buffer.append(lexem)
-            if type(lexem) in (LParen, LSquareBracket, LBracket):
+                            tree = ListDisplay(tuple(theList), line_number)
+                if has_subject:
+                    start -= 1
+                del buffer      [start :]
+                del buffer_types[start :]
+                pushNode(tree)
+        elif type(lexem) in BUFFERED_LEXEMS:
+            if type(lexem) in OPENING_BRACKETS:
+                opened[type(lexem)].append(len(buffer))
                 unclosed += 1
-        elif type(lexem) in (Column, Of, For, If, Assign):
+            push(lexem)
+        elif type(lexem) in BRACKETED_LEXEMS:
             if unclosed > 0:
-                buffer.append(lexem)
+                push(lexem)
             else:
                 interupted = True
         else:
             interupted = True
         if interupted:
             if unclosed:
-                which = {LParen, LSquareBracket, LBracket}.intersection(
-                    buffer_types
-                )
                 if type(lexem) is EoL:
                     expect(next(lexer), Indentation)
                 else:
+                    which = {
+                        LParen, LSquareBracket, LBracket, 
+                    }.intersection(buffer_types)
                     raise SyntaxError(
                         'Expression terminated by '
                         + repr(lexem) 
@@ -521,34 +778,125 @@ def parseExpression(lexer, first_lexem = None):
                         + repr([x.__name__ for x in which])
                     )
             else:
-                return reduce(buffer, [type(x) for x in buffer]), lexem
+                return reduce(
+                    buffer, buffer_types, 0, len(buffer), 
+                ), lexem
 
-def reduce(content, content_types):
-    if not content:
+# operation -> binding power; every operation is a level of its own
+PRECEDENCE = {
+    operation : len(OPERATION_PRECEDENCE) - i
+    for i, operation in enumerate(OPERATION_PRECEDENCE)
+}
+BINARY_OPERATIONS = frozenset(OPERATION_PRECEDENCE) - {UnaryNegate, Not}
+FUSIONS = {
+    (Is, Not): IsNot, 
+    (Not, In): NotIn, 
+}
+
+def reduce(content, content_types, start = 0, end = None):
+    '''
+    Reduces content[start : end] into one node.  
+    '''
+    if end is None:
+        end = len(content)
+    if start >= end:
         raise SyntaxError('Reducing empty expression.')
-    for i in range(len(content) - 1, -1, -1):
-        if content_types[i] is EoL:
-            content_types.pop(i)
-            content      .pop(i)
-    for right_i in range(len(content) - 1, 0, -1):
-        selected = content_types[right_i-1 : right_i+1]
-        line_number = content[right_i - 1]
-        replace = None
-        if selected == [Is, Not]:
-            replace = IsNot
-        elif selected == [Not, In]:
-            replace = NotIn
-        if replace is not None:
-            content_types = content_types[
-                : right_i - 1
-            ] + [
-                replace
-            ] + content_types[right_i + 1 :]
-            content       = content      [
-                : right_i - 1
-            ] + [
-                replace().lineNumber(line_number)
-            ] + content      [right_i + 1 :]
+    if hasFusion(content_types, start, end):
+        content, content_types = fuseOperations(
+            content, content_types, start, end, 
+        )
+        start, end = 0, len(content)
+    if isWellFormed(content_types, start, end):
+        tree, _ = climb(content, content_types, start, end, 0)
+        return tree
+    return reduceByLevels(content[start : end], content_types[start : end])
+
+def hasFusion(content_types, start, end):
+    for i in range(start, end - 1):
+        if content_types[i] in (Is, Not) and (
+            content_types[i], content_types[i + 1]
+        ) in FUSIONS:
+            return True
+    return False
+
+def fuseOperations(content, content_types, start, end):
+    '''
+    `is not` -> IsNot, `not in` -> NotIn. Pairs are taken from the 
+    right, so `is not in` is `is (not in)`. Returns new lists.  
+    '''
+    fused       = []
+    fused_types = []
+    right_i = end - 1
+    while right_i >= start:
+        replace = FUSIONS.get(
+            (content_types[right_i - 1], content_types[right_i])
+        ) if right_i > start else None
+        if replace is None:
+            fused      .append(content      [right_i])
+            fused_types.append(content_types[right_i])
+            right_i -= 1
+        else:
+            line_number = content[right_i - 1]
+            fused      .append(replace().lineNumber(line_number))
+            fused_types.append(replace)
+            right_i -= 2
+    fused      .reverse()
+    fused_types.reverse()
+    return fused, fused_types
+
+def isWellFormed(content_types, start, end):
+    '''
+    operand (operation operand)*, where an operand may be preceded 
+    by one `not` if it starts the expression or follows and/or.  
+    Anything else is left to `reduceByLevels`, whatever it makes of it.  
+    '''
+    expecting_operand = True
+    prev_type = None
+    for i in range(start, end):
+        _type = content_types[i]
+        if expecting_operand:
+            if _type is Node:
+                expecting_operand = False
+            elif _type is Not and prev_type in (None, And, Or):
+                pass
+            else:
+                return False
+        else:
+            if _type in BINARY_OPERATIONS:
+                expecting_operand = True
+            else:
+                return False
+        prev_type = _type
+    return not expecting_operand
+
+def climb(content, content_types, i, end, min_precedence):
+    '''
+    Precedence climbing over a well-formed range, starting at `i`.  
+    Gives the same trees as applying OPERATION_PRECEDENCE level by 
+    level, leftmost first: equal operations associate to the left.  
+    Returns (tree, index after it).  
+    '''
+    if content_types[i] is Not:
+        line_number = content[i].line_number
+        operand, i = climb(
+            content, content_types, i + 1, end, PRECEDENCE[Not] + 1, 
+        )
+        left = UnaryOp(Not, operand, line_number)
+    else:
+        left = content[i]
+        i += 1
+    while i < end:
+        operation = content_types[i]
+        precedence = PRECEDENCE[operation]
+        if precedence < min_precedence:
+            break
+        right, i = climb(
+            content, content_types, i + 1, end, precedence + 1, 
+        )
+        left = BinOp(operation, left, right, left.line_number)
+    return left, i
+
+def reduceByLevels(content, content_types):
     for right_i in range(len(content) - 1, 0, -1):
         if content_types[right_i] is Minus and (
             right_i == 0 
@@ -570,9 +918,10 @@ def reduce(content, content_types):
             if operation in (UnaryNegate, Not):
                 right = content.pop(operation_i + 1)
                 content_types  .pop(operation_i + 1)
-                tree = ExpressionTree(Unary, [right])
-                tree.operationLexem = operation
-                content_types[operation_i] = ExpressionTree
+                tree = UnaryOp(
+                    operation, right, content[operation_i].line_number, 
+                )
+                content_types[operation_i] = Node
                 content      [operation_i] = tree
             else:
                 # binary operation
@@ -583,9 +932,8 @@ def reduce(content, content_types):
                 left  = content.pop(operation_i - 1)
                 content_types  .pop(operation_i - 1)
                 operation_i -= 1
-                tree = ExpressionTree(Binary, [left, right])
-                tree.operationLexem = operation
-                content_types[operation_i] = ExpressionTree
+                tree = BinOp(operation, left, right, left.line_number)
+                content_types[operation_i] = Node
                 content      [operation_i] = tree
     if len(content) > 1:
         e_text = (
@@ -614,6 +962,23 @@ class Sequence(list):
         self, cmdsParser, first_cmd = None, 
         min_indent = None, 
     ):
+        '''
+        Returns the cmd that ends the sequence: the first shallower 
+        one, or a stand-in with `indent_level` -1 at the end.  
+        '''
+        elements = self.iterParse(cmdsParser, first_cmd, min_indent)
+        try:
+            while True:
+                self.append(next(elements))
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    def iterParse(cmdsParser, first_cmd = None, min_indent = None):
+        '''
+        Yields the elements (cmdTree | substructure) one by one, each 
+        as soon as it is complete. Returns what `parse` returns.  
+        '''
         indent_level = None
         cmd = first_cmd
         while True:
@@ -648,12 +1013,12 @@ class Sequence(list):
                         + ' @ line ' + str(cmd.line_number)
                     )
                 else:
-                    self.append(cmd)
+                    yield cmd
                     cmd = None
             else:
                 substructure = SubstructureClass()
                 cmd = substructure.parse(cmdsParser, cmd)
-                self.append(substructure)
+                yield substructure
     
     def pprint(self, depth = 0):
         print(' ' * depth, '{', sep='')
@@ -830,6 +1195,10 @@ class FunctionDefinition:
     def __init__(self):
         self._def : CmdTree = None
         self.body : Sequence = None
+        self.layout = None  # of its frame, see resolver.py
+        self.code = None    # compiled on its first call, see vm.py
+        self.closure = None # compiled on its first call, see closures.py
+        self.native = None  # transpiled to Python, see transpiler.py
     
     def parse(self, cmdsParser, first_cmd : CmdTree = None):
         self._def = first_cmd
@@ -0,0 +1,117 @@
+'''
+Parses the modules a program is about to import in worker processes,
+while the importer runs. Only parsing happens early: modules are still
+executed when their `import` is reached.
+'''
+import os
+from threading import RLock
+from concurrent.futures import ProcessPoolExecutor
+from lexems import Identifier, Import, From
+from parSer import (
+    CmdTree, Sequence, Name, Attribute,
+    FunctionDefinition, ClassDefinition,
+)
+from minipyc import loadMST
+from resolver import subSequences
+
+def dottedName(node):
+    # `a.b.c` -> 'a.b.c'. None if it isn't one.
+    if type(node) is Name:
+        return node.name
+    if type(node) is Attribute:
+        base = dottedName(node.value)
+        if base is not None:
+            return base + '.' + node.attr
+    return None
+
+def importedNames(sequence : Sequence):
+    '''
+    Names of the modules imported anywhere in `sequence`, including
+    function bodies and branches that may never run.
+    '''
+    for element in sequence:
+        if type(element) is CmdTree:
+            if element.type is Import and type(element[0]) is Identifier:
+                yield element[0].value
+            elif element.type is From:
+                name = dottedName(element[0])
+                if name is not None:
+                    yield name
+        elif type(element) in (FunctionDefinition, ClassDefinition):
+            yield from importedNames(element.body)
+        else:
+            for subSequence in subSequences(element):
+                yield from importedNames(subSequence)
+
+def parseModule(filename, lexer_engine, use_cache):
+    # Runs in a worker. The result goes back pickled.
+    root = loadMST(filename, lexer_engine, use_cache)
+    return root, [*importedNames(root)]
+
+class Prefetcher:
+    '''
+    `prefetch(names)` starts parsing the modules, and then whatever
+    they import, in a process pool. `take(filename)` hands over the
+    parsed module, or None if the importer should parse it itself,
+    e.g. because the worker failed. A module is parsed at most once.
+    '''
+    def __init__(self, findFile, lexer_engine, use_cache):
+        self.findFile = findFile    # name -> filename | None
+        self.lexer_engine = lexer_engine
+        self.use_cache = use_cache
+        self.executor = None
+        # One core is left to the importer. With none to spare, 
+        # prefetching only adds pickling.
+        self.n_workers = (os.cpu_count() or 1) - 1
+        self.disabled = self.n_workers < 1
+        self.futures = {}   # filename -> Future
+        self.seen = set()   # filenames taken or submitted
+        self.lock = RLock() # done callbacks run in another thread
+
+    def prefetch(self, names):
+        with self.lock:
+            for name in names:
+                if self.disabled:
+                    return
+                filename = self.findFile(name)
+                if filename is None or filename in self.seen:
+                    continue
+                self.seen.add(filename)
+                try:
+                    if self.executor is None:
+                        self.executor = ProcessPoolExecutor(self.n_workers)
+                    future = self.executor.submit(
+                        parseModule, filename,
+                        self.lexer_engine, self.use_cache,
+                    )
+                except Exception:
+                    # No process pool here. Import serially.
+                    self.disabled = True
+                    self.shutdown()
+                    return
+                self.futures[filename] = future
+                future.add_done_callback(self.onParsed)
+
+    def onParsed(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, names = future.result()
+        self.prefetch(names)
+
+    def take(self, filename):
+        with self.lock:
+            self.seen.add(filename)
+            future = self.futures.pop(filename, None)
+        if future is None or future.cancel():
+            # Not started yet. Parsing here is no slower.
+            return None
+        try:
+            root, _ = future.result()
+        except Exception:
+            # Parse again here, to raise at the right moment.
+            return None
+        return root
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
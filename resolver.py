@@ -0,0 +1,211 @@
+'''
+Static scope resolution.
+Each `Name` in a module gets a `scope`:
+    (kind, hops, slot)
+`kind` is LOCAL, ENCLOSING, GLOBAL or BUILTIN. At run time, the
+namespace holding the name is `environment[-1 - hops]`. For locals of
+a function, that is the call's `Frame`, and `slot` is the index of the
+name in it. For globals and builtins, it is the module namespace, and
+`slot` is None.
+Names whose namespace is only known at run time, e.g. in class bodies
+or after `from x import *`, keep `scope = None` and are looked up by
+walking the environment, as before.
+'''
+from lexems import Identifier, Import, From, Del, Times
+from parSer import (
+    CmdTree, Sequence, FunctionArg, Node, Name, Parened,
+    TupleDisplay, ListDisplay, ListComp, AssignCmd,
+    Conditional, WhileLoop, ForLoop, TryExcept,
+    FunctionDefinition, ClassDefinition,
+)
+
+LOCAL     = 'local'
+ENCLOSING = 'enclosing'
+GLOBAL    = 'global'
+BUILTIN   = 'builtin'
+
+class Layout:
+    '''
+    Where a function keeps its locals. Parameters come first, in
+    order, so positional arguments go to slots 0, 1, ...
+    '''
+    __slots__ = ('names', 'slots')
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.slots = {name: i for i, name in enumerate(self.names)}
+
+    def __repr__(self):
+        return f'<Layout {", ".join(self.names)}>'
+
+class Scope:
+    '''
+    One namespace between a name and the module, at run time.
+    `bound` is None if what it binds is only known at run time.
+    '''
+    def __init__(self, bound, layout = None):
+        self.bound = bound
+        self.layout = layout
+
+class ModuleScope:
+    def __init__(self, bound, builtin_names):
+        self.bound = bound
+        self.builtin_names = builtin_names
+
+def targetNames(target):
+    if type(target) is Name:
+        yield target.name
+    elif type(target) is Parened:
+        yield from targetNames(target.value)
+    elif type(target) in (TupleDisplay, ListDisplay):
+        for element in target.elements:
+            yield from targetNames(element)
+
+def boundNames(sequence : Sequence, bound : dict):
+    '''
+    Adds to `bound` the names `sequence` binds in its own namespace,
+    not counting nested function and class bodies. Returns False if
+    that can't be known, i.e. there is a `from x import *`.
+    '''
+    for element in sequence:
+        _type = type(element)
+        if _type is CmdTree:
+            if element.type in (AssignCmd, Del):
+                for name in targetNames(element[0]):
+                    bound[name] = None
+            elif element.type is Import:
+                bound[element[0].value] = None
+            elif element.type is From:
+                for lexem in element[1:]:
+                    if type(lexem) is Times:
+                        return False
+                    bound[lexem.value] = None
+            continue
+        if _type is FunctionDefinition:
+            bound[element._def[0].value] = None
+            continue
+        if _type is ClassDefinition:
+            bound[element._class[0].value] = None
+            continue
+        if _type is ForLoop:
+            for name in targetNames(element.condition[0]):
+                bound[name] = None
+        for subSequence in subSequences(element):
+            if not boundNames(subSequence, bound):
+                return False
+    return True
+
+def subSequences(element):
+    # of a control-flow element, in one namespace
+    _type = type(element)
+    if _type is Conditional:
+        yield element.then
+        for elIf in element.elIfs:
+            yield elIf.then
+    elif _type in (WhileLoop, ForLoop):
+        yield element.body
+    elif _type is TryExcept:
+        yield element._try
+        for oneCatch in element.oneCatches:
+            yield oneCatch.handler
+        if element._finally is not None:
+            yield element._finally
+    if _type in (Conditional, WhileLoop, ForLoop, TryExcept):
+        if element._else is not None:
+            yield element._else
+
+def lookUp(name, scopes):
+    hops = 0
+    kind = LOCAL
+    for scope in reversed(scopes):
+        if type(scope) is ModuleScope:
+            if scope.bound is None or name in scope.bound:
+                return (GLOBAL, hops, None)
+            if name in scope.builtin_names:
+                return (BUILTIN, hops, None)
+            return (GLOBAL, hops, None)
+        if scope.bound is None:
+            return None
+        if name in scope.bound:
+            if scope.layout is None:
+                return None     # e.g. a list comprehension's variable
+            return (kind, hops, scope.layout.slots[name])
+        if scope.layout is not None:
+            kind = ENCLOSING
+        hops += 1
+    return None
+
+def resolveExpression(node, scopes):
+    if type(node) is Name:
+        node.scope = lookUp(node.name, scopes)
+    elif type(node) is ListComp:
+        # The iterable is evaluated outside; the rest in a namespace
+        # of its own, holding the loop variables.
+        resolveExpression(node.iterable, scopes)
+        inner = [*scopes, Scope(dict.fromkeys(targetNames(node.target)))]
+        resolveExpression(node.target, inner)
+        resolveExpression(node.element, inner)
+        if node.condition is not None:
+            resolveExpression(node.condition, inner)
+    elif isinstance(node, Node):
+        for child in node.children():
+            resolveExpression(child, scopes)
+    elif type(node) is FunctionArg:
+        if node.value is not None:
+            resolveExpression(node.value, scopes)
+
+def resolveCmdTree(cmdTree : CmdTree, scopes):
+    for x in cmdTree:
+        if type(x) is not Identifier:
+            resolveExpression(x, scopes)
+
+def resolveElements(sequence, scopes):
+    for element in sequence:
+        _type = type(element)
+        if _type is CmdTree:
+            resolveCmdTree(element, scopes)
+        elif _type is FunctionDefinition:
+            resolveCmdTree(element._def, scopes)    # default values
+            resolveFunction(element, scopes)
+        elif _type is ClassDefinition:
+            resolveCmdTree(element._class, scopes)
+            resolveElements(element.body, [*scopes, Scope(None)])
+        else:
+            if _type in (Conditional, WhileLoop, ForLoop):
+                resolveCmdTree(element.condition, scopes)
+            if _type is Conditional:
+                for elIf in element.elIfs:
+                    resolveCmdTree(elIf.condition, scopes)
+            if _type is TryExcept:
+                for oneCatch in element.oneCatches:
+                    resolveCmdTree(oneCatch.catching, scopes)
+            for subSequence in subSequences(element):
+                resolveElements(subSequence, scopes)
+
+def resolveFunction(function : FunctionDefinition, scopes):
+    bound = {arg.name: None for arg in function._def[1:]}
+    if boundNames(function.body, bound):
+        function.layout = Layout(bound)
+        scope = Scope(bound, function.layout)
+    else:
+        function.layout = None
+        scope = Scope(None)
+    resolveElements(function.body, [*scopes, scope])
+
+def resolveSequence(sequence : Sequence, builtin_names = ()):
+    '''
+    Resolves the names in a module, in place, and gives each
+    function the `Layout` of its frame.
+    '''
+    bound = {}
+    if not boundNames(sequence, bound):
+        bound = None
+    resolveElements(sequence, [ModuleScope(bound, builtin_names)])
+
+def resolveStream(elements):
+    # For streamed modules. What the rest of the module binds is not
+    # known yet, so nothing is classified as BUILTIN.
+    scopes = [ModuleScope({}, ())]
+    for element in elements:
+        resolveElements((element, ), scopes)
+        yield element
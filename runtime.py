@@ -1,43 +1,72 @@
 from __future__ import annotations
 import os
-from typing import List, Dict, Set
+import operator
+from typing import List, Dict, Set, Tuple
+from types import MappingProxyType
 from functools import partial
 from lexems import *
-from lexer import Lexer
+from lexer import Lexer, CHAR_ENGINE
+from minipyc import loadMST
+from prefetch import Prefetcher, importedNames
+from optimizer import optimizeModule, optimizeStream
+from resolver import resolveSequence, resolveStream
 from parSer import (
-    CmdTree, ExpressionTree, FunctionArg, Sequence, CmdsParser, 
+    CmdTree, Node, FunctionArg, Sequence, CmdsParser, 
     Conditional, WhileLoop, ForLoop, TryExcept, 
     AssignCmd, Empty, ExpressionCmd, 
     IsNot, NotIn, 
     FunctionDefinition, ClassDefinition, 
-    Terminal, Parened, TupleDisplay, FunctionCall, 
-    DictDisplay, SetDisplay, ListDisplay, Indexing, Slicing, 
-    Binary, Unary, Attributing, ListComp, UnaryNegate, 
+    Name, Const, Parened, TupleDisplay, Call, 
+    DictDisplay, SetDisplay, ListDisplay, Subscript, Slice, 
+    BinOp, UnaryOp, Attribute, ListComp, UnaryNegate, 
+    Inlined, Parameter, 
 )
 
+TREE_ENGINE = 'tree'
+VM_ENGINE = 'vm'
+CLOSURE_ENGINE = 'closure'
+ENGINES = (TREE_ENGINE, VM_ENGINE, CLOSURE_ENGINE)
+
 class NULL: pass
 
 class Thing:
-    def __init__(self) -> None:
-        self._class : Thing = None
-        self.namespace = Namespace()
+    '''
+    What a Thing is not given falls back to the defaults below, so e.g. 
+    an int is only its class and its primitive value. An instance gets 
+    its namespace the first time it is asked for, see `__getattr__`.  
+    '''
+    # if it is a function
+    environment = None
+    mst : FunctionDefinition = None
+    default_args : Dict[str, Thing] = MappingProxyType({})
+    runTime = None
 
-        # if it is a function
-        self.environment = None
-        self.mst : FunctionDefinition = None
-        self.default_args : Dict[str, Thing] = {}
-        self.runTime = None
+    # if it is a primitive
+    primitive_value = NULL
 
-        # if it is a primitive
-        self.primitive_value = NULL
+    # if it is a wrapper
+    wrappedFrom = None
 
-        # if it is a wrapper
-        self.wrappedFrom = None
+    def __init__(
+        self, _class : Thing = None, primitive_value = NULL, 
+    ) -> None:
+        self._class = _class
+        if _class is None:
+            self.namespace = Namespace()
+        if primitive_value is not NULL:
+            self.primitive_value = primitive_value
+    
+    def __getattr__(self, name):
+        # Only called for what the Thing does not have yet.  
+        if name != 'namespace':
+            raise AttributeError(name)
+        self.namespace = InstanceNamespace(self)
+        return self.namespace
     
     def copy(self):
-        thing = Thing()
-        thing._class          = self._class
-        thing.namespace       = Namespace(self.namespace)
+        thing = Thing(self._class)
+        if hasNamespace(self):
+            thing.namespace   = self.namespace.copyFor(thing)
         thing.environment     = self.environment
         thing.mst             = self.mst
         thing.default_args    = self.default_args
@@ -60,7 +89,7 @@ class Thing:
     def __hash__(self):
         if self.primitive_value is not NULL:
             return hash(self.primitive_value)
-        result = self.namespace['__hash__'].call()
+        result = callMethod(self, '__hash__')
         assertPrimitive(result)
         return result.primitive_value
     
@@ -84,36 +113,58 @@ def instantiate(
     theClass : Thing, args = (), keyword_args = {}, 
     skip_init = False, 
 ):
-    thing = Thing()
-    thing._class = theClass
-    baseclass = theClass
-    while True:
-        __base__ = None
-        for name, value in baseclass.namespace.items():
-            if name == '__base__':
-                __base__ = value
+    thing = Thing(theClass)
+    if not skip_init:
+        __init__ = lookupClass(theClass, '__init__')
+        if __init__ is not None:
+            if __init__._class is builtin.Function:
+                returned = __init__.call(thing, *args, **keyword_args)
             else:
-                if (
-                    name not in thing.namespace
-                    and name not in ('__name__', '__repr__')
-                ):
-                    if value._class is builtin.Function:
-                        value = value.copy()
-                        value.call = partial(value.call, thing)
-                    thing.namespace[name] = value
-        if __base__ is None:
-            break
-        baseclass = __base__
-    if not skip_init and '__init__' in thing.namespace:
-        returned = thing.namespace['__init__'].call(*args, **keyword_args)
-        if not isNone(returned):
-            raise Helicopter(
-                builtin.TypeError, 
-                '__init__ should return None, not'
-                + reprString(returned), 
-            )
+                returned = __init__.call(*args, **keyword_args)
+            if not isNone(returned):
+                raise Helicopter(
+                    builtin.TypeError, 
+                    '__init__ should return None, not'
+                    + reprString(returned), 
+                )
     return thing
 
+def hasNamespace(thing : Thing) -> bool:
+    # Whether `thing` has made its namespace, see `Thing.__getattr__`.  
+    return 'namespace' in thing.__dict__
+
+def lookupClass(theClass : Thing, key):
+    '''
+    What `theClass`, or else the nearest of its bases, holds as `key`, 
+    unbound. None if none does. Only what each class holds itself, not 
+    what it gets from Class.  
+    '''
+    while True:
+        namespace = theClass.namespace
+        value = dict.get(namespace, key)
+        if value is not None:
+            return value
+        theClass = dict.get(namespace, '__base__')
+        if theClass is None:
+            return None
+
+def callMethod(thing : Thing, name : str, *args):
+    '''
+    `thing.name(*args)`. If `thing` has no namespace yet, nothing can 
+    have overridden the class's function, which is then called with 
+    `thing`, neither making the namespace nor binding a method.  
+    '''
+    if not hasNamespace(thing):
+        method = lookupClass(thing._class, name)
+        if method is not None and method._class is builtin.Function:
+            return method.call(thing, *args)
+    return thing.namespace[name].call(*args)
+
+def bindMethod(func : Thing, thing : Thing) -> Thing:
+    method = func.copy()
+    method.call = partial(func.call, thing)
+    return method
+
 def unprimitize(primitive):
     if type(primitive) is bool:
         if primitive:
@@ -124,23 +175,15 @@ def unprimitize(primitive):
     elif type(primitive) is dict:
         thing = instantiate(builtin.dict)
         for key, value in primitive.items():
-            thing.namespace['__setitem__'].call(key, value)
+            callMethod(thing, '__setitem__', decodeKey(key), value)
         return thing
     elif type(primitive) is set:
         thing = instantiate(builtin.set)
         for key in primitive:
-            thing.namespace['add'].call(key)
+            callMethod(thing, 'add', decodeKey(key))
         return thing
-    _class = {
-        int  : builtin.int  , 
-        float: builtin.float, 
-        str  : builtin.str  , 
-        list : builtin.list , 
-        tuple: builtin.tuple, 
-    }[type(primitive)]
-    thing = instantiate(_class)
-    thing.primitive_value = primitive
-    return thing
+    # Like a literal, it skips `__init__`.  
+    return Thing(PRIMITIVE_CLASSES[type(primitive)], primitive)
 
 def assertPrimitive(thing):
     if thing.primitive_value is NULL:
@@ -230,6 +273,117 @@ class Namespace(dict):
             pass
         return super().__setitem__(key, value)
 
+    def lookup(self, key):
+        # Like `self[key]`, but None if not found, and never raises.  
+        return dict.get(self, key)
+
+    def copyFor(self, thing : Thing):
+        return Namespace(self)
+
+# Names an instance does not take from its class
+NOT_INHERITED = frozenset(('__base__', '__name__', '__repr__'))
+
+class InstanceNamespace(Namespace):
+    '''
+    The namespace of a Thing made by `instantiate`. It holds only the 
+    thing's own attributes. A name it does not hold is looked up along 
+    the `__base__` chain of the thing's class. A function found there 
+    is bound to the thing on first access, and kept in `bound` for as 
+    long as the class still holds that function.  
+    '''
+    def __init__(self, thing : Thing, *args):
+        super().__init__(*args)
+        self.thing = thing
+        self.bound : Dict[str, Tuple[Thing, Thing]] = {}   # (func, method)
+
+    def lookup(self, key):
+        value = dict.get(self, key)
+        if value is not None:
+            return value
+        if key in NOT_INHERITED:
+            return None
+        value = lookupClass(self.thing._class, key)
+        if value is None:
+            return None
+        if value._class is builtin.Function:
+            cached = self.bound.get(key)
+            if cached is not None and cached[0] is value:
+                return cached[1]
+            method = bindMethod(value, self.thing)
+            self.bound[key] = (value, method)
+            return method
+        return value
+
+    def copyFor(self, thing : Thing):
+        return InstanceNamespace(thing, self)
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+    def __getitem__(self, key):
+        if key not in self.forbidden:
+            value = self.lookup(key)
+            if value is not None:
+                return value
+        return super().__getitem__(key)
+
+class Frame:
+    '''
+    The namespace of a function call whose locals are known ahead,
+    see resolver.py. Locals live in `values`, at the slots given by
+    `layout`. NULL marks an unbound local. By name, it reads like a
+    Namespace, for whatever walks the environment.
+    '''
+    __slots__ = ('layout', 'values', 'forbidden')
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.values = [NULL] * len(layout.names)
+        self.forbidden = set()
+
+    def forbid(self, name):
+        self.forbidden.add(name)
+
+    def items(self):
+        for name, value in zip(self.layout.names, self.values):
+            if value is not NULL:
+                yield name, value
+
+    def wrapSelf(self):
+        return unprimitize(dict(self.items()))
+
+    def __contains__(self, key):
+        slot = self.layout.slots.get(key)
+        return slot is not None and self.values[slot] is not NULL
+
+    def __getitem__(self, key):
+        if key in self.forbidden:
+            raise Helicopter(
+                builtin.ImportError,
+                f'Accessing evaluation-postponed variable "{key}" during circular import.',
+            )
+        if key in self:
+            return self.values[self.layout.slots[key]]
+        if key == '__dict__':
+            return self.wrapSelf()
+        raise Helicopter(
+            builtin.NameError,
+            f'Local variable "{key}" is not defined.',
+        )
+
+    def __setitem__(self, key, value) -> None:
+        self.forbidden.discard(key)
+        self.values[self.layout.slots[key]] = value
+
+    def pop(self, key):
+        # raises KeyError, like a dict
+        if key not in self:
+            raise KeyError(key)
+        slot = self.layout.slots[key]
+        value = self.values[slot]
+        self.values[slot] = NULL
+        return value
+
 class Environment(list):
     def __init__(self, *args):
         super().__init__(*args)
@@ -240,6 +394,30 @@ class Environment(list):
     def assign(self, name : str, value : Thing):
         self[-1][name] = value
     
+    def readName(self, name : Name):
+        # By the resolved scope if there is one. Whatever is not
+        # where the resolver said, e.g. an unbound local, is looked
+        # up as before, so lookup order and errors are unchanged.
+        scope = name.scope
+        if scope is not None:
+            namespace = self[-1 - scope[1]]
+            slot = scope[2]
+            if slot is None:
+                if name.name in namespace:
+                    return namespace[name.name]
+            else:
+                thing = namespace.values[slot]
+                if thing is not NULL:
+                    return thing
+        return self.read(name.name)
+
+    def assignName(self, name : Name, value : Thing):
+        scope = name.scope
+        if scope is not None and scope[2] is not None and scope[1] == 0:
+            self[-1].values[scope[2]] = value
+        else:
+            self[-1][name.name] = value
+
     def read(self, name : str):
         for namespace in reversed(self):
             if name in namespace:
@@ -314,176 +492,206 @@ def executeFunction(
                 + ' got unknown named argument `'
                 + name + '`.', 
             )
-    argument_namespace = Namespace({
-        **func.default_args, **argument_namespace, 
-    })
-    return executeSequence(
-        func.runTime, 
-        func.mst.body, 
-        Environment([*func.environment, argument_namespace]), 
-        func.namespace['__name__'].primitive_value, 
-    )
+    layout = func.mst.layout
+    if layout is None:
+        local_namespace = Namespace({
+            **func.default_args, **argument_namespace, 
+        })
+    else:
+        local_namespace = Frame(layout)
+        for arguments in (func.default_args, argument_namespace):
+            for name, thing in arguments.items():
+                local_namespace[name] = thing
+    try:
+        returned = func.runTime.executor.runFunction(
+            func, Environment([*func.environment, local_namespace]), 
+        )
+    except ReturnAsException as e:
+        return e.content
+    if returned is None:
+        return builtin.__none__
+    return returned
+
+class TreeWalker:
+    '''
+    Runs MSTs by walking them. `runFunction` returns what the body 
+    returned, or None if it ran off its end.  
+    '''
+    def runModule(self, runTime, root, environment, label):
+        executeSequence(runTime, root, environment, label)
+
+    def runFunction(self, func, environment):
+        executeSequence(
+            func.runTime, 
+            func.mst.body, 
+            environment, 
+            func.namespace['__name__'].primitive_value, 
+        )
 
 def executeSequence(
     runTime, sequence : Sequence, environment, label : str, 
-) -> Thing:
+):
     for subBlock in sequence:
-        try:
-            if type(subBlock) is CmdTree:
-                try:
-                    executeCmdTree(runTime, subBlock, environment)
-                except Helicopter as h:
-                    recordStackTrace(h, label, subBlock)
-                except KeyboardInterrupt:
-                    raise Helicopter(
-                        builtin.KeyboardInterrupt
-                    )
-            elif type(subBlock) is Conditional:
-                subBlock : Conditional
-                try:
-                    condition = evalExpression(
-                        subBlock.condition[0], environment, 
-                    )
-                except Helicopter as h:
-                    recordStackTrace(h, label, subBlock.condition)
-                if isTrue(condition):
-                    executeSequence(runTime, subBlock.then, environment, label)
+        if type(subBlock) is CmdTree:
+            try:
+                executeCmdTree(runTime, subBlock, environment)
+            except Helicopter as h:
+                recordStackTrace(h, label, subBlock)
+            except KeyboardInterrupt:
+                raise Helicopter(
+                    builtin.KeyboardInterrupt
+                )
+        elif type(subBlock) is Conditional:
+            subBlock : Conditional
+            try:
+                condition = evalExpression(
+                    subBlock.condition[0], environment, 
+                )
+            except Helicopter as h:
+                recordStackTrace(h, label, subBlock.condition)
+            if isTrue(condition):
+                executeSequence(runTime, subBlock.then, environment, label)
+            else:
+                for elIf in subBlock.elIfs:
+                    try:
+                        condition = evalExpression(
+                            elIf.condition[0], environment, 
+                        )
+                    except Helicopter as h:
+                        recordStackTrace(h, label, elIf.condition)
+                    if isTrue(condition):
+                        executeSequence(runTime, elIf.then, environment, label)
+                        break
                 else:
-                    for elIf in subBlock.elIfs:
+                    if subBlock._else is not None:
+                        executeSequence(runTime, subBlock._else, environment, label)
+        elif type(subBlock) is WhileLoop:
+            subBlock : WhileLoop
+            broken = False
+            try:
+                while True:
+                    try:
+                        condition = evalExpression(
+                            subBlock.condition[0], environment, 
+                        )
+                    except Helicopter as h:
+                        recordStackTrace(h, label, subBlock.condition)
+                    if isTrue(condition):
                         try:
-                            condition = evalExpression(
-                                elIf.condition[0], environment, 
-                            )
-                        except Helicopter as h:
-                            recordStackTrace(h, label, elIf.condition)
-                        if isTrue(condition):
-                            executeSequence(runTime, elIf.then, environment, label)
-                            break
+                            executeSequence(runTime, subBlock.body, environment, label)
+                        except ContinueAsException:
+                            pass
                     else:
-                        if subBlock._else is not None:
-                            executeSequence(runTime, subBlock._else, environment, label)
-            elif type(subBlock) is WhileLoop:
-                subBlock : WhileLoop
-                broken = False
-                try:
-                    while True:
-                        try:
-                            condition = evalExpression(
-                                subBlock.condition[0], environment, 
-                            )
-                        except Helicopter as h:
-                            recordStackTrace(h, label, subBlock.condition)
-                        if isTrue(condition):
-                            try:
-                                executeSequence(runTime, subBlock.body, environment, label)
-                            except ContinueAsException:
-                                pass
-                        else:
-                            break
-                except BreakAsException:
-                    broken = True
-                if not broken and subBlock._else is not None:
-                    executeSequence(runTime, subBlock._else, environment, label)
-            elif type(subBlock) is ForLoop:
-                subBlock : ForLoop
-                loopVar : ExpressionTree = subBlock.condition[0]
+                        break
+            except BreakAsException:
+                broken = True
+            if not broken and subBlock._else is not None:
+                executeSequence(runTime, subBlock._else, environment, label)
+        elif type(subBlock) is ForLoop:
+            subBlock : ForLoop
+            loopVar : Node = subBlock.condition[0]
+            try:
+                iterThing = loopIterator(subBlock.condition[1], environment)
+            except Helicopter as h:
+                recordStackTrace(h, label, subBlock.condition)
+            broken = False
+            try:
+                while True:
+                    try:
+                        nextThing = next(iterThing)
+                    except StopIteration:
+                        break
+                    except Helicopter as h:
+                        recordStackTrace(h, label, subBlock.condition)
+                    assignTo(nextThing, loopVar, environment)
+                    try:
+                        executeSequence(runTime, subBlock.body, environment, label)
+                    except ContinueAsException:
+                        pass
+            except BreakAsException:
+                broken = True
+            if not broken and subBlock._else is not None:
+                executeSequence(runTime, subBlock._else, environment, label)
+        elif type(subBlock) is TryExcept:
+            subBlock : TryExcept
+            handlers = []
+            for oneCatch in subBlock.oneCatches:
                 try:
-                    iterThing = ThingIter(evalExpression(
-                        subBlock.condition[1], environment, 
-                    ))
+                    catching = evalExpression(oneCatch.catching[0], environment)
                 except Helicopter as h:
-                    recordStackTrace(h, label, subBlock.condition)
-                broken = False
-                try:
-                    while True:
+                    recordStackTrace(h, label, oneCatch.catching)
+                if catching._class is not builtin.Class:
+                    raise Helicopter(
+                        builtin.TypeError, 
+                        f'{reprString(catching)} is a non-class, so miniPy cannot catch this.'
+                    )
+                handlers.append((catching, oneCatch.handler))
+            try:
+                executeSequence(runTime, subBlock._try, environment, label)
+            except Helicopter as h:
+                raised : Thing = h.content
+                if raised._class is builtin.Class:
+                    raisedClass = raised
+                else:
+                    raisedClass = raised._class
+                for catching, handler in handlers:
+                    if isSubclassOf(raisedClass, catching):
                         try:
-                            nextThing = next(iterThing)
-                        except StopIteration:
-                            break
-                        except Helicopter as h:
-                            recordStackTrace(h, label, subBlock.condition)
-                        assignTo(nextThing, loopVar, environment)
-                        executeSequence(runTime, subBlock.body, environment, label)
-                except BreakAsException:
-                    broken = True
-                if not broken and subBlock._else is not None:
+                            executeSequence(runTime, handler, environment, label)
+                        except Helicopter as innerH:
+                            h.below = innerH
+                            raise h
+                        break
+                else:
+                    raise h
+            else:
+                if subBlock._else is not None:
                     executeSequence(runTime, subBlock._else, environment, label)
-            elif type(subBlock) is TryExcept:
-                subBlock : TryExcept
-                handlers = []
-                for oneCatch in subBlock.oneCatches:
-                    try:
-                        catching = evalExpression(oneCatch.catching[0], environment)
-                    except Helicopter as h:
-                        recordStackTrace(h, label, oneCatch.catching)
-                    if catching._class is not builtin.Class:
+            finally:
+                if subBlock._finally is not None:
+                    executeSequence(runTime, subBlock._finally, environment, label)
+        elif type(subBlock) is FunctionDefinition:
+            subBlock : FunctionDefinition
+            identifier, *args = subBlock._def
+            func = instantiate(builtin.Function)
+            func.namespace['__name__'] = unprimitize(identifier.value)
+            func.environment = environment
+            func.mst = subBlock
+            func.runTime = runTime
+            func.default_args = {}
+            arg_names = set()
+            mandatory_args_finished = False
+            try:
+                for arg in args:
+                    arg: FunctionArg
+                    name = arg.name
+                    if name in arg_names:
                         raise Helicopter(
                             builtin.TypeError, 
-                            f'{reprString(catching)} is a non-class, so miniPy cannot catch this.'
+                            'Duplicate argument name ' + name, 
                         )
-                    handlers.append((catching, oneCatch.handler))
-                try:
-                    executeSequence(runTime, subBlock._try, environment, label)
-                except Helicopter as h:
-                    raised : Thing = h.content
-                    if raised._class is builtin.Class:
-                        raisedClass = raised
-                    else:
-                        raisedClass = raised._class
-                    for catching, handler in handlers:
-                        if isSubclassOf(raisedClass, catching):
-                            try:
-                                executeSequence(runTime, handler, environment, label)
-                            except Helicopter as innerH:
-                                h.below = innerH
-                                raise h
-                            break
-                    else:
-                        raise h
-                else:
-                    if subBlock._else is not None:
-                        executeSequence(runTime, subBlock._else, environment, label)
-                finally:
-                    if subBlock._finally is not None:
-                        executeSequence(runTime, subBlock._finally, environment, label)
-            elif type(subBlock) is FunctionDefinition:
-                subBlock : FunctionDefinition
-                identifier, *args = subBlock._def
-                func = instantiate(builtin.Function)
-                func.namespace['__name__'] = unprimitize(identifier.value)
-                func.environment = environment
-                func.mst = subBlock
-                func.runTime = runTime
-                arg_names = set()
-                mandatory_args_finished = False
-                try:
-                    for arg in args:
-                        arg: FunctionArg
-                        name = arg.name.value
-                        if name in arg_names:
+                    arg_names.add(name)
+                    if arg.value is None:
+                        if mandatory_args_finished:
                             raise Helicopter(
                                 builtin.TypeError, 
-                                'Duplicate argument name ' + name, 
+                                f'''Mandatory argument {
+                                    name
+                                } after optional argument.''', 
                             )
-                        arg_names.add(name)
-                        if arg.value is None:
-                            if mandatory_args_finished:
-                                raise Helicopter(
-                                    builtin.TypeError, 
-                                    f'''Mandatory argument {
-                                        name
-                                    } after optional argument.''', 
-                                )
-                        else:
-                            mandatory_args_finished = True
-                            defaultThing = evalExpression(arg.value, environment)
-                            func.default_args[name] = defaultThing
-                except Helicopter as h:
-                    recordStackTrace(h, label, subBlock._def)
-                assignTo(func, identifier, environment)
-            elif type(subBlock) is ClassDefinition:
-                subBlock : ClassDefinition
-                identifier, expressionTree = subBlock._class
+                    else:
+                        mandatory_args_finished = True
+                        defaultThing = evalExpression(arg.value, environment)
+                        func.default_args[name] = defaultThing
+            except Helicopter as h:
+                recordStackTrace(h, label, subBlock._def)
+            assignTo(func, identifier, environment)
+        elif type(subBlock) is ClassDefinition:
+            subBlock : ClassDefinition
+            # Without a base, like a builtin class, it has no `__base__`.  
+            identifier, *expressionTrees = subBlock._class
+            base = None
+            for expressionTree in expressionTrees:
                 try:
                     base = evalExpression(expressionTree, environment)
                 except Helicopter as h:
@@ -494,18 +702,17 @@ def executeSequence(
                         reprString(base) + ' is a non-class. '
                         + 'New class cannot inherit from a non-class.', 
                     )
-                thisClass = instantiate(builtin.Class)
+            thisClass = instantiate(builtin.Class)
+            if base is not None:
                 thisClass.namespace['__base__'] = base
-                thisClass.namespace['__name__'] = unprimitize(identifier.value)
-                executeSequence(
-                    runTime, 
-                    subBlock.body, 
-                    [*environment, thisClass.namespace], 
-                    identifier.value, 
-                )
-                assignTo(thisClass, identifier, environment)
-        except ReturnAsException as e:
-            return e.content
+            thisClass.namespace['__name__'] = unprimitize(identifier.value)
+            executeSequence(
+                runTime, 
+                subBlock.body, 
+                [*environment, thisClass.namespace], 
+                identifier.value, 
+            )
+            assignTo(thisClass, identifier, environment)
 
 def isSubclassOf(potentialSubclass : Thing, potentialBaseclass : Thing):
     cursor = potentialSubclass
@@ -530,6 +737,53 @@ def ThingIter(thing : Thing):
         else:
             yield nextThing
 
+def isRangeCall(eTree : Node):
+    '''
+    Whether a for loop's iterable looks like `range(a, b, c)`. Whether 
+    it is the builtin is only known once the callee is evaluated.  
+    '''
+    return (
+        type(eTree) is Call and type(eTree.func) is Name 
+        and eTree.func.name == 'range' and 1 <= len(eTree.args) <= 3 
+        and all(funcArg.name is None for funcArg in eTree.args)
+    )
+
+def countingLoop(func : Thing, args : List[Thing]):
+    '''
+    If `func(*args)` is the builtin `range`, counting over ints as 
+    usual, returns a native iterator over the same Things. It skips 
+    the range Thing, its `__next__`, and the closing StopIteration. 
+    Otherwise returns None, and the loop iterates `func(*args)`.  
+    '''
+    if func is not builtin.range:
+        return None
+    namespace = func.namespace
+    for name, method in RANGE_METHODS:
+        if namespace.get(name) is not method:
+            return None # patched by the user
+    bounds = []
+    for arg in args:
+        if type(arg.primitive_value) is not int:
+            return None
+        bounds.append(arg.primitive_value)
+    if len(bounds) == 3 and bounds[2] == 0:
+        return None
+    return map(unprimitize, range(*bounds))
+
+def loopIterator(eTree : Node, environment : Environment):
+    # What a for loop iterates.
+    if isRangeCall(eTree):
+        args = [
+            evalExpression(funcArg.value, environment) 
+            for funcArg in eTree.args
+        ]
+        func = evalExpression(eTree.func, environment)
+        iterThing = countingLoop(func, args)
+        if iterThing is not None:
+            return iterThing
+        return ThingIter(func.call(*args))
+    return ThingIter(evalExpression(eTree, environment))
+
 def isSame(a : Thing, b : Thing):
     if a is b:
         return True
@@ -546,16 +800,39 @@ class RunTime:
         def __bool__(self):
             return True
 
-    def __init__(self, dir_location):
+    def __init__(
+        self, dir_location, lexer_engine = CHAR_ENGINE, 
+        use_cache = True, prefetch = True, streaming = False, 
+        optimize = False, resolve = True, engine = TREE_ENGINE, 
+    ):
         self.dir_location = dir_location
+        self.lexer_engine = lexer_engine
+        self.use_cache = use_cache
+        self.streaming = streaming
+        self.optimize = optimize
+        self.resolve = resolve
+        self.builtin_names = frozenset(builtin.toNamespace())
+        if engine == VM_ENGINE:
+            from vm import VM   # vm.py builds on this module
+            self.executor = VM()
+        elif engine == CLOSURE_ENGINE:
+            from closures import ClosureEngine
+            self.executor = ClosureEngine()
+        else:
+            self.executor = TreeWalker()
         self.minipypaths = [x for x in reversed(
             os.environ.get('MINIPYPATH', '', ).split(';')
         ) if os.path.isdir(x)]
         self._modules : Dict[str, dict] = {}
         # filename -> namespace
         self.nowImportJobs : Set[self.ImportJob] = set()
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = Prefetcher(
+                self.findFile, lexer_engine, use_cache, 
+            )
     
-    def resolveName(self, name):
+    def findFile(self, name):
         parts = name.split('.')
         for base in [self.dir_location, *self.minipypaths]:
             filename = os.path.join(base, *parts) + '.minipy'
@@ -564,13 +841,18 @@ class RunTime:
                 dir_name
             ) and no_dir in os.listdir(dir_name):
                 return os.path.normpath(filename)
-        else:
+        return None
+
+    def resolveName(self, name):
+        filename = self.findFile(name)
+        if filename is None:
             raise Helicopter(
                 builtin.ImportError, 
                 f'Script "{name}" not found. Hint: ' 
                 + 'Name is case-sensitive. ".minipy" ' 
                 + 'extension is also case-sensitive.', 
             )
+        return filename
     
     def getModule(self, name):
         filename = self.resolveName(name)
@@ -583,6 +865,30 @@ class RunTime:
                 return job
         return False
 
+    def loadMST(self, filename) -> Sequence:
+        if self.prefetcher is None:
+            return loadMST(filename, self.lexer_engine, self.use_cache)
+        root = self.prefetcher.take(filename)
+        if root is None:
+            root = loadMST(filename, self.lexer_engine, self.use_cache)
+            self.prefetcher.prefetch(importedNames(root))
+        return root
+    
+    def streamMST(self, filename):
+        '''
+        Yields the module's top-level elements, each parsed only when 
+        asked for, so execution starts right away and finished 
+        elements can be freed. Bypasses the cache and the prefetcher.  
+        '''
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from Sequence.iterParse(CmdsParser(
+                Lexer(f, self.lexer_engine), filename, 
+            ))
+    
+    def shutdown(self):
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+
     def imPort(self, name, __Name__):
         try:
             return self.getModule(name)
@@ -597,18 +903,27 @@ class RunTime:
         job = self.ImportJob(filename, namespace)
         self.nowImportJobs.add(job)
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                lexer = Lexer(f)
-                root = Sequence()
-                root.parse(CmdsParser(lexer, filename))
-                returned = executeSequence(
+            if self.streaming:
+                root = self.streamMST(filename)
+                if self.optimize:
+                    root = optimizeStream(root)
+                if self.resolve:
+                    root = resolveStream(root)
+            else:
+                root = self.loadMST(filename)
+                if self.optimize:
+                    optimizeModule(root)
+                if self.resolve:
+                    resolveSequence(root, self.builtin_names)
+            try:
+                self.executor.runModule(
                     self, root, Environment([namespace]), f'<module {name}>', 
                 )
-                if returned is not None:
-                    raise Helicopter(
-                        builtin.Exception, 
-                        '"return" outside function.', 
-                    )
+            except ReturnAsException:
+                raise Helicopter(
+                    builtin.Exception, 
+                    '"return" outside function.', 
+                )
         finally:
             self.nowImportJobs.remove(job)
         self._modules[filename] = namespace
@@ -617,59 +932,76 @@ class RunTime:
         return namespace
 
 def evalExpression(
-    eTree : ExpressionTree, 
+    eTree : Node, 
     environment : Environment, 
 ) -> Thing:
-    if eTree.type is Terminal:
-        lexem = eTree[0]
-        if type(lexem) in (Num, String):
-            thing = unprimitize(lexem.value)
-        elif type(lexem) is Boolean:
-            if lexem.value:
-                thing = builtin.__true__
-            else:
-                thing = builtin.__false__
-        elif type(lexem) is NONE:
-            thing = builtin.__none__
-        elif type(lexem) is Identifier:
-            thing = environment.read(lexem.value)
-        return thing
-    elif eTree.type is Parened:
-        return evalExpression(eTree[0], environment)
-    elif eTree.type is TupleDisplay:
-        return unprimitize(tuple(
-            evalExpression(x, environment) for x in eTree
-        ))
-    elif eTree.type is ListDisplay:
-        return unprimitize([
-            evalExpression(x, environment) for x in eTree
-        ])
-    elif eTree.type is SetDisplay:
-        s = set()
-        for x in eTree:
-            thing = evalExpression(x, environment)
-            if thing.primitive_value is None:
-                key = thing
-            else:
-                key = thing.primitive_value
-            s.add(key)
-        return unprimitize(s)
-    elif eTree.type is DictDisplay:
-        d = {}
-        for keyTree, valueTree in eTree:
-            keyThing = evalExpression(keyTree, environment)
-            if keyThing.primitive_value is None:
-                key = keyThing
-            else:
-                key = keyThing.primitive_value
-            d[key] = evalExpression(valueTree, environment)
-        return instantiate(builtin.dict, (d, ))
-    elif eTree.type is FunctionCall:
-        calleeExpr, *funcArgs = eTree
+    eType = type(eTree)
+    if eType is Name:
+        return environment.readName(eTree)
+    elif eType is Const:
+        return unprimitize(eTree.value)
+    elif eType is BinOp:
+        operation = eTree.op
+        left = evalExpression(eTree.left, environment)
+        if operation is Or:
+            if isTrue(left):
+                return left
+            return evalExpression(eTree.right, environment)
+        elif operation is And:
+            if isTrue(left):
+                return evalExpression(eTree.right, environment)
+            return left
+        right = evalExpression(eTree.right, environment)
+        result = quickBinary(eTree, left, right)
+        if result is not NULL:
+            return result
+        if operation is ToPowerOf:
+            return callMethod(left, '__pow__', right)
+        elif operation is Times:
+            return callMethod(left, '__mul__', right)
+        elif operation is Divide:
+            return callMethod(left, '__truediv__', right)
+        elif operation is ModDiv:
+            return callMethod(left, '__mod__', right)
+        elif operation is Plus:
+            return callMethod(left, '__add__', right)
+        elif operation is Minus:
+            return callMethod(
+                left, '__add__', callMethod(right, '__neg__'), 
+            )
+        elif operation is Is:
+            if isSame(left, right):
+                return builtin.__true__
+            return builtin.__false__
+        elif operation is IsNot:
+            if isSame(left, right):
+                return builtin.__false__
+            return builtin.__true__
+        elif operation is In:
+            return callMethod(right, '__contains__', left)
+        elif operation is NotIn:
+            if isTrue(callMethod(right, '__contains__', left)):
+                return builtin.__false__
+            return builtin.__true__
+        elif operation is Equal:
+            return callMethod(left, '__eq__', right)
+        elif operation is NotEqual:
+            if isTrue(callMethod(left, '__eq__', right)):
+                return builtin.__false__
+            return builtin.__true__
+        elif operation is LessThan:
+            return callMethod(left, '__lt__', right)
+        elif operation is GreaterThan:
+            return callMethod(left, '__gt__', right)
+        elif operation is LessThanOrEqual:
+            return callMethod(left, '__le__', right)
+        elif operation is GreaterThanOrEqual:
+            return callMethod(left, '__ge__', right)
+    elif eType is Call:
         args = []
         keyword_args = {}
         positional_finished = False
-        for funcArg in funcArgs:
+        for funcArg in eTree.args:
             funcArg : FunctionArg
             if funcArg.name is None:
                 if positional_finished:
@@ -680,7 +1012,7 @@ def evalExpression(
                 args.append(evalExpression(funcArg.value, environment))
             else:
                 positional_finished = True
-                arg_name = funcArg.name.value
+                arg_name = funcArg.name
                 if arg_name in keyword_args:
                     raise Helicopter(
                         builtin.TypeError, 
@@ -689,117 +1021,276 @@ def evalExpression(
                 keyword_args[arg_name] = evalExpression(
                     funcArg.value, environment, 
                 )
-        return evalExpression(calleeExpr, environment).call(
+        return evalExpression(eTree.func, environment).call(
             *args, **keyword_args, 
         )
-    elif eTree.type is Indexing:
-        indexee = evalExpression(eTree[0], environment)
-        index = evalExpression(eTree[1], environment)
-        return indexee.namespace['__getitem__'].call(index)
-    elif eTree.type is Slicing:
-        slicee = evalExpression(eTree[0], environment)
-        start = evalExpression(eTree[1], environment)
-        stop = evalExpression(eTree[2], environment)
-        step = evalExpression(eTree[3], environment)
-        return slicee.namespace['__getitem__'].call(
+    elif eType is Attribute:
+        thing = evalExpression(eTree.value, environment)
+        result = quickAttribute(eTree, thing)
+        if result is not NULL:
+            return result
+        return thing.namespace[eTree.attr]
+    elif eType is Subscript:
+        indexee = evalExpression(eTree.value, environment)
+        index = evalExpression(eTree.index, environment)
+        result = quickSubscript(eTree, indexee, index)
+        if result is not NULL:
+            return result
+        return callMethod(indexee, '__getitem__', index)
+    elif eType is Slice:
+        slicee = evalExpression(eTree.value, environment)
+        start = evalExpression(eTree.start, environment)
+        stop = evalExpression(eTree.stop, environment)
+        step = evalExpression(eTree.step, environment)
+        return callMethod(
+            slicee, '__getitem__', 
             instantiate(builtin.slice, (start, stop, step)), 
         )
-    elif eTree.type is Empty:
-        return builtin.__none__
-    elif eTree.type is Binary:
-        left = evalExpression(eTree[0], environment)
-        if type(eTree.operationLexem) is Or:
-            if isTrue(left):
-                return left
-            return evalExpression(eTree[1], environment)
-        elif type(eTree.operationLexem) is And:
-            if isTrue(left):
-                return evalExpression(eTree[1], environment)
-            return left
-        else:
-            right = evalExpression(eTree[1], environment)
-        if type(eTree.operationLexem) is ToPowerOf:
-            return left.namespace['__pow__'].call(right)
-        elif type(eTree.operationLexem) is Times:
-            return left.namespace['__mul__'].call(right)
-        elif type(eTree.operationLexem) is Divide:
-            return left.namespace['__truediv__'].call(right)
-        elif type(eTree.operationLexem) is ModDiv:
-            return left.namespace['__mod__'].call(right)
-        elif type(eTree.operationLexem) is Plus:
-            return left.namespace['__add__'].call(right)
-        elif type(eTree.operationLexem) is Minus:
-            return left.namespace['__add__'].call(
-                right.namespace['__neg__'].call()
-            )
-        elif type(eTree.operationLexem) is Is:
-            if isSame(left, right):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is IsNot:
-            if isSame(left, right):
-                return builtin.__false__
-            return builtin.__true__
-        elif type(eTree.operationLexem) is In:
-            if right.namespace['__contains__'].call(left):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is NotIn:
-            if right.namespace['__contains__'].call(left):
-                return builtin.__false__
-            return builtin.__true__
-        elif type(eTree.operationLexem) is Equal:
-            if left.namespace['__eq__'].call(right):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is NotEqual:
-            if left.namespace['__eq__'].call(right):
-                return builtin.__false__
-            return builtin.__true__
-        elif type(eTree.operationLexem) is LessThan:
-            if left.namespace['__lt__'].call(right):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is GreaterThan:
-            if left.namespace['__gt__'].call(right):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is LessThanOrEqual:
-            if left.namespace['__le__'].call(right):
-                return builtin.__true__
-            return builtin.__false__
-        elif type(eTree.operationLexem) is GreaterThanOrEqual:
-            if left.namespace['__ge__'].call(right):
-                return builtin.__true__
-            return builtin.__false__
-    elif eTree.type is Unary:
-        thing = evalExpression(eTree[0], environment)
-        if type(eTree.operationLexem) is UnaryNegate:
-            return thing.namespace['__neg__'].call()
-        if type(eTree.operationLexem) is Not:
+    elif eType is UnaryOp:
+        thing = evalExpression(eTree.operand, environment)
+        if eTree.op is UnaryNegate:
+            return callMethod(thing, '__neg__')
+        if eTree.op is Not:
             if isTrue(thing):
                 return builtin.__false__
             return builtin.__true__
-    elif eTree.type is Attributing:
-        thing = evalExpression(eTree[0], environment)
-        name = eTree[1][0].value
-        return thing.namespace[name]
-    elif eTree.type is ListComp:
-        yTree = eTree[0]
-        xTree = eTree[1]
-        iterTree = eTree[2]
-        try:
-            conditionTree = eTree[3]
-        except IndexError:
-            conditionTree = None
-        iterThing = ThingIter(evalExpression(iterTree, environment))
+    elif eType is Parened:
+        return evalExpression(eTree.value, environment)
+    elif eType is TupleDisplay:
+        return unprimitize(tuple(
+            evalExpression(x, environment) for x in eTree.elements
+        ))
+    elif eType is ListDisplay:
+        return unprimitize([
+            evalExpression(x, environment) for x in eTree.elements
+        ])
+    elif eType is SetDisplay:
+        s = set()
+        for x in eTree.elements:
+            thing = evalExpression(x, environment)
+            if thing.primitive_value is None:
+                key = thing
+            else:
+                key = thing.primitive_value
+            s.add(key)
+        return unprimitize(s)
+    elif eType is DictDisplay:
+        d = {}
+        for keyTree, valueTree in zip(eTree.keys, eTree.values):
+            keyThing = evalExpression(keyTree, environment)
+            if keyThing.primitive_value is None:
+                key = keyThing
+            else:
+                key = keyThing.primitive_value
+            d[key] = evalExpression(valueTree, environment)
+        return instantiate(builtin.dict, (d, ))
+    elif eType is Empty:
+        return builtin.__none__
+    elif eType is ListComp:
+        conditionTree = eTree.condition
+        iterThing = ThingIter(evalExpression(eTree.iterable, environment))
         buffer = []
         tempEnv = Environment(environment + [Namespace()])
         for nextThing in iterThing:
-            assignTo(nextThing, xTree, tempEnv)
-            if isTrue(evalExpression(conditionTree, tempEnv)):
-                buffer.append(evalExpression(yTree, tempEnv))
+            assignTo(nextThing, eTree.target, tempEnv)
+            if conditionTree is None or isTrue(
+                evalExpression(conditionTree, tempEnv)
+            ):
+                buffer.append(evalExpression(eTree.element, tempEnv))
         return unprimitize(buffer)
+    elif eType is Parameter:
+        return eTree.inlined.frames[-1][eTree.index]
+    elif eType is Inlined:
+        args = [
+            evalExpression(funcArg.value, environment) 
+            for funcArg in eTree.call.args
+        ]
+        func = evalExpression(eTree.call.func, environment)
+        return callInlined(eTree, args, func, environment)
+
+def callInlined(
+    inlined : Inlined, args : List[Thing], func : Thing, 
+    environment : Environment, 
+):
+    '''
+    Evaluates the expression `func` returns, with `args` bound, 
+    without a call. Deoptimizes to calling `func` unless it is still 
+    the function the optimizer inlined, unbound. Engines other than 
+    the tree walker evaluate `args` and `func` themselves.  
+    '''
+    if func.mst is not inlined.function or 'call' in func.__dict__:
+        # rebound, or a bound method
+        return func.call(*args)
+    frames = inlined.frames
+    frames.append(args)
+    try:
+        return evalExpression(inlined.body, environment)
+    except Helicopter as h:
+        # the traceback entry of the call that did not happen
+        recordStackTrace(
+            h, func.namespace['__name__'].primitive_value, 
+            inlined.function.body[0], 
+        )
+    except KeyboardInterrupt:
+        raise Helicopter(
+            builtin.KeyboardInterrupt
+        )
+    finally:
+        frames.pop()
+
+# Quickening: a `BinOp`, `Subscript` or `Attribute` that keeps seeing 
+# the same operand types specializes itself to them. 
+QUICKEN_THRESHOLD = 8
+
+class Feedback:
+    '''
+    What a node has been seeing, in its `quick` slot. `key` names the 
+    operand types, `hits` counts them in a row. Once quickened, 
+    `special` evaluates the node. It returns NULL when its guard 
+    misses, and the node takes the generic path.  
+    '''
+    __slots__ = ('key', 'hits', 'special')
+
+    def __init__(self, key):
+        self.key = key
+        self.hits = 0
+        self.special = None
+
+def recordFeedback(node : Node, key, special) -> None:
+    # `special` is what `key` would quicken to, None if nothing.  
+    quick = node.quick
+    if special is None:
+        node.quick = None
+    elif quick is None or quick.key != key:
+        node.quick = Feedback(key)
+    elif quick.special is not None:
+        # Its guard missed. Count again.  
+        quick.special = None
+        quick.hits = 0
+    else:
+        quick.hits += 1
+        if quick.hits >= QUICKEN_THRESHOLD:
+            quick.special = special
+
+def isPristine(thing : Thing, name : str, builtinCall) -> bool:
+    '''
+    Whether the method `name` of `thing` is still the builtin one 
+    whose call is `builtinCall`, bound to `thing` itself.  
+    '''
+    if not hasNamespace(thing):
+        method = lookupClass(thing._class, name)
+        return method is not None and method.call is builtinCall
+    method = thing.namespace.lookup(name)
+    if method is None:
+        return False
+    call = method.call
+    return (
+        type(call) is partial and call.func is builtinCall 
+        and call.args[0] is thing
+    )
+
+def quickBinary(node : BinOp, left : Thing, right : Thing):
+    '''
+    Evaluates `node` with its specialized variant, or returns NULL 
+    for the generic path. Engines other than the tree walker 
+    evaluate the operands themselves.  
+    '''
+    quick = node.quick
+    if quick is not None and quick.special is not None:
+        result = quick.special(left, right)
+        if result is not NULL:
+            return result
+    key = (
+        node.op, type(left.primitive_value), type(right.primitive_value), 
+    )
+    recordFeedback(node, key, BINARY_SPECIALS.get(key))
+    return NULL
+
+def quickSubscript(node : Subscript, indexee : Thing, index : Thing):
+    # Like `quickBinary`, for `indexee[index]`.  
+    quick = node.quick
+    if quick is not None and quick.special is not None:
+        result = quick.special(indexee, index)
+        if result is not NULL:
+            return result
+    key = (type(indexee.primitive_value), type(index.primitive_value))
+    recordFeedback(node, key, SUBSCRIPT_SPECIALS.get(key))
+    return NULL
+
+def quickAttribute(node : Attribute, thing : Thing):
+    # Like `quickBinary`, for `thing.attr`. It quickens on the class.  
+    quick = node.quick
+    if quick is not None and quick.special is not None:
+        result = quick.special(node, thing)
+        if result is not NULL:
+            return result
+    recordFeedback(node, thing._class, loadAttribute)
+    return NULL
+
+def loadAttribute(node : Attribute, thing : Thing):
+    # The quickened `Attribute`: reads the namespace directly.  
+    if thing._class is node.quick.key and not thing.namespace.forbidden:
+        result = thing.namespace.lookup(node.attr)
+        if result is not None:
+            return result
+    return NULL
+
+def specializeArithmetic(operate, method, leftType, rightType, negates):
+    '''
+    The quickened `BinOp` for primitives of `leftType` and `rightType`, 
+    e.g. int + int. `negates` for subtraction, which is `__add__` of 
+    the right operand's `__neg__`.  
+    '''
+    _class = (
+        builtin.str if leftType is str else 
+        builtin.int if leftType is rightType is int else builtin.float
+    )
+    builtinCall = builtin.GenericPrimitive.namespace[method].call
+    negCall = builtin.GenericPrimitive.namespace['__neg__'].call
+    def special(left, right):
+        a = left.primitive_value
+        b = right.primitive_value
+        if (
+            type(a) is leftType and type(b) is rightType 
+            and isPristine(left, method, builtinCall) 
+            and (not negates or isPristine(right, '__neg__', negCall))
+        ):
+            return Thing(_class, operate(a, b))
+        return NULL
+    return special
+
+def specializeComparison(operate, method, leftType, rightType, negates):
+    # Like `specializeArithmetic`. `negates` for `!=`, which is `not ==`.  
+    builtinCall = builtin.GenericPrimitive.namespace[method].call
+    def special(left, right):
+        a = left.primitive_value
+        b = right.primitive_value
+        if (
+            type(a) is leftType and type(b) is rightType 
+            and isPristine(left, method, builtinCall)
+        ):
+            if operate(a, b) is not negates:
+                return builtin.__true__
+            return builtin.__false__
+        return NULL
+    return special
+
+def specializeSubscript(sequenceType):
+    # The quickened `Subscript` for a list or tuple, and an int index.  
+    builtinCall = builtin.ListAndTuple.namespace['__getitem__'].call
+    def special(indexee, index):
+        sequence = indexee.primitive_value
+        i = index.primitive_value
+        if (
+            type(sequence) is sequenceType and type(i) is int 
+            and isPristine(indexee, '__getitem__', builtinCall)
+        ):
+            try:
+                return sequence[i]
+            except IndexError:
+                pass    # the generic path raises it
+        return NULL
+    return special
 
 def executeCmdTree(runTime : RunTime, cmdTree : CmdTree, environment : Environment):
     if cmdTree.type in (From, Import):
@@ -861,6 +1352,8 @@ def executeCmdTree(runTime : RunTime, cmdTree : CmdTree, environment : Environme
             cmdTree[0], environment, 
         ))
     elif cmdTree.type is Return:
+        if not cmdTree:
+            raise ReturnAsException(builtin.__none__)
         raise ReturnAsException(evalExpression(
             cmdTree[0], environment, 
         ))
@@ -877,14 +1370,16 @@ def executeCmdTree(runTime : RunTime, cmdTree : CmdTree, environment : Environme
         thing = evalExpression(cmdTree[1], environment)
         assignTo(thing, cmdTree[0], environment)
 
-def parsePackaging(eTree : ExpressionTree):
-    if eTree.type is Attributing:
-        return parsePackaging(eTree[0]) + '.' + eTree[1].value
+def parsePackaging(eTree : Node):
+    if type(eTree) is Attribute:
+        return parsePackaging(eTree.value) + '.' + eTree.attr
+    elif type(eTree) is Name:
+        return eTree.name
     else:
         raise Helicopter(
             builtin.ImportError, 
             'Script path must be identifiers seperated by ".", '
-            + f'but encountered "{eTree.type.__name__}".', 
+            + f'but encountered "{eTree.friendlyName()}".', 
         )
 
 class Undefined:
@@ -898,43 +1393,53 @@ def assignTo(
     thing : Thing, slot, 
     environment : Environment, 
 ):
-    if type(slot) is Identifier:
+    if type(slot) in (Name, Identifier, str):
+        if type(slot) is Name:
+            name = slot.name
+        elif type(slot) is Identifier:
+            name = slot.value
+        else:
+            name = slot
         if type(thing) is Undefined:
-            environment.delete(slot.value)
+            environment.delete(name)
+        elif type(slot) is Name:
+            environment.assignName(slot, thing)
         else:
-            environment.assign(slot.value, thing)
-    elif type(slot) is ExpressionTree:
-        if slot.type in (Parened, Terminal):
-            assignTo(thing, slot[0], environment)
-        if slot.type in (ListDisplay, TupleDisplay):
-            buffer = [*ThingIter(thing)]
-            if len(buffer) != len(slot):
-                raise Helicopter(
-                    builtin.ValueError, 
-                    'Dimension mismatch during unpacking, ' 
-                    + f'{len(slot)} ≠ {len(buffer)}. ', 
-                )
-            for subSlot, subThing in zip(slot, buffer):
-                assignTo(subThing, subSlot, environment)
-        if slot.type is Attributing:
-            parent = evalExpression(slot[0], environment)
-            assignTo(thing, slot[1], [parent.namespace])
-        if slot.type in (Indexing, Slicing):
-            indexee = evalExpression(slot[0], environment)
-            if slot.type is Indexing:
-                slice_or_index = evalExpression(slot[1], environment)
-            elif slot.type is Slicing:
-                slice_or_index = instantiate(
-                    builtin.slice, (
-                    evalExpression(slot[1], environment), 
-                    evalExpression(slot[2], environment), 
-                    evalExpression(slot[3], environment), 
-                    ), 
-                )
-            indexee.namespace['__setitem__'].call(slice_or_index, thing)
+            environment.assign(name, thing)
+    elif type(slot) is Parened:
+        assignTo(thing, slot.value, environment)
+    elif type(slot) in (ListDisplay, TupleDisplay):
+        buffer = [*ThingIter(thing)]
+        if len(buffer) != len(slot.elements):
+            raise Helicopter(
+                builtin.ValueError, 
+                'Dimension mismatch during unpacking, ' 
+                + f'{len(slot.elements)} ≠ {len(buffer)}. ', 
+            )
+        for subSlot, subThing in zip(slot.elements, buffer):
+            assignTo(subThing, subSlot, environment)
+    elif type(slot) is Attribute:
+        parent = evalExpression(slot.value, environment)
+        if type(thing) is Undefined:
+            parent.namespace.pop(slot.attr)
+        else:
+            parent.namespace[slot.attr] = thing
+    elif type(slot) in (Subscript, Slice):
+        indexee = evalExpression(slot.value, environment)
+        if type(slot) is Subscript:
+            slice_or_index = evalExpression(slot.index, environment)
+        else:
+            slice_or_index = instantiate(
+                builtin.slice, (
+                evalExpression(slot.start, environment), 
+                evalExpression(slot.stop, environment), 
+                evalExpression(slot.step, environment), 
+                ), 
+            )
+        callMethod(indexee, '__setitem__', slice_or_index, thing)
     else:
         raise TypeError(
-            'Cannot assign to non-Identifier non-ExpressionTree. '
+            'Cannot assign to ' + repr(slot)
         )   # this is a non-miniPy error
 
 def recordStackTrace(helicopter, label, cmdTree):
@@ -943,6 +1448,32 @@ def recordStackTrace(helicopter, label, cmdTree):
     )
     raise helicopter
 
+def printStackTrace(helicopter : Helicopter):
+    print('miniPy traceback (most recent call last):')
+    while True:
+        for filename, line_number, label in helicopter.stack:
+            acc = line_number - 1
+            line = ''
+            try:
+                with open(filename, 'r') as f:
+                    for line in f:
+                        if acc == 0:
+                            break
+                        acc -= 1
+            except OSError:
+                pass    # e.g. a transpiled program, run without its sources
+            print(
+                '  File "', filename, '", line ', line_number, 
+                ', in ', label, 
+                sep='', 
+            )
+            print(' ' * 4, line, sep='')
+        print(reprString(helicopter.content))
+        helicopter = helicopter.below
+        if helicopter is None:
+            break
+        print('\nDuring handling of the above exception, the below occured:\n')
+
 def promotePythonException(e):
     if type(e) is Helicopter:
         raise e
@@ -1030,7 +1561,7 @@ def buildNone():
     class NoneType: 
         @wrapFuncion
         def __repr__(thing):
-            return 'None'
+            return unprimitize('None')
     builtin.NoneType = NoneType
     builtin.__none__ = instantiate(NoneType, skip_init = True)
     builtin.__none__.primitive_value = None
@@ -1044,9 +1575,9 @@ class DummyBuiltin:
             if x is None:
                 thing.primitive_value = False
             else:
-                thing.primitive_value = x.namespace[
-                    '__bool__'
-                ].call().primitive_value
+                thing.primitive_value = callMethod(
+                    x, '__bool__', 
+                ).primitive_value
             return builtin.__none__
         
         @wrapFuncion
@@ -1264,9 +1795,9 @@ class DummyBuiltin:
             if x is None:
                 pass
             else:
-                thing.primitive_value = x.namespace[
-                    '__int__'
-                ].call().primitive_value
+                thing.primitive_value = callMethod(
+                    x, '__int__', 
+                ).primitive_value
             return builtin.__none__
     
     @wrapClass(base = GenericPrimitive)
@@ -1277,9 +1808,9 @@ class DummyBuiltin:
             if x is None:
                 pass
             else:
-                thing.primitive_value = x.namespace[
-                    '__float__'
-                ].call().primitive_value
+                thing.primitive_value = callMethod(
+                    x, '__float__', 
+                ).primitive_value
             return builtin.__none__
     
     @wrapClass(base = GenericPrimitive)
@@ -1351,9 +1882,10 @@ class DummyBuiltin:
                 ]).primitive_value
             ):
                 raise Helicopter(builtin.StopIteration)
-            result = thing.namespace['underlying'].namespace[
-                '__getitem__'
-            ].call(thing.namespace['acc'])
+            result = callMethod(
+                thing.namespace['underlying'], '__getitem__', 
+                thing.namespace['acc'], 
+            )
             thing.namespace['acc'].primitive_value += 1
             return result
         
@@ -1595,7 +2127,7 @@ class DummyBuiltin:
         def items(thing):
             l = instantiate(builtin.list)
             for key, value in thing.primitive_value.items():
-                l.namespace['append'].call(unprimitize(
+                callMethod(l, 'append', unprimitize(
                     (decodeKey(key), value), 
                 ))
             return builtin.iter.call(l)
@@ -1721,6 +2253,9 @@ class DummyBuiltin:
                 promotePythonException(e)
             return decodeKey(result)
     
+    @wrapClass()
+    class Module: pass
+    
     @wrapClass()
     class range:
         @wrapFuncion
@@ -1766,21 +2301,24 @@ class DummyBuiltin:
         
         @wrapFuncion
         def __iter__(thing : Thing):
-            other = thing.copy()
+            # Not `thing.copy()`: its methods would stay bound to `thing`.
+            other = instantiate(builtin.range, skip_init = True)
+            for name in ('start', 'stop', 'step'):
+                other.namespace[name] = thing.namespace[name]
             other.namespace['acc'] = thing.namespace['start']
             return other
         
         @wrapFuncion
         def __next__(thing):
-            acc = thing.namespace['acc'].primitve_value
+            acc = thing.namespace['acc'].primitive_value
             if acc is None:
                 raise Helicopter(
                     builtin.TypeError, 
                     '`range` object is not iterable. ' 
                     + 'Hint: `iter()` it first?', 
                 )
-            step = thing.namespace['step'].primitve_value
-            stop = thing.namespace['stop'].primitve_value
+            step = thing.namespace['step'].primitive_value
+            stop = thing.namespace['stop'].primitive_value
             if not (
                 type(acc ) is int and 
                 type(step) is int and 
@@ -1826,15 +2364,15 @@ class DummyBuiltin:
     
     @wrapFuncion
     def iter(x : Thing):
-        return x.namespace['__iter__'].call()
+        return callMethod(x, '__iter__')
     
     @wrapFuncion
     def next(x : Thing):
-        return x.namespace['__next__'].call()
+        return callMethod(x, '__next__')
     
     @wrapFuncion
     def len(x : Thing):
-        return x.namespace['__len__'].call()
+        return callMethod(x, '__len__')
     
     @wrapFuncion
     def print(*args, sep=None, end=None, flush=None):
@@ -1874,8 +2412,54 @@ for key, value in DummyBuiltin.__dict__.items():
     if type(value) is Thing:
         builtin.__setattr__(key, value)
 
+# What `unprimitize` boxes a primitive into
+PRIMITIVE_CLASSES = {
+    int  : builtin.int  , 
+    float: builtin.float, 
+    str  : builtin.str  , 
+    list : builtin.list , 
+    tuple: builtin.tuple, 
+}
+
 setName()
 
+# What `countingLoop` stands in for
+RANGE_METHODS = tuple(
+    (name, builtin.range.namespace[name]) 
+    for name in ('__init__', '__iter__', '__next__')
+)
+
+# What `quickBinary` and `quickSubscript` may quicken to
+BINARY_SPECIALS = {}
+for leftType, rightType in (
+    (int, int), (float, float), (int, float), (float, int), (str, str), 
+):
+    numeric = leftType is not str
+    for op, operate, method in (
+        (Plus,  operator.add,          '__add__'), 
+        (Minus, lambda a, b : a + -b,  '__add__'), 
+        (Times, operator.mul,          '__mul__'), 
+    ):
+        if numeric or op is Plus:
+            BINARY_SPECIALS[op, leftType, rightType] = specializeArithmetic(
+                operate, method, leftType, rightType, op is Minus, 
+            )
+    for op, operate, method in (
+        (Equal,              operator.eq, '__eq__'), 
+        (NotEqual,           operator.eq, '__eq__'), 
+        (LessThan,           operator.lt, '__lt__'), 
+        (GreaterThan,        operator.gt, '__gt__'), 
+        (LessThanOrEqual,    operator.le, '__le__'), 
+        (GreaterThanOrEqual, operator.ge, '__ge__'), 
+    ):
+        BINARY_SPECIALS[op, leftType, rightType] = specializeComparison(
+            operate, method, leftType, rightType, op is NotEqual, 
+        )
+SUBSCRIPT_SPECIALS = {
+    (list , int): specializeSubscript(list ), 
+    (tuple, int): specializeSubscript(tuple), 
+}
+
 if __name__ == '__main__':
     from console import console
     console({**globals(), **locals()})
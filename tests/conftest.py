@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from runtime import RunTime, Helicopter, printStackTrace, TREE_ENGINE
+
+@pytest.fixture
+def runMinipy(tmp_path, capsys):
+    '''
+    Runs miniPy `source` as the main module and returns what it 
+    printed, miniPy tracebacks included.  
+    '''
+    def run(source, engine = TREE_ENGINE, **options):
+        (tmp_path / 'main.minipy').write_text(source, encoding='utf-8')
+        runTime = RunTime(
+            str(tmp_path), use_cache = False, prefetch = False, 
+            engine = engine, **options, 
+        )
+        capsys.readouterr()
+        try:
+            runTime.imPort('main', '__main__')
+        except Helicopter as h:
+            printStackTrace(h)
+        finally:
+            runTime.shutdown()
+        return capsys.readouterr().out
+    return run
@@ -0,0 +1,27 @@
+import os
+import sys
+import subprocess
+
+from conftest import ROOT
+
+def runCLI(*args, cwd, checkout = ROOT):
+    return subprocess.run(
+        [sys.executable, os.path.join(checkout, '__main__.py'), *args], 
+        cwd = cwd, capture_output = True, text = True, check = True, 
+    ).stdout
+
+def test_bundleRunsByPath(tmp_path):
+    (tmp_path / 'helper.minipy').write_text(
+        'def double(x):\n    return x * 2\n', encoding='utf-8', 
+    )
+    (tmp_path / 'prog.minipy').write_text(
+        'from helper import double\nprint(double(21))\n', 
+        encoding='utf-8', 
+    )
+    expected = runCLI('prog.minipy', '--no-prefetch', cwd = tmp_path)
+    assert expected == '42\n'
+    runCLI('prog.minipy', '--bundle', 'prog.minipyb', cwd = tmp_path)
+    # Without the sources, the bundle is all there is to import from.  
+    os.remove(tmp_path / 'helper.minipy')
+    os.remove(tmp_path / 'prog.minipy')
+    assert runCLI(str(tmp_path / 'prog.minipyb'), cwd = ROOT) == expected
@@ -0,0 +1,50 @@
+import pytest
+
+from runtime import ENGINES
+
+def runEverywhere(runMinipy, source):
+    '''
+    What `source` prints, which must be the same on every engine.  
+    '''
+    outputs = {engine: runMinipy(source, engine) for engine in ENGINES}
+    assert len(set(outputs.values())) == 1, outputs
+    return outputs[ENGINES[0]]
+
+def test_binaryOperators(runMinipy):
+    assert runEverywhere(runMinipy, 'print(2 + 3 * 4 - 1)\n') == '13\n'
+
+def test_comparisonsReturnTheDundersResult(runMinipy):
+    source = 'print(2 < 1)\nprint(1 <= 1)\nprint(2 == 3)\n'
+    assert runEverywhere(runMinipy, source) == 'False\nTrue\nFalse\n'
+
+def test_attributeAssignment(runMinipy):
+    source = 'class A:\n    pass\na = A()\na.x = 5\nprint(a.x)\n'
+    assert runEverywhere(runMinipy, source) == '5\n'
+
+def test_fromImportWithAPlainName(runMinipy, tmp_path):
+    (tmp_path / 'helper.minipy').write_text('z = 7\n', encoding='utf-8')
+    source = 'from helper import z\nprint(z)\n'
+    assert runEverywhere(runMinipy, source) == '7\n'
+
+def test_keywordArgumentBindsParameter(runMinipy):
+    source = (
+        'def f(a, b = 10):\n    return a - b\n'
+        'print(f(1))\nprint(f(1, b = 3))\n'
+    )
+    assert runEverywhere(runMinipy, source) == '-9\n-2\n'
+
+def test_setDisplay(runMinipy):
+    source = 'print({1, 2, 2})\nprint(3 in {1, 3})\n'
+    assert runEverywhere(runMinipy, source) == '{1, 2}\nTrue\n'
+
+def test_listCompWithOneCondition(runMinipy):
+    source = 'print([x * 2 for x of [1, 2, 3, 4] if x > 2])\n'
+    assert runEverywhere(runMinipy, source) == '[6, 8]\n'
+
+def test_sliceWithMoreThanThreeParts(runMinipy):
+    with pytest.raises(SyntaxError):
+        runMinipy('x = [1]\nprint(x[1:2:3:4])\n')
+
+def test_functionWithoutReturnGivesNone(runMinipy):
+    source = 'def noret():\n    x = 1\nprint(noret())\nprint(noret() is None)\n'
+    assert runEverywhere(runMinipy, source) == 'None\nTrue\n'
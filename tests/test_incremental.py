@@ -0,0 +1,22 @@
+from incremental import IncrementalParser
+
+SOURCE = '''\
+x = 1
+def f(a, b = x):
+    return a + b
+print(f(1))
+print(f(2, 3))
+'''
+
+def test_insertedLineMovesLaterCmds():
+    incrementalParser = IncrementalParser('main.minipy')
+    incrementalParser.update(SOURCE)
+    before = [x.cmdTree for x in incrementalParser.cmds]
+    incrementalParser.update('y = 0\n' + SOURCE)
+    after = [x.cmdTree for x in incrementalParser.cmds]
+    assert [x.line_number for x in after] == [1, 2, 3, 4, 5, 6]
+    # Later cmds are reused, not re-parsed.
+    assert after[-1] is before[-1]
+    # Lines inside a cmd count from the cmd, so they never move.
+    assert after[-1][0].line_number == 0
+    assert [x.first for x in incrementalParser.cmds] == [1, 2, 3, 4, 5, 6]
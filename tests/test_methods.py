@@ -0,0 +1,19 @@
+from runtime import ENGINES
+
+REASSIGNED = '''\
+class A:
+    pass
+def f(self):
+    return 1
+def g(self):
+    return 2
+A.f = f
+a = A()
+print(a.f())
+A.f = g
+print(a.f())
+'''
+
+def test_reassignedMethodIsNotStale(runMinipy):
+    for engine in ENGINES:
+        assert runMinipy(REASSIGNED, engine) == '1\n2\n', engine
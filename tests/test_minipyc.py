@@ -0,0 +1,62 @@
+import os
+
+import minipyc
+from minipyc import (
+    loadMST, parseFile, cachePath, sourceKey, writeCache, CACHE_DIRNAME, 
+)
+
+def plantCache(filename, source):
+    '''
+    Caches the MST of `source` under the current key of `filename`, 
+    so a load that uses the cache is told apart from a fresh parse.  
+    '''
+    planted = filename.with_name('planted.minipy')
+    planted.write_text(source, encoding='utf-8')
+    with open(filename, 'rb') as f:
+        key = sourceKey(str(filename), f.read())
+    writeCache(cachePath(str(filename)), key, parseFile(str(planted)))
+    return repr([*parseFile(str(planted))])
+
+def load(filename, **options):
+    return repr([*loadMST(str(filename), **options)])
+
+def setUp(tmp_path):
+    filename = tmp_path / 'main.minipy'
+    filename.write_text('print(1)\n', encoding='utf-8')
+    planted = plantCache(filename, 'print(9)\n')
+    assert load(filename) == planted
+    return filename, planted
+
+def test_contentChangeIgnoresCache(tmp_path):
+    filename, planted = setUp(tmp_path)
+    stat = os.stat(filename)
+    filename.write_text('print(2)\n', encoding='utf-8')
+    # Same size and mtime: only the hash tells.  
+    os.utime(filename, ns = (stat.st_atime_ns, stat.st_mtime_ns))
+    assert load(filename) != planted
+    assert load(filename) == repr([*parseFile(str(filename))])
+
+def test_mtimeChangeIgnoresCache(tmp_path):
+    filename, planted = setUp(tmp_path)
+    stat = os.stat(filename)
+    os.utime(filename, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load(filename) != planted
+
+def test_sizeChangeIgnoresCache(tmp_path):
+    filename, planted = setUp(tmp_path)
+    filename.write_text('print(1)\n\n', encoding='utf-8')
+    assert load(filename) != planted
+
+def test_interpreterVersionChangeIgnoresCache(tmp_path, monkeypatch):
+    filename, planted = setUp(tmp_path)
+    monkeypatch.setattr(minipyc, 'interpreterVersion', lambda : 'other')
+    assert load(filename) != planted
+
+def test_noCacheNeitherReadsNorWrites(tmp_path):
+    filename, planted = setUp(tmp_path)
+    assert load(filename, use_cache = False) != planted
+    other = tmp_path / 'other.minipy'
+    other.write_text('print(3)\n', encoding='utf-8')
+    os.remove(cachePath(str(filename)))
+    load(other, use_cache = False)
+    assert os.listdir(tmp_path / CACHE_DIRNAME) == []
@@ -0,0 +1,20 @@
+from io import StringIO
+
+from lexer import Lexer
+from parSer import CmdsParser, BinOp
+
+def parse(lexems):
+    return [*CmdsParser(iter(lexems), '<test>')]
+
+def test_longOperatorChain():
+    source = '\n\nx = ' + ' + '.join(['a'] * 3000) + '\n'
+    cmdTree, = parse(Lexer(StringIO(source)))
+    assert cmdTree.line_number == 3
+    assert type(cmdTree[1]) is BinOp
+
+def test_parsingLeavesLexemsAlone():
+    source = 'def f(a):\n    return a\nprint(f(1))\n'
+    lexems = [*Lexer(StringIO(source))]
+    lines = [x.line_number for x in lexems]
+    assert repr(parse(lexems)) == repr(parse(lexems))
+    assert [x.line_number for x in lexems] == lines
@@ -0,0 +1,32 @@
+from io import StringIO
+
+from lexer import Lexer
+from parSer import Sequence, CmdsParser
+from prefetch import importedNames
+
+SOURCE = '''\
+import a
+def f():
+    import b
+    if x:
+        from c.d import e
+class C:
+    import g
+try:
+    import h
+except Exception:
+    import i
+else:
+    import j
+finally:
+    import k
+while x:
+    import l
+'''
+
+def test_importedNamesSeesNestedBodies():
+    root = Sequence()
+    root.parse(CmdsParser(Lexer(StringIO(SOURCE)), '<test>'))
+    assert sorted(importedNames(root)) == [
+        'a', 'b', 'c.d', 'g', 'h', 'i', 'j', 'k', 'l', 
+    ]
@@ -0,0 +1,70 @@
+from runtime import ENGINES, QUICKEN_THRESHOLD
+
+WARM_UP = QUICKEN_THRESHOLD * 3
+
+def runEverywhere(runMinipy, source):
+    return {engine: runMinipy(source, engine) for engine in ENGINES}
+
+def test_binaryFallsBackOnOtherTypes(runMinipy):
+    source = f'''\
+def add(a, b):
+    return a + b
+for i of range({WARM_UP}):
+    add(i, 1)
+print(add('a', 'b'))
+print(add(1.5, 1))
+'''
+    for engine, output in runEverywhere(runMinipy, source).items():
+        assert output == "'ab'\n2.5\n", engine
+
+def test_binaryFallsBackOnPatchedBuiltin(runMinipy):
+    source = f'''\
+def add(a, b):
+    return a + b
+for i of range({WARM_UP}):
+    add(i, 1)
+def myadd(a, b):
+    return 100
+int.__add__ = myadd
+print(add(2, 3))
+'''
+    for engine, output in runEverywhere(runMinipy, source).items():
+        assert output == '100\n', engine
+
+def test_subscriptFallsBackOnOtherTypes(runMinipy):
+    source = f'''\
+def get(x, i):
+    return x[i]
+class Box:
+    pass
+def getitem(self, i):
+    return i * 10
+Box.__getitem__ = getitem
+for i of range({WARM_UP}):
+    get([1, 2], 0)
+print(get((7, 8), 0))
+print(get(Box(), 4))
+'''
+    for engine, output in runEverywhere(runMinipy, source).items():
+        assert output == '7\n40\n', engine
+
+def test_attributeFallsBackOnOtherClass(runMinipy):
+    source = f'''\
+class A:
+    pass
+class B:
+    pass
+def get(x):
+    return x.v
+a = A()
+a.v = 1
+for i of range({WARM_UP}):
+    get(a)
+b = B()
+b.v = 2
+print(get(b))
+a.v = 3
+print(get(a))
+'''
+    for engine, output in runEverywhere(runMinipy, source).items():
+        assert output == '2\n3\n', engine
@@ -0,0 +1,28 @@
+from io import StringIO
+
+from conftest import ROOT
+from lexer import Lexer
+from parSer import CmdsParser
+from tokenstream import TokenStream
+
+SOURCE = 'x = 1\nx = x + x * x\nprint(x, "x", 1.0)\n'
+
+def test_roundTrip():
+    with open(ROOT + '/test.minipy', 'r') as f:
+        expected = [repr(x) for x in Lexer(f)]
+    with open(ROOT + '/test.minipy', 'r') as f:
+        stream = TokenStream(Lexer(f))
+    assert [repr(x) for x in stream] == expected
+
+def test_parserReadsTheStream():
+    stream = TokenStream(Lexer(StringIO(SOURCE)))
+    expected = repr([*CmdsParser(Lexer(StringIO(SOURCE)), '<test>')])
+    assert repr([*CmdsParser(stream.lexems(), '<test>')]) == expected
+    # Parsing does not use up or change the stream.  
+    assert repr([*CmdsParser(stream.lexems(), '<test>')]) == expected
+
+def test_equalLexemsOnALineAreShared():
+    stream = TokenStream(Lexer(StringIO(SOURCE)))
+    lexems = [*stream.lexems()]
+    assert len(set(map(id, lexems))) < len(lexems)
+    assert len(stream.values) < len(lexems)
@@ -0,0 +1,6 @@
+from runtime import ENGINES
+
+def test_blankLinesDoNotShiftLineNumbers(runMinipy):
+    source = 'x = 1\n\n\nprint(1/0)\n'
+    for engine in ENGINES:
+        assert 'line 4, in' in runMinipy(source, engine), engine
@@ -0,0 +1,31 @@
+import os
+import sys
+import shutil
+import subprocess
+
+from conftest import ROOT
+from test_bundle import runCLI
+
+def test_transpiledProgramFindsRuntimeRelatively(tmp_path):
+    checkout = tmp_path / 'checkout'
+    shutil.copytree(ROOT, checkout, ignore = shutil.ignore_patterns(
+        '.git', 'tests', '__pycache__', '__minipycache__', 
+    ))
+    (tmp_path / 'prog.minipy').write_text(
+        'print(6 * 7)\n', encoding='utf-8', 
+    )
+    (tmp_path / 'out').mkdir()
+    runCLI(
+        'prog.minipy', '--transpile', os.path.join('out', 'prog.py'), 
+        cwd = tmp_path, checkout = checkout, 
+    )
+    # Moving the checkout and the program together keeps them working.  
+    moved = tmp_path / 'moved'
+    moved.mkdir()
+    shutil.move(str(checkout), str(moved / 'checkout'))
+    shutil.move(str(tmp_path / 'out'), str(moved / 'out'))
+    output = subprocess.run(
+        [sys.executable, str(moved / 'out' / 'prog.py')], 
+        cwd = ROOT, capture_output = True, text = True, check = True, 
+    ).stdout
+    assert output == '42\n'
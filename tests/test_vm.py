@@ -0,0 +1,25 @@
+from bytecode import compileModule, MAKE_CLASS
+from minipyc import loadMST
+from runtime import VM_ENGINE, ENGINES
+
+BASELESS = '''\
+class Point:
+    pass
+p = Point()
+p.x = 3
+print(p.x)
+print(type(p) is Point)
+'''
+
+def test_baselessClassCompiles(tmp_path):
+    filename = tmp_path / 'baseless.minipy'
+    filename.write_text(BASELESS, encoding='utf-8')
+    code = compileModule(loadMST(str(filename), use_cache = False), 'baseless')
+    assert MAKE_CLASS in code.instructions[::2]
+
+def test_baselessClassRunsOnVM(runMinipy):
+    assert runMinipy(BASELESS, VM_ENGINE) == '3\nTrue\n'
+
+def test_baselessClassMatchesEveryEngine(runMinipy):
+    outputs = {engine: runMinipy(BASELESS, engine) for engine in ENGINES}
+    assert len(set(outputs.values())) == 1, outputs
@@ -0,0 +1,106 @@
+from array import array
+import lexems
+from lexems import Lexem, ArguableLexem
+
+LEXEM_TYPES = tuple(
+    x for x in vars(lexems).values()
+    if isinstance(x, type) and issubclass(x, Lexem)
+    and x not in (Lexem, ArguableLexem)
+)
+TYPE_CODES = {x: i for i, x in enumerate(LEXEM_TYPES)}
+NO_VALUE = -1
+
+class TokenStream:
+    '''
+    A pre-lexed token stream, stored as parallel arrays:
+    type code, line number, and index into `values`, an interned
+    table of the lexem values (identifier names, numbers, strings...).
+    Lexem objects are only built when the stream is iterated, so 
+    holding a whole module costs a few bytes per token.
+    '''
+    def __init__(self, lexer = ()):
+        self.type_codes = array('B')
+        self.line_numbers = array('I')
+        self.value_indices = array('i')
+        self.values = []
+        self.value_table = {}   # (type(value), value) -> index
+        for lexem in lexer:
+            self.append(lexem)
+
+    def append(self, lexem : Lexem):
+        self.type_codes.append(TYPE_CODES[type(lexem)])
+        self.line_numbers.append(lexem.line_number)
+        if isinstance(lexem, ArguableLexem):
+            value = lexem.value
+            key = (type(value), value)
+            try:
+                index = self.value_table[key]
+            except KeyError:
+                index = len(self.values)
+                self.value_table[key] = index
+                self.values.append(value)
+            self.value_indices.append(index)
+        else:
+            self.value_indices.append(NO_VALUE)
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def typeAt(self, i):
+        return LEXEM_TYPES[self.type_codes[i]]
+
+    def lineNumberAt(self, i):
+        return self.line_numbers[i]
+
+    def valueAt(self, i):
+        index = self.value_indices[i]
+        if index == NO_VALUE:
+            return None
+        return self.values[index]
+
+    def lexemAt(self, i) -> Lexem:
+        LexemType = LEXEM_TYPES[self.type_codes[i]]
+        index = self.value_indices[i]
+        if index == NO_VALUE:
+            lexem = LexemType()
+        else:
+            lexem = LexemType(self.values[index])
+        return lexem.lineNumber(self.line_numbers[i])
+
+    def lexems(self, start = 0, stop = None):
+        '''
+        A lexer-like generator over [start, stop), which the parser 
+        consumes just like `Lexer(...)`. Equal lexems on one line are 
+        one object: the parser reads lexems, but never keeps or 
+        changes them, see `relativeLines` in parser.py.  
+        '''
+        if stop is None:
+            stop = len(self)
+        type_codes = self.type_codes
+        line_numbers = self.line_numbers
+        value_indices = self.value_indices
+        line_number = None
+        made = {}   # (type code, value index) -> lexem, on this line
+        for i in range(start, stop):
+            if line_numbers[i] != line_number:
+                line_number = line_numbers[i]
+                made.clear()
+            key = (type_codes[i], value_indices[i])
+            lexem = made.get(key)
+            if lexem is None:
+                lexem = self.lexemAt(i)
+                made[key] = lexem
+            yield lexem
+
+    def __iter__(self):
+        return self.lexems()
+
+if __name__ == '__main__':
+    # Round trip test
+    from lexer import Lexer
+    with open('test.minipy', 'r') as f:
+        expected = [repr(x) for x in Lexer(f)]
+    with open('test.minipy', 'r') as f:
+        stream = TokenStream(Lexer(f))
+    assert [repr(x) for x in stream] == expected
+    print(len(stream), 'lexems,', len(stream.values), 'distinct values')
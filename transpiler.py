@@ -0,0 +1,873 @@
+'''
+Translates a miniPy program, ahead of time, into one Python source
+file, which CPython then compiles like any other module.
+`python __main__.py foo.minipy --transpile foo.py` writes it, for
+`foo.minipy` and every module it imports. `python foo.py` runs it,
+with the runtime from this checkout, found relative to `foo.py`.
+
+Statements and expressions become the Python that the tree walker
+would have run for them, e.g. `a + b` becomes `add(A, B)`: values are
+still Things, and every operation still goes through `runtime`. What
+goes away is the dispatch on node types, and the Python exceptions
+carrying `break` and `continue`.
+Each statement records its miniPy file and line when a Helicopter
+passes, so miniPy tracebacks are the interpreter's. Python errors get
+a note mapping the generated lines back to miniPy.
+
+Constructs it does not translate (`class`, `del`, `import`) are kept
+as MST, pickled into the generated file, and run by the tree walker.
+So are the functions defined inside them.
+'''
+import os
+import zlib
+import base64
+import pickle
+import bisect
+import traceback
+from math import isfinite
+from contextlib import contextmanager
+from lexems import *
+from parSer import (
+    CmdTree, Sequence, FunctionArg, Name, Const, Empty, Parened,
+    TupleDisplay, ListDisplay, SetDisplay, DictDisplay, Call,
+    Attribute, Subscript, Slice, BinOp, UnaryOp, ListComp,
+    AssignCmd, ExpressionCmd, IsNot, NotIn, UnaryNegate,
+    Inlined, Conditional, WhileLoop, ForLoop, TryExcept,
+    FunctionDefinition,
+)
+from lexer import CHAR_ENGINE
+from prefetch import importedNames
+from optimizer import optimizeModule
+from resolver import resolveSequence
+from runtime import (
+    NULL, builtin, Helicopter, ReturnAsException,
+    BreakAsException, ContinueAsException,
+    Environment, Namespace, RunTime, TreeWalker,
+    instantiate, unprimitize, isTrue, isSame, isSubclassOf,
+    ThingIter, assignTo, executeSequence, reprString, printStackTrace,
+    isRangeCall, countingLoop, callInlined, callMethod,
+)
+
+# What generated programs import.
+__all__ = [
+    'NULL', 'builtin', 'Helicopter', 'ReturnAsException',
+    'BreakAsException', 'ContinueAsException',
+    'unprimitize', 'isTrue', 'assignTo', 'ThingIter',
+    'power', 'multiply', 'divide', 'modulo', 'add', 'subtract',
+    'same', 'notSame', 'contains', 'notContains', 'equal', 'notEqual',
+    'lessThan', 'greaterThan', 'lessEqual', 'greaterEqual',
+    'negate', 'logicalNot',
+    'readGlobal', 'invoke', 'invokeKeywords', 'failCall', 'callInlined',
+    'getItem', 'getSlice', 'setItem', 'setSlice', 'makeSet', 'makeDict',
+    'listComp', 'rangeIter', 'tracedIter', 'trace',
+    'checkCatchable', 'matchHandler',
+    'makeFunction', 'fallback', 'loadObjects', 'runProgram',
+]
+
+# Run time support. Each does what `evalExpression` does for its node.
+
+def truth(x):
+    if x:
+        return builtin.__true__
+    return builtin.__false__
+
+def power(left, right):
+    return callMethod(left, '__pow__', right)
+
+def multiply(left, right):
+    return callMethod(left, '__mul__', right)
+
+def divide(left, right):
+    return callMethod(left, '__truediv__', right)
+
+def modulo(left, right):
+    return callMethod(left, '__mod__', right)
+
+def add(left, right):
+    return callMethod(left, '__add__', right)
+
+def subtract(left, right):
+    return callMethod(left, '__add__', callMethod(right, '__neg__'))
+
+def same(left, right):
+    return truth(isSame(left, right))
+
+def notSame(left, right):
+    return truth(not isSame(left, right))
+
+def contains(left, right):
+    return callMethod(right, '__contains__', left)
+
+def notContains(left, right):
+    return truth(not isTrue(callMethod(right, '__contains__', left)))
+
+def equal(left, right):
+    return callMethod(left, '__eq__', right)
+
+def notEqual(left, right):
+    return truth(not isTrue(callMethod(left, '__eq__', right)))
+
+def lessThan(left, right):
+    return callMethod(left, '__lt__', right)
+
+def greaterThan(left, right):
+    return callMethod(left, '__gt__', right)
+
+def lessEqual(left, right):
+    return callMethod(left, '__le__', right)
+
+def greaterEqual(left, right):
+    return callMethod(left, '__ge__', right)
+
+def negate(thing):
+    return callMethod(thing, '__neg__')
+
+def logicalNot(thing):
+    return truth(not isTrue(thing))
+
+def readGlobal(environment, index, name):
+    namespace = environment[index]
+    if name in namespace:
+        return namespace[name]
+    return environment.read(name)
+
+# The callee is passed last, so that it is evaluated after the
+# arguments, as in the tree walker.
+def invoke(args, func):
+    return func.call(*args)
+
+def invokeKeywords(args, keyword_args, func):
+    return func.call(*args, **keyword_args)
+
+def failCall(evaluated, message):
+    raise Helicopter(builtin.TypeError, message)
+
+def getItem(indexee, index):
+    return callMethod(indexee, '__getitem__', index)
+
+def getSlice(slicee, start, stop, step):
+    return callMethod(
+        slicee, '__getitem__',
+        instantiate(builtin.slice, (start, stop, step)),
+    )
+
+def setItem(thing, indexee, index):
+    callMethod(indexee, '__setitem__', index, thing)
+
+def setSlice(thing, indexee, start, stop, step):
+    callMethod(
+        indexee, '__setitem__',
+        instantiate(builtin.slice, (start, stop, step)), thing,
+    )
+
+def asKey(thing):
+    if thing.primitive_value is None:
+        return thing
+    return thing.primitive_value
+
+def makeSet(things):
+    return unprimitize({asKey(thing) for thing in things})
+
+def makeDict(pairs):
+    return instantiate(builtin.dict, ({
+        asKey(key): value for key, value in pairs
+    }, ))
+
+def listComp(environment, iterable, target, condition, element):
+    buffer = []
+    tempEnv = Environment(environment + [Namespace()])
+    for nextThing in ThingIter(iterable):
+        assignTo(nextThing, target, tempEnv)
+        if condition is None or isTrue(condition(tempEnv)):
+            buffer.append(element(tempEnv))
+    return unprimitize(buffer)
+
+def rangeIter(args, func):
+    iterThing = countingLoop(func, args)
+    if iterThing is not None:
+        return iterThing
+    return ThingIter(func.call(*args))
+
+def trace(helicopter, filename, line_number, label):
+    helicopter.stack.append((filename, line_number, label))
+    raise helicopter
+
+def tracedIter(iterThing, filename, line_number, label):
+    # A failing `next()` is blamed on the loop's line.
+    while True:
+        try:
+            nextThing = next(iterThing)
+        except StopIteration:
+            return
+        except Helicopter as h:
+            trace(h, filename, line_number, label)
+        yield nextThing
+
+def checkCatchable(catching):
+    if catching._class is not builtin.Class:
+        raise Helicopter(
+            builtin.TypeError,
+            f'{reprString(catching)} is a non-class, so miniPy cannot catch this.'
+        )
+
+def matchHandler(helicopter, catchings):
+    # Index of the first handler catching it, or -1.
+    raised = helicopter.content
+    if raised._class is builtin.Class:
+        raisedClass = raised
+    else:
+        raisedClass = raised._class
+    for i, catching in enumerate(catchings):
+        if isSubclassOf(raisedClass, catching):
+            return i
+    return -1
+
+def makeFunction(runTime, environment, mst, default_args):
+    func = instantiate(builtin.Function)
+    func.namespace['__name__'] = unprimitize(mst._def[0].value)
+    func.environment = environment
+    func.mst = mst
+    func.runTime = runTime
+    func.default_args = dict(default_args)
+    return func
+
+def fallback(runTime, environment, label, element):
+    executeSequence(runTime, (element, ), environment, label)
+
+def loadObjects(blob):
+    return pickle.loads(zlib.decompress(base64.b64decode(blob)))
+
+class TranspiledEngine(TreeWalker):
+    '''
+    Runs transpiled modules and functions, and walks the rest.
+    '''
+    def runModule(self, runTime, root, environment, label):
+        if type(root) is Sequence:
+            return super().runModule(runTime, root, environment, label)
+        root(runTime, environment, label)
+
+    def runFunction(self, func, environment):
+        native = func.mst.native
+        if native is None:
+            return super().runFunction(func, environment)
+        return native(
+            func.runTime, environment,
+            func.namespace['__name__'].primitive_value,
+        )
+
+class TranspiledRunTime(RunTime):
+    '''
+    Imports transpiled modules without their sources.
+    Modules that were not transpiled are looked for as usual.
+    '''
+    def __init__(self, modules, dir_location):
+        super().__init__(dir_location, prefetch = False, resolve = False)
+        self.executor = TranspiledEngine()
+        self.transpiledFiles = dict(modules.values())
+        self.transpiledNames = {
+            name: filename for name, (filename, _) in modules.items()
+        }
+
+    def findFile(self, name):
+        try:
+            return self.transpiledNames[name]
+        except KeyError:
+            return super().findFile(name)
+
+    def loadMST(self, filename):
+        try:
+            return self.transpiledFiles[filename]
+        except KeyError:
+            return super().loadMST(filename)
+
+def annotate(e, lines, generated_filename):
+    # Adds the miniPy line of every generated frame.
+    starts = [start for start, _, _ in lines]
+    for frame, line_number in traceback.walk_tb(e.__traceback__):
+        if frame.f_code.co_filename != generated_filename:
+            continue
+        i = bisect.bisect_right(starts, line_number) - 1
+        if i >= 0:
+            _, filename, minipy_line = lines[i]
+            e.add_note(
+                f'  line {line_number} of {generated_filename} '
+                + f'is "{filename}", line {minipy_line}'
+            )
+
+def runProgram(modules, entry, dir_location, lines, generated_filename):
+    runTime = TranspiledRunTime(modules, dir_location)
+    try:
+        runTime.imPort(entry, '__main__')
+    except Helicopter as h:
+        printStackTrace(h)
+    except Exception as e:
+        annotate(e, lines, generated_filename)
+        raise
+    finally:
+        runTime.shutdown()
+
+# The translator
+
+BINARY_FUNCTIONS = {
+    ToPowerOf         : 'power',
+    Times             : 'multiply',
+    Divide            : 'divide',
+    ModDiv            : 'modulo',
+    Plus              : 'add',
+    Minus             : 'subtract',
+    Is                : 'same',
+    IsNot             : 'notSame',
+    In                : 'contains',
+    NotIn             : 'notContains',
+    Equal             : 'equal',
+    NotEqual          : 'notEqual',
+    LessThan          : 'lessThan',
+    GreaterThan       : 'greaterThan',
+    LessThanOrEqual   : 'lessEqual',
+    GreaterThanOrEqual: 'greaterEqual',
+}
+
+def literal(value):
+    if type(value) is float and not isfinite(value):
+        return f'float({repr(value)!r})'
+    return repr(value)
+
+def tupleOf(texts):
+    if len(texts) == 1:
+        return '(' + texts[0] + ', )'
+    return '(' + ', '.join(texts) + ')'
+
+def isWellFormed(function : FunctionDefinition):
+    # What the tree walker checks when `def` runs.
+    arg_names = set()
+    mandatory_args_finished = False
+    for arg in function._def[1:]:
+        if arg.name in arg_names:
+            return False
+        arg_names.add(arg.name)
+        if arg.value is None:
+            if mandatory_args_finished:
+                return False
+        else:
+            mandatory_args_finished = True
+    return True
+
+class Program:
+    '''
+    What the Python functions of a program share: the pickled MST
+    parts they refer to, and the source files.
+    '''
+    def __init__(self):
+        self.objects = []
+        self.filenames = []
+        self.functions = []     # Writers, in order
+
+    def refer(self, obj):
+        self.objects.append(obj)
+        return f'OBJECTS[{len(self.objects) - 1}]'
+
+    def fileConstant(self, filename):
+        if filename not in self.filenames:
+            self.filenames.append(filename)
+        return f'FILE_{self.filenames.index(filename)}'
+
+class Writer:
+    '''
+    Writes one Python function: a module body or a function body.
+    Its parameters are (runTime, env, label), and `F` is `env[-1]`.
+    '''
+    def __init__(self, program : Program, name, in_function):
+        self.program = program
+        self.name = name
+        self.in_function = in_function
+        self.lines = []     # (text, miniPy filename, miniPy line)
+        self.depth = 1
+        self.where = (None, None)
+        self.n_temps = 0
+        self.loop_depth = 0
+        self.header = None  # what follows the function
+        program.functions.append(self)
+
+    def emit(self, text):
+        self.lines.append(('    ' * self.depth + text, *self.where))
+
+    @contextmanager
+    def block(self, header):
+        self.emit(header)
+        self.depth += 1
+        n_lines = len(self.lines)
+        yield
+        if len(self.lines) == n_lines:
+            self.emit('pass')
+        self.depth -= 1
+
+    @contextmanager
+    def loop(self, header):
+        self.loop_depth += 1
+        with self.block(header):
+            yield
+        self.loop_depth -= 1
+
+    def temp(self, prefix):
+        self.n_temps += 1
+        return f'_{prefix}{self.n_temps}'
+
+    def locate(self, cmdTree : CmdTree):
+        self.where = (cmdTree.filename, cmdTree.line_number)
+
+    @contextmanager
+    def traced(self, cmdTree : CmdTree, statement = True):
+        # Like the `try` around each cmd tree in `executeSequence`.
+        self.locate(cmdTree)
+        with self.block('try:'):
+            yield
+        with self.block('except Helicopter as h:'):
+            self.emit(f'''trace(h, {
+                self.program.fileConstant(cmdTree.filename)
+            }, {cmdTree.line_number}, label)''')
+        if statement:
+            with self.block('except KeyboardInterrupt:'):
+                self.emit('raise Helicopter(builtin.KeyboardInterrupt)')
+
+    def expression(self, eTree) -> str:
+        eType = type(eTree)
+        if eType is Name:
+            return self.name_(eTree)
+        elif eType is Const:
+            # A new Thing every time: Things are mutable.
+            return f'unprimitize({literal(eTree.value)})'
+        elif eType is BinOp:
+            left = self.expression(eTree.left)
+            right = self.expression(eTree.right)
+            if eTree.op is Or:
+                return f'(_t if isTrue(_t := {left}) else {right})'
+            elif eTree.op is And:
+                return f'({right} if isTrue(_t := {left}) else _t)'
+            return f'{BINARY_FUNCTIONS[eTree.op]}({left}, {right})'
+        elif eType is Call:
+            return self.call(eTree)
+        elif eType is Attribute:
+            return f'{self.expression(eTree.value)}.namespace[{eTree.attr!r}]'
+        elif eType is Subscript:
+            return f'''getItem({
+                self.expression(eTree.value)
+            }, {self.expression(eTree.index)})'''
+        elif eType is Slice:
+            return 'getSlice(' + ', '.join(map(self.expression, (
+                eTree.value, eTree.start, eTree.stop, eTree.step,
+            ))) + ')'
+        elif eType is UnaryOp:
+            operand = self.expression(eTree.operand)
+            if eTree.op is UnaryNegate:
+                return f'negate({operand})'
+            if eTree.op is Not:
+                return f'logicalNot({operand})'
+        elif eType is Parened:
+            return self.expression(eTree.value)
+        elif eType is TupleDisplay:
+            return f'''unprimitize({tupleOf([
+                self.expression(x) for x in eTree.elements
+            ])})'''
+        elif eType is ListDisplay:
+            return 'unprimitize([' + ', '.join([
+                self.expression(x) for x in eTree.elements
+            ]) + '])'
+        elif eType is SetDisplay:
+            return f'''makeSet({tupleOf([
+                self.expression(x) for x in eTree.elements
+            ])})'''
+        elif eType is DictDisplay:
+            return f'''makeDict({tupleOf([
+                tupleOf([self.expression(k), self.expression(v)])
+                for k, v in zip(eTree.keys, eTree.values)
+            ])})'''
+        elif eType is Empty:
+            return 'builtin.__none__'
+        elif eType is Inlined:
+            # The arguments and the callee are Python; what it returns
+            # is walked by `callInlined`.
+            return f'''callInlined({self.program.refer(eTree)}, {tupleOf([
+                self.expression(funcArg.value) for funcArg in eTree.call.args
+            ])}, {self.expression(eTree.call.func)}, env)'''
+        elif eType is ListComp:
+            if eTree.condition is None:
+                condition = 'None'
+            else:
+                condition = f'lambda env: {self.expression(eTree.condition)}'
+            return f'''listComp(env, {
+                self.expression(eTree.iterable)
+            }, {self.program.refer(eTree.target)}, {condition}, lambda env: {
+                self.expression(eTree.element)
+            })'''
+        raise TypeError('Cannot transpile ' + repr(eTree))
+
+    def name_(self, node : Name):
+        name = node.name
+        if node.scope is None:
+            return f'env.read({name!r})'
+        _, hops, slot = node.scope
+        if slot is None:
+            return f'readGlobal(env, {-1 - hops}, {name!r})'
+        if hops == 0:
+            frame = 'F'
+        else:
+            frame = f'env[{-1 - hops}]'
+        return (
+            f'(_t if (_t := {frame}.values[{slot}]) is not NULL '
+            + f'else env.read({name!r}))'
+        )
+
+    def call(self, eTree : Call):
+        args = []
+        keywords = []
+        for funcArg in eTree.args:
+            funcArg : FunctionArg
+            if funcArg.name is None:
+                if keywords:
+                    return self.failCall(
+                        args, keywords,
+                        'Positional argument after named arguments.',
+                    )
+                args.append(self.expression(funcArg.value))
+            else:
+                if funcArg.name in [name for name, _ in keywords]:
+                    return self.failCall(
+                        args, keywords,
+                        'Duplicate argument `' + funcArg.name + '`. ',
+                    )
+                keywords.append((
+                    funcArg.name, self.expression(funcArg.value),
+                ))
+        func = self.expression(eTree.func)
+        if keywords:
+            return f'''invokeKeywords({tupleOf(args)}, {{{', '.join([
+                f'{name!r}: {value}' for name, value in keywords
+            ])}}}, {func})'''
+        return f'invoke({tupleOf(args)}, {func})'
+
+    def failCall(self, args, keywords, message):
+        # The arguments before the malformed one are still evaluated.
+        evaluated = args + [value for _, value in keywords]
+        return f'failCall({tupleOf(evaluated)}, {message!r})'
+
+    def store(self, slot, value):
+        _type = type(slot)
+        if _type is Name:
+            scope = slot.scope
+            if scope is not None and scope[2] is not None and scope[1] == 0:
+                self.emit(f'F.values[{scope[2]}] = {value}')
+            else:
+                self.emit(f'env[-1][{slot.name!r}] = {value}')
+        elif _type is Parened:
+            self.store(slot.value, value)
+        elif _type is Attribute:
+            # Python evaluates `value` first, as miniPy does.
+            parent = self.expression(slot.value)
+            self.emit(f'{parent}.namespace[{slot.attr!r}] = {value}')
+        elif _type is Subscript:
+            self.emit(f'''setItem({value}, {
+                self.expression(slot.value)
+            }, {self.expression(slot.index)})''')
+        elif _type is Slice:
+            self.emit(f'setSlice({value}, ' + ', '.join(map(
+                self.expression, (slot.value, slot.start, slot.stop, slot.step),
+            )) + ')')
+        else:
+            # unpacking, and whatever fails at run time
+            self.emit(f'assignTo({value}, {self.program.refer(slot)}, env)')
+
+    def sequence(self, sequence : Sequence):
+        for element in sequence:
+            self.element(element)
+
+    def element(self, element):
+        _type = type(element)
+        if _type is CmdTree:
+            if element.type in (Del, Import, From):
+                self.fallback(element, element)
+            else:
+                with self.traced(element):
+                    self.cmdTree(element)
+        elif _type is Conditional:
+            self.conditional(element)
+        elif _type is WhileLoop:
+            self.whileLoop(element)
+        elif _type is ForLoop:
+            self.forLoop(element)
+        elif _type is TryExcept:
+            self.tryExcept(element)
+        elif _type is FunctionDefinition and isWellFormed(element):
+            self.functionDefinition(element)
+        else:
+            # classes, and `def`s that fail when they run
+            first_cmd = element._def if _type is FunctionDefinition else element._class
+            self.fallback(element, first_cmd)
+
+    def fallback(self, element, first_cmd : CmdTree):
+        self.locate(first_cmd)
+        run = f'fallback(runTime, env, label, {self.program.refer(element)})'
+        if self.loop_depth == 0:
+            self.emit(run)
+            return
+        with self.block('try:'):
+            self.emit(run)
+        with self.block('except BreakAsException:'):
+            self.emit('break')
+        with self.block('except ContinueAsException:'):
+            self.emit('continue')
+
+    def cmdTree(self, cmdTree : CmdTree):
+        cmdType = cmdTree.type
+        if cmdType is ExpressionCmd:
+            self.emit(self.expression(cmdTree[0]))
+        elif cmdType is AssignCmd:
+            self.store(cmdTree[0], self.expression(cmdTree[1]))
+        elif cmdType is Return:
+            if cmdTree:
+                value = self.expression(cmdTree[0])
+            else:
+                value = 'builtin.__none__'
+            if self.in_function:
+                self.emit(f'return {value}')
+            else:
+                self.emit(f'raise ReturnAsException({value})')
+        elif cmdType is Raise:
+            self.emit(f'raise Helicopter({self.expression(cmdTree[0])})')
+        elif cmdType is Break:
+            self.emit('break' if self.loop_depth else 'raise BreakAsException')
+        elif cmdType is Continue:
+            self.emit(
+                'continue' if self.loop_depth else 'raise ContinueAsException'
+            )
+        elif cmdType is Pass:
+            self.emit('pass')
+
+    def condition(self, cmdTree : CmdTree, target, expression = None):
+        with self.traced(cmdTree, statement = False):
+            if expression is None:
+                expression = cmdTree[0]
+            self.emit(f'{target} = {self.expression(expression)}')
+
+    def conditional(self, conditional : Conditional):
+        branches = [conditional, *conditional.elIfs]
+        for i, branch in enumerate(branches):
+            self.condition(branch.condition, '_c')
+            with self.block('if isTrue(_c):'):
+                self.sequence(branch.then)
+            if i + 1 < len(branches):
+                self.emit('else:')
+                self.depth += 1
+        if conditional._else is not None:
+            with self.block('else:'):
+                self.sequence(conditional._else)
+        self.depth -= len(branches) - 1
+
+    def whileLoop(self, whileLoop : WhileLoop):
+        if whileLoop._else is not None:
+            exhausted = self.temp('e')
+            self.emit(f'{exhausted} = False')
+        with self.loop('while True:'):
+            self.condition(whileLoop.condition, '_c')
+            with self.block('if not isTrue(_c):'):
+                if whileLoop._else is not None:
+                    self.emit(f'{exhausted} = True')
+                self.emit('break')
+            self.sequence(whileLoop.body)
+        if whileLoop._else is not None:
+            with self.block(f'if {exhausted}:'):
+                self.sequence(whileLoop._else)
+
+    def forLoop(self, forLoop : ForLoop):
+        cmdTree = forLoop.condition
+        iterThing = self.temp('i')
+        nextThing = self.temp('x')
+        self.locate(cmdTree)
+        iterable = cmdTree[1]
+        with self.traced(cmdTree, statement = False):
+            if isRangeCall(iterable):
+                self.emit(f'''{iterThing} = rangeIter({tupleOf([
+                    self.expression(funcArg.value) for funcArg in iterable.args
+                ])}, {self.expression(iterable.func)})''')
+            else:
+                self.emit(f'''{iterThing} = ThingIter({
+                    self.expression(iterable)
+                })''')
+        with self.loop(f'''for {nextThing} in tracedIter({iterThing}, {
+            self.program.fileConstant(cmdTree.filename)
+        }, {cmdTree.line_number}, label):'''):
+            self.store(cmdTree[0], nextThing)
+            self.sequence(forLoop.body)
+        if forLoop._else is not None:
+            with self.block('else:'):
+                self.sequence(forLoop._else)
+
+    def tryExcept(self, tryExcept : TryExcept):
+        oneCatches = tryExcept.oneCatches
+        if oneCatches:
+            catchings = self.temp('h')
+            self.emit(f'{catchings} = []')
+            for oneCatch in oneCatches:
+                self.condition(oneCatch.catching, '_c')
+                self.emit('checkCatchable(_c)')
+                self.emit(f'{catchings}.append(_c)')
+        if not oneCatches and tryExcept._finally is None:
+            # Python wants a handler: this is just the try, then the else.
+            self.sequence(tryExcept._try)
+            if tryExcept._else is not None:
+                self.sequence(tryExcept._else)
+            return
+        with self.block('try:'):
+            self.sequence(tryExcept._try)
+            if not oneCatches and tryExcept._else is not None:
+                self.sequence(tryExcept._else)
+        if oneCatches:
+            raised = self.temp('r')
+            handler = self.temp('k')
+            with self.block(f'except Helicopter as {raised}:'):
+                self.emit(f'{handler} = matchHandler({raised}, {catchings})')
+                for i, oneCatch in enumerate(oneCatches):
+                    keyword = 'if' if i == 0 else 'elif'
+                    with self.block(f'{keyword} {handler} == {i}:'):
+                        with self.block('try:'):
+                            self.sequence(oneCatch.handler)
+                        with self.block('except Helicopter as innerH:'):
+                            self.emit(f'{raised}.below = innerH')
+                            self.emit(f'raise {raised}')
+                with self.block('else:'):
+                    self.emit('raise')
+            if tryExcept._else is not None:
+                with self.block('else:'):
+                    self.sequence(tryExcept._else)
+        if tryExcept._finally is not None:
+            with self.block('finally:'):
+                self.sequence(tryExcept._finally)
+
+    def functionDefinition(self, function : FunctionDefinition):
+        identifier, *args = function._def
+        # What `executeFunction` needs. The body is run natively.
+        stub = FunctionDefinition()
+        stub._def = function._def
+        stub.layout = function.layout
+        mst = self.program.refer(stub)
+        body = Writer(
+            self.program, f'function_{len(self.program.functions)}', True,
+        )
+        body.header = f'{mst}.native = {body.name}'
+        body.locate(function._def)
+        body.emit('F = env[-1]')
+        body.sequence(function.body)
+        with self.traced(function._def, statement = False):
+            self.emit(f'''_f = makeFunction(runTime, env, {mst}, {{{', '.join([
+                f'{arg.name!r}: {self.expression(arg.value)}'
+                for arg in args if arg.value is not None
+            ])}}})''')
+        self.emit(f'env.assign({identifier.value!r}, _f)')
+
+    def render(self):
+        yield (f'def {self.name}(runTime, env, label):', *self.lines[0][1:])
+        yield from self.lines
+
+def loadProgram(entry_filename, lexer_engine, use_cache, optimize):
+    '''
+    Yields (name, filename, root) of the entry module and of every
+    module it imports, resolved as `RunTime.imPort` would.
+    '''
+    dir_location, filename = os.path.split(entry_filename)
+    name, _ = os.path.splitext(filename)
+    runTime = RunTime(dir_location, lexer_engine, use_cache, prefetch = False)
+    todo = [(name, os.path.normpath(entry_filename))]
+    done = set()
+    while todo:
+        name, filename = todo.pop(0)
+        if filename in done:
+            continue
+        done.add(filename)
+        root = runTime.loadMST(filename)
+        if optimize:
+            optimizeModule(root)
+        resolveSequence(root, runTime.builtin_names)
+        yield name, filename, root
+        for imported in importedNames(root):
+            found = runTime.findFile(imported)
+            if found is not None:
+                todo.append((imported, found))
+
+def runtimeLocation(out_filename):
+    # where this checkout is, seen from the generated file
+    here = os.path.dirname(os.path.abspath(__file__))
+    out_dir = os.path.dirname(os.path.abspath(out_filename or 'out.py'))
+    try:
+        return os.path.relpath(here, out_dir)
+    except ValueError:
+        return here     # e.g. another drive on Windows
+
+def transpileProgram(
+    entry_filename, lexer_engine = CHAR_ENGINE, use_cache = True,
+    optimize = False, out_filename = None,
+) -> str:
+    '''
+    Returns the Python source of the program starting at
+    `entry_filename`, to be written to `out_filename`, or to the
+    current directory if None. It finds the runtime relative to
+    that, so the two can move together.
+    '''
+    program = Program()
+    modules = []
+    entry = None
+    for name, filename, root in loadProgram(
+        entry_filename, lexer_engine, use_cache, optimize,
+    ):
+        if entry is None:
+            entry = name
+        writer = Writer(program, f'module_{len(program.functions)}', False)
+        writer.where = (filename, 1)
+        writer.emit('F = env[-1]')
+        writer.sequence(root)
+        modules.append((name, filename, writer.name))
+
+    blob = base64.b64encode(zlib.compress(pickle.dumps(program.objects)))
+    head = [
+        "'''",
+        f'Transpiled from {entry_filename} by transpiler.py. ',
+        'Do not edit: transpile again instead. ',
+        "'''",
+        'import os',
+        'import sys',
+        'sys.path.insert(0, os.path.join(',
+        f'    os.path.dirname(os.path.abspath(__file__)), {runtimeLocation(out_filename)!r},',
+        '))',
+        'from transpiler import *',
+        '',
+    ]
+    for i, filename in enumerate(program.filenames):
+        head.append(f'FILE_{i} = {filename!r}')
+    head.append('OBJECTS = loadObjects(')
+    for i in range(0, len(blob), 72):
+        head.append(f'    {blob[i : i + 72]!r}')
+    head.append(')')
+
+    out = [*head]
+    lines = []
+    for writer in program.functions:
+        out.extend(('', ''))
+        for text, filename, line_number in writer.render():
+            if filename is not None and (
+                not lines or lines[-1][1:] != (filename, line_number)
+            ):
+                lines.append((len(out) + 1, filename, line_number))
+            out.append(text)
+        if writer.header is not None:
+            out.append(writer.header)
+    out.extend(('', '', 'MODULES = {'))
+    for name, filename, function_name in modules:
+        out.append(f'    {name!r}: ({filename!r}, {function_name}), ')
+    out.append('}')
+    out.append(f'LINES = {tuple(lines)!r}')
+    dir_location = os.path.dirname(os.path.abspath(entry_filename))
+    out.extend((
+        '',
+        "if __name__ == '__main__':",
+        f'    runProgram(MODULES, {entry!r}, {dir_location!r}, LINES, __file__)',
+        '',
+    ))
+    return '\n'.join(out)
@@ -0,0 +1,475 @@
+'''
+Runs the bytecode of bytecode.py. Selected with `RunTime(engine =
+VM_ENGINE)` or `--engine vm`. Things, namespaces and environments are
+the runtime's, so both engines behave the same.
+The dispatch loop indexes `HANDLERS` by opcode. A handler returns
+True only to end the code, with its result on top of the stack.
+'''
+from lexems import *
+from parSer import Sequence, IsNot, NotIn
+from bytecode import (
+    OPNAMES, BINARY_OPERATIONS, SIGNAL_BREAK, NO_LINE,
+    compileModule, compileFunction, compileClass,
+)
+from runtime import (
+    builtin, Helicopter, ReturnAsException,
+    BreakAsException, ContinueAsException,
+    Environment, Namespace, Undefined,
+    instantiate, unprimitize, isTrue, isSame, isSubclassOf,
+    ThingIter, assignTo, executeCmdTree, reprString, countingLoop,
+    callInlined, callMethod,
+)
+
+class Activation:
+    '''
+    One run of a `Code`. `environment` differs from `base` only inside
+    a list comprehension, which has a namespace of its own.
+    '''
+    __slots__ = (
+        'code', 'constants', 'names', 'stack', 'pc',
+        'environment', 'base', 'scopes', 'runTime',
+    )
+
+    def __init__(self, code, environment, runTime):
+        self.code = code
+        self.constants = code.constants
+        self.names = code.names
+        self.stack = []
+        self.pc = 0
+        self.environment = environment
+        self.base = environment
+        self.scopes = []
+        self.runTime = runTime
+
+def run(code, environment, runTime, label):
+    '''
+    Runs `code` in `environment`. Returns what a `return` returned,
+    or None if the code ran off its end.
+    '''
+    state = Activation(code, environment, runTime)
+    instructions = code.instructions
+    stack = state.stack
+    handlers = HANDLERS
+    while True:
+        try:
+            while True:
+                pc = state.pc
+                state.pc = pc + 2
+                if handlers[instructions[pc]](state, instructions[pc + 1]):
+                    return stack.pop()
+        except (Helicopter, KeyboardInterrupt) as e:
+            if type(e) is KeyboardInterrupt:
+                e = Helicopter(builtin.KeyboardInterrupt)
+            line = code.lines[pc // 2]
+            if line != NO_LINE:
+                e.stack.append((code.filename, line, label))
+            handler = code.handlerAt(pc)
+            if handler is None:
+                raise e
+            target, depth = handler
+            del stack[depth:]
+            stack.append(e)
+            state.environment = state.base
+            state.scopes.clear()
+            state.pc = target
+
+def opPopTop(state, arg):
+    del state.stack[-arg:]
+
+def opCopy(state, arg):
+    state.stack.append(state.stack[-arg])
+
+def opLoadConst(state, arg):
+    # A new Thing every time: Things are mutable.
+    state.stack.append(unprimitize(state.constants[arg]))
+
+def opLoadNone(state, arg):
+    state.stack.append(builtin.__none__)
+
+def opLoadName(state, arg):
+    state.stack.append(state.environment.readName(state.names[arg]))
+
+def opStoreName(state, arg):
+    state.environment.assignName(state.names[arg], state.stack.pop())
+
+def opStoreIdentifier(state, arg):
+    state.environment.assign(state.names[arg], state.stack.pop())
+
+def opStoreTarget(state, arg):
+    assignTo(state.stack.pop(), state.constants[arg], state.environment)
+
+def opDelete(state, arg):
+    assignTo(Undefined(), state.constants[arg], state.environment)
+
+def opLoadAttr(state, arg):
+    stack = state.stack
+    stack[-1] = stack[-1].namespace[state.names[arg]]
+
+def opStoreAttr(state, arg):
+    parent = state.stack.pop()
+    parent.namespace[state.names[arg]] = state.stack.pop()
+
+def opLoadSubscr(state, arg):
+    stack = state.stack
+    index = stack.pop()
+    stack[-1] = callMethod(stack[-1], '__getitem__', index)
+
+def opStoreSubscr(state, arg):
+    stack = state.stack
+    index = stack.pop()
+    indexee = stack.pop()
+    callMethod(indexee, '__setitem__', index, stack.pop())
+
+def opBuildSlice(state, arg):
+    stack = state.stack
+    step = stack.pop()
+    stop = stack.pop()
+    start = stack.pop()
+    stack.append(instantiate(builtin.slice, (start, stop, step)))
+
+def truth(x):
+    if x:
+        return builtin.__true__
+    return builtin.__false__
+
+BINARY_FUNCTIONS = {
+    ToPowerOf: lambda l, r : callMethod(l, '__pow__', r),
+    Times    : lambda l, r : callMethod(l, '__mul__', r),
+    Divide   : lambda l, r : callMethod(l, '__truediv__', r),
+    ModDiv   : lambda l, r : callMethod(l, '__mod__', r),
+    Plus     : lambda l, r : callMethod(l, '__add__', r),
+    Minus    : lambda l, r : callMethod(
+        l, '__add__', callMethod(r, '__neg__'),
+    ),
+    Is       : lambda l, r : truth(isSame(l, r)),
+    IsNot    : lambda l, r : truth(not isSame(l, r)),
+    In       : lambda l, r : callMethod(r, '__contains__', l),
+    NotIn    : lambda l, r : truth(not isTrue(
+        callMethod(r, '__contains__', l)
+    )),
+    Equal    : lambda l, r : callMethod(l, '__eq__', r),
+    NotEqual : lambda l, r : truth(not isTrue(
+        callMethod(l, '__eq__', r)
+    )),
+    LessThan          : lambda l, r : callMethod(l, '__lt__', r),
+    GreaterThan       : lambda l, r : callMethod(l, '__gt__', r),
+    LessThanOrEqual   : lambda l, r : callMethod(l, '__le__', r),
+    GreaterThanOrEqual: lambda l, r : callMethod(l, '__ge__', r),
+}
+BINARIES = tuple(BINARY_FUNCTIONS[op] for op in BINARY_OPERATIONS)
+
+def opBinary(state, arg):
+    stack = state.stack
+    right = stack.pop()
+    stack[-1] = BINARIES[arg](stack[-1], right)
+
+def opUnaryNegate(state, arg):
+    stack = state.stack
+    stack[-1] = callMethod(stack[-1], '__neg__')
+
+def opUnaryNot(state, arg):
+    stack = state.stack
+    stack[-1] = truth(not isTrue(stack[-1]))
+
+def opCall(state, arg):
+    stack = state.stack
+    func = stack.pop()
+    if arg:
+        args = stack[-arg:]
+        del stack[-arg:]
+    else:
+        args = ()
+    stack.append(func.call(*args))
+
+def opCallKw(state, arg):
+    stack = state.stack
+    n_positional, keyword_names = state.constants[arg]
+    func = stack.pop()
+    n = n_positional + len(keyword_names)
+    values = stack[-n:]
+    del stack[-n:]
+    stack.append(func.call(
+        *values[:n_positional],
+        **dict(zip(keyword_names, values[n_positional:])),
+    ))
+
+def opCallInlined(state, arg):
+    stack = state.stack
+    inlined = state.constants[arg]
+    func = stack.pop()
+    n = len(inlined.call.args)
+    if n:
+        args = stack[-n:]
+        del stack[-n:]
+    else:
+        args = []
+    stack.append(callInlined(inlined, args, func, state.environment))
+
+def popMany(stack, n):
+    if not n:
+        return []
+    values = stack[-n:]
+    del stack[-n:]
+    return values
+
+def asKey(thing):
+    if thing.primitive_value is None:
+        return thing
+    return thing.primitive_value
+
+def opBuildTuple(state, arg):
+    state.stack.append(unprimitize(tuple(popMany(state.stack, arg))))
+
+def opBuildList(state, arg):
+    state.stack.append(unprimitize(popMany(state.stack, arg)))
+
+def opBuildSet(state, arg):
+    state.stack.append(unprimitize({
+        asKey(thing) for thing in popMany(state.stack, arg)
+    }))
+
+def opBuildDict(state, arg):
+    values = popMany(state.stack, arg * 2)
+    d = {}
+    for i in range(0, len(values), 2):
+        d[asKey(values[i])] = values[i + 1]
+    state.stack.append(instantiate(builtin.dict, (d, )))
+
+def opUnpack(state, arg):
+    stack = state.stack
+    buffer = [*ThingIter(stack.pop())]
+    if len(buffer) != arg:
+        raise Helicopter(
+            builtin.ValueError,
+            'Dimension mismatch during unpacking, '
+            + f'{arg} ≠ {len(buffer)}. ',
+        )
+    buffer.reverse()
+    stack.extend(buffer)
+
+def opJump(state, arg):
+    state.pc = arg
+
+def opPopJumpIfFalse(state, arg):
+    if not isTrue(state.stack.pop()):
+        state.pc = arg
+
+def opJumpIfTrueOrPop(state, arg):
+    if isTrue(state.stack[-1]):
+        state.pc = arg
+    else:
+        state.stack.pop()
+
+def opJumpIfFalseOrPop(state, arg):
+    if isTrue(state.stack[-1]):
+        state.stack.pop()
+    else:
+        state.pc = arg
+
+def opGetIter(state, arg):
+    stack = state.stack
+    stack[-1] = ThingIter(stack[-1])
+
+def opGetRangeIter(state, arg):
+    # stack: arg * n, callee
+    stack = state.stack
+    func = stack.pop()
+    args = stack[-arg:]
+    del stack[-arg:]
+    iterThing = countingLoop(func, args)
+    if iterThing is None:
+        iterThing = ThingIter(func.call(*args))
+    stack.append(iterThing)
+
+def opForIter(state, arg):
+    stack = state.stack
+    try:
+        stack.append(next(stack[-1]))
+    except StopIteration:
+        stack.pop()
+        state.pc = arg
+
+def opNewBuffer(state, arg):
+    state.stack.append([])
+
+def opAppendBuffer(state, arg):
+    # stack: buffer, iterator, element
+    stack = state.stack
+    stack[-3].append(stack.pop())
+
+def opFinishList(state, arg):
+    stack = state.stack
+    stack[-1] = unprimitize(stack[-1])
+
+def opPushScope(state, arg):
+    state.scopes.append(state.environment)
+    state.environment = Environment(state.environment + [Namespace()])
+
+def opPopScope(state, arg):
+    state.environment = state.scopes.pop()
+
+def opMakeFunction(state, arg):
+    function, default_names = state.constants[arg]
+    func = instantiate(builtin.Function)
+    func.namespace['__name__'] = unprimitize(function._def[0].value)
+    func.environment = state.environment
+    func.mst = function
+    func.runTime = state.runTime
+    func.default_args = dict(zip(
+        default_names, popMany(state.stack, len(default_names)),
+    ))
+    state.stack.append(func)
+
+def opMakeClass(state, arg):
+    classDefinition = state.constants[arg]
+    # Without a base, like a builtin class, it has no `__base__`.
+    base = None
+    if len(classDefinition._class) > 1:
+        base = state.stack.pop()
+        if base._class is not builtin.Class:
+            raise Helicopter(
+                builtin.TypeError,
+                reprString(base) + ' is a non-class. '
+                + 'New class cannot inherit from a non-class.',
+            )
+    name = classDefinition._class[0].value
+    thisClass = instantiate(builtin.Class)
+    if base is not None:
+        thisClass.namespace['__base__'] = base
+    thisClass.namespace['__name__'] = unprimitize(name)
+    returned = run(
+        compileClass(classDefinition),
+        [*state.environment, thisClass.namespace],
+        state.runTime, name,
+    )
+    if returned is not None:
+        raise ReturnAsException(returned)
+    state.stack.append(thisClass)
+
+def opExecCmd(state, arg):
+    executeCmdTree(state.runTime, state.constants[arg], state.environment)
+
+def opRaise(state, arg):
+    raise Helicopter(state.stack.pop())
+
+def opReraise(state, arg):
+    raise state.stack.pop()
+
+def opCheckCatchable(state, arg):
+    catching = state.stack[-1]
+    if catching._class is not builtin.Class:
+        raise Helicopter(
+            builtin.TypeError,
+            f'{reprString(catching)} is a non-class, so miniPy cannot catch this.'
+        )
+
+def opExcMatch(state, arg):
+    # stack: helicopter, class -> helicopter, bool
+    stack = state.stack
+    catching = stack.pop()
+    raised = stack[-1].content
+    if raised._class is builtin.Class:
+        raisedClass = raised
+    else:
+        raisedClass = raised._class
+    stack.append(truth(isSubclassOf(raisedClass, catching)))
+
+def opChainBelow(state, arg):
+    # stack: helicopter, helicopter raised by its handler
+    stack = state.stack
+    innerH = stack.pop()
+    stack[-1].below = innerH
+
+def opFail(state, arg):
+    exception_name, message = state.constants[arg]
+    raise Helicopter(getattr(builtin, exception_name), message)
+
+def opSignal(state, arg):
+    if arg == SIGNAL_BREAK:
+        raise BreakAsException
+    raise ContinueAsException
+
+def opReturnValue(state, arg):
+    return True
+
+def opEnd(state, arg):
+    state.stack.append(None)
+    return True
+
+HANDLERS = tuple({
+    'POP_TOP'             : opPopTop,
+    'COPY'                : opCopy,
+    'LOAD_CONST'          : opLoadConst,
+    'LOAD_NONE'           : opLoadNone,
+    'LOAD_NAME'           : opLoadName,
+    'STORE_NAME'          : opStoreName,
+    'STORE_IDENTIFIER'    : opStoreIdentifier,
+    'STORE_TARGET'        : opStoreTarget,
+    'DELETE'              : opDelete,
+    'LOAD_ATTR'           : opLoadAttr,
+    'STORE_ATTR'          : opStoreAttr,
+    'LOAD_SUBSCR'         : opLoadSubscr,
+    'STORE_SUBSCR'        : opStoreSubscr,
+    'BUILD_SLICE'         : opBuildSlice,
+    'BINARY'              : opBinary,
+    'UNARY_NEGATE'        : opUnaryNegate,
+    'UNARY_NOT'           : opUnaryNot,
+    'CALL'                : opCall,
+    'CALL_KW'             : opCallKw,
+    'CALL_INLINED'        : opCallInlined,
+    'BUILD_TUPLE'         : opBuildTuple,
+    'BUILD_LIST'          : opBuildList,
+    'BUILD_SET'           : opBuildSet,
+    'BUILD_DICT'          : opBuildDict,
+    'UNPACK'              : opUnpack,
+    'JUMP'                : opJump,
+    'POP_JUMP_IF_FALSE'   : opPopJumpIfFalse,
+    'JUMP_IF_TRUE_OR_POP' : opJumpIfTrueOrPop,
+    'JUMP_IF_FALSE_OR_POP': opJumpIfFalseOrPop,
+    'GET_ITER'            : opGetIter,
+    'GET_RANGE_ITER'      : opGetRangeIter,
+    'FOR_ITER'            : opForIter,
+    'NEW_BUFFER'          : opNewBuffer,
+    'APPEND_BUFFER'       : opAppendBuffer,
+    'FINISH_LIST'         : opFinishList,
+    'PUSH_SCOPE'          : opPushScope,
+    'POP_SCOPE'           : opPopScope,
+    'MAKE_FUNCTION'       : opMakeFunction,
+    'MAKE_CLASS'          : opMakeClass,
+    'EXEC_CMD'            : opExecCmd,
+    'RAISE'               : opRaise,
+    'RERAISE'             : opReraise,
+    'CHECK_CATCHABLE'     : opCheckCatchable,
+    'EXC_MATCH'           : opExcMatch,
+    'CHAIN_BELOW'         : opChainBelow,
+    'FAIL'                : opFail,
+    'SIGNAL'              : opSignal,
+    'RETURN_VALUE'        : opReturnValue,
+    'END'                 : opEnd,
+}[opname] for opname in OPNAMES)
+
+class VM:
+    '''
+    The bytecode engine. Same interface as `runtime.TreeWalker`.
+    A function's code is compiled once, and kept on its MST.
+    '''
+    def runModule(self, runTime, root, environment, label):
+        if type(root) is Sequence:
+            codes = (compileModule(root, label), )
+        else:
+            # streamed: compile each element as it arrives
+            codes = (compileModule((element, ), label) for element in root)
+        for code in codes:
+            returned = run(code, environment, runTime, label)
+            if returned is not None:
+                raise ReturnAsException(returned)
+
+    def runFunction(self, func, environment):
+        function = func.mst
+        code = function.code
+        if code is None:
+            code = function.code = compileFunction(function)
+        return run(
+            code, environment, func.runTime,
+            func.namespace['__name__'].primitive_value,
+        )